@@ -0,0 +1,127 @@
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Iterable, Iterator, List, Optional, Tuple, Union
+
+import pandas as pd
+
+import core
+from spider import PLAYER_COLUMN
+from timefmt import warn_bad_times
+
+# 必需列（搜索模式表格没有“全国順位”，多人表格额外带玩家列）
+REQUIRED_COLS = ["コース", "ルート", "タイム", "タイム評価", "記録車種", "記録日"]
+
+
+def _init_worker(quality: Optional[str] = None, rows_per_page: Optional[int] = None):
+    """工作进程启动时设置渲染质量与分页，并预加载字体和全部等级图片，之后每张表都直接复用"""
+    if quality:
+        core.CONFIG["render_quality"] = quality
+    if rows_per_page:
+        core.CONFIG["rows_per_page"] = rows_per_page
+    core.preload_resources()
+
+
+def _read_table_csv(csv_path: str) -> pd.DataFrame:
+    df = pd.read_csv(csv_path, encoding="utf-8-sig")
+    missing = [col for col in REQUIRED_COLS if col not in df.columns]
+    if missing:
+        raise ValueError(f"CSV文件缺少必要列：{missing}")
+    warn_bad_times(df["タイム"], os.path.basename(csv_path))
+    return df
+
+
+def _render_job(name: str, source: Union[pd.DataFrame, str], out_dir: str) -> List[str]:
+    """分段渲染一个任务并流式写入PNG；多人表格按玩家拆分为多张图片"""
+    df = _read_table_csv(source) if isinstance(source, str) else source
+    if PLAYER_COLUMN not in df.columns:
+        return core.save_table_image(df, os.path.join(out_dir, f"{name}.png"))
+    paths = []
+    for player_paths in core.save_player_table_images(df, out_dir, name).values():
+        paths.extend(player_paths)
+    return paths
+
+
+def collect_csv_jobs(inputs: Iterable[str]) -> List[Tuple[str, str]]:
+    """把CSV文件或目录展开为 (任务名, CSV路径) 列表，任务名取文件名"""
+    jobs = []
+    for path in inputs:
+        if os.path.isdir(path):
+            csv_files = sorted(f for f in os.listdir(path) if f.lower().endswith(".csv"))
+            jobs.extend((os.path.splitext(f)[0], os.path.join(path, f)) for f in csv_files)
+        else:
+            jobs.append((os.path.splitext(os.path.basename(path))[0], path))
+    return jobs
+
+
+def render_batch(jobs: Iterable[Tuple[str, Union[pd.DataFrame, str]]], out_dir: str, workers: Optional[int] = None,
+                 quality: Optional[str] = None,
+                 rows_per_page: Optional[int] = None) -> Iterator[Tuple[str, Union[List[str], Exception]]]:
+    """
+    在进程池中并行渲染多张表格，任务为 (任务名, DataFrame 或 CSV 路径)
+    每完成一个任务立即产出 (任务名, 图片路径列表)，失败的任务产出 (任务名, 异常)
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(quality, rows_per_page)) as pool:
+        futures = {pool.submit(_render_job, name, source, out_dir): name for name, source in jobs}
+        for future in as_completed(futures):
+            try:
+                yield futures[future], future.result()
+            except Exception as e:
+                yield futures[future], e
+
+
+def dry_run(jobs: Iterable[Tuple[str, Union[pd.DataFrame, str]]], quality: Optional[str] = None,
+            rows_per_page: Optional[int] = None) -> int:
+    """逐个读取并校验任务、生成渲染计划，打印每张图片的估算结果"""
+    if rows_per_page:
+        core.CONFIG["rows_per_page"] = rows_per_page
+    failed = 0
+    for name, source in jobs:
+        try:
+            df = _read_table_csv(source) if isinstance(source, str) else source
+            for image_name, estimate in core.estimate_table_outputs(df, name, quality).items():
+                print(core.format_render_estimate(image_name, estimate))
+        except Exception as e:
+            failed += 1
+            print(f"❌ {name} 校验失败：{e}")
+    return 1 if failed else 0
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="批量把DAC成绩CSV渲染为表格图片")
+    parser.add_argument("inputs", nargs="+", help="CSV文件或包含CSV的目录")
+    parser.add_argument("-o", "--output-dir", default=".", help="图片保存目录（默认当前目录）")
+    parser.add_argument("-j", "--workers", type=int, default=None, help="并行进程数（默认CPU核数）")
+    parser.add_argument("-q", "--quality", choices=list(core.RENDER_QUALITIES), help="渲染质量（默认取 core.CONFIG）")
+    parser.add_argument("--rows-per-page", type=int, help="每张图片最多的行数，超过时拆分为多张")
+    parser.add_argument("--dry-run", action="store_true", help="只校验CSV并估算图片尺寸与内存，不绘制")
+    args = parser.parse_args(argv)
+
+    jobs = collect_csv_jobs(args.inputs)
+    if not jobs:
+        print("❌ 未找到任何CSV文件")
+        return 1
+
+    if args.dry_run:
+        return dry_run(jobs, args.quality, args.rows_per_page)
+
+    start_time = time.time()
+    failed = 0
+    results = render_batch(jobs, args.output_dir, args.workers, args.quality, args.rows_per_page)
+    for finished, (name, result) in enumerate(results, start=1):
+        if isinstance(result, Exception):
+            failed += 1
+            print(f"❌ [{finished}/{len(jobs)}] {name} 渲染失败：{result}")
+        else:
+            for img_path in result:
+                print(f"✅ [{finished}/{len(jobs)}] {img_path}")
+
+    print(f"🎨 批量渲染完成：成功{len(jobs) - failed}个，失败{failed}个，总耗时 {core.format_time(time.time() - start_time)}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
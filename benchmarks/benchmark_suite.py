@@ -0,0 +1,276 @@
+"""
+可复现的端到端基准：爬取走本地模拟服务（benchmarks/mock_server.py），不依赖真实站点与网络状况
+场景覆盖 crawl_data（按排名爬取）、crawl_data_by_search（按名字搜索）、create_table_image（整图渲染）
+与 save_table_image（分段渲染并流式写出），每个 (场景, 行数) 在独立子进程中运行，报告吞吐量、
+p50/p99 延迟与峰值内存。行数对爬取场景为每条赛道的榜单行数，对搜索场景为该玩家的记录数，
+对渲染场景为表格行数。结果连同提交号与参数保存为 JSON，之后用 --check 对比不同提交
+
+    python benchmarks/benchmark_suite.py --save benchmarks/suite_baseline.json
+    python benchmarks/benchmark_suite.py --check benchmarks/suite_baseline.json
+    python benchmarks/benchmark_suite.py --scenarios crawl_data --rows 500 --latency 0.02 --failure-rate 0.05
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Dict, List
+
+REPO_ROOT = os.path.dirname(os.path.abspath(os.path.dirname(__file__)))
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, REPO_ROOT)
+sys.path.insert(0, BENCH_DIR)
+
+SCENARIOS = ("crawl_data", "crawl_data_by_search", "create_table_image", "save_table_image")
+CRAWL_SCENARIOS = ("crawl_data", "crawl_data_by_search")
+SEASON = 5
+
+# 对比时各指标变差的方向：吞吐量越低越差，延迟与内存越高越差
+CHECKED_METRICS = {"throughput": -1, "p50_ms": 1, "p99_ms": 1, "peak_rss_mb": 1}
+
+
+def _quantile(sorted_values: List[float], q: float) -> float:
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(q * len(sorted_values)))]
+
+
+def _latency_stats(seconds: List[float]) -> Dict[str, float]:
+    seconds = sorted(seconds)
+    return {"p50_ms": _quantile(seconds, 0.5) * 1000, "p99_ms": _quantile(seconds, 0.99) * 1000}
+
+
+# ---------- 子进程 ----------
+
+def _configure_spider(args, api_url: str, web_url: str):
+    import spider
+    config = spider.CONFIG
+    config["api_url"] = api_url
+    config["base_web_url"] = web_url
+    config["target_courses"] = config["target_courses"][:args.courses]
+    # 每次都真正发出请求，也不留下断点日志和车型字典
+    config["cache"]["enabled"] = False
+    spider.CAR_STYLES.path = None
+    config["journal"]["enabled"] = False
+    config["results_store"]["enabled"] = False
+    config["rate_limit"]["rate"] = config["rate_limit"]["burst"] = args.client_rate
+    config["crawl_mode"] = args.crawl_mode or config["crawl_mode"]
+    config["transport"]["kind"] = args.transport or config["transport"]["kind"]
+    if args.workers:
+        config["max_workers"] = config["per_host_limit"] = args.workers
+
+
+def _crawl_worker(args, scenario: str, rows: int, api_url: str, web_url: str) -> Dict:
+    import spider
+    import spider_search
+    from instrumentation import METRICS
+
+    _configure_spider(args, api_url, web_url)
+    METRICS.enable()
+    runs = []
+    for _ in range(args.repeat):
+        METRICS.reset()
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            if scenario == "crawl_data":
+                df = spider.crawl_data(list(args.players), season=SEASON)
+            else:
+                df = spider_search.crawl_data_by_search(args.players[0], season=SEASON)
+        seconds = time.perf_counter() - start
+        latencies = METRICS.values("crawl_request_seconds")
+        runs.append(dict(_latency_stats(latencies), seconds=seconds, requests=len(latencies),
+                         result_rows=len(df), throughput=len(latencies) / seconds if seconds else 0.0))
+    return dict(min(runs, key=lambda run: run["seconds"]), unit="req/s")
+
+
+def _render_worker(args, scenario: str, rows: int) -> Dict:
+    import core
+    from render_benchmark import make_sample_table
+
+    df = make_sample_table(rows)
+    quality = args.quality or core.CONFIG["render_quality"]
+    core.preload_resources(quality)
+    out_dir = tempfile.mkdtemp(prefix="dac_suite_")
+    timings = []
+    try:
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            if scenario == "create_table_image":
+                core.create_table_image(df, quality)
+            else:
+                with contextlib.redirect_stdout(io.StringIO()):
+                    core.save_table_image(df, os.path.join(out_dir, "table.png"), quality)
+            timings.append(time.perf_counter() - start)
+    finally:
+        for name in os.listdir(out_dir):
+            os.remove(os.path.join(out_dir, name))
+        os.rmdir(out_dir)
+    best = min(timings)
+    return dict(_latency_stats(timings), seconds=best, result_rows=rows, throughput=rows / best, unit="rows/s")
+
+
+def run_worker(args, scenario: str, rows: int, api_url: str, web_url: str):
+    os.chdir(REPO_ROOT)
+    from render_benchmark import peak_rss_mb
+
+    if scenario in CRAWL_SCENARIOS:
+        result = _crawl_worker(args, scenario, rows, api_url, web_url)
+    else:
+        result = _render_worker(args, scenario, rows)
+    result["peak_rss_mb"] = peak_rss_mb()
+    print(json.dumps(result))
+
+
+# ---------- 主进程 ----------
+
+def _git_revision() -> Dict[str, object]:
+    def git(*command) -> str:
+        result = subprocess.run(["git", *command], cwd=REPO_ROOT, capture_output=True, text=True)
+        return result.stdout.strip() if result.returncode == 0 else ""
+    return {"commit": git("rev-parse", "--short", "HEAD") or None,
+            "dirty": bool(git("status", "--porcelain", "--untracked-files=no"))}
+
+
+def _worker_argv(args) -> List[str]:
+    argv = ["--repeat", str(args.repeat), "--courses", str(args.courses), "--client-rate", str(args.client_rate),
+            "--players", *args.players]
+    for flag, value in (("--crawl-mode", args.crawl_mode), ("--transport", args.transport),
+                        ("--workers", args.workers), ("--quality", args.quality)):
+        if value:
+            argv += [flag, str(value)]
+    return argv
+
+
+def run_scenario(args, scenario: str, rows: int) -> Dict:
+    from mock_server import MockArcadeZone
+
+    server = None
+    api_url = web_url = "-"
+    if scenario in CRAWL_SCENARIOS:
+        import spider
+        server = MockArcadeZone(
+            rows=rows if scenario == "crawl_data" else 100, per_page=args.per_page,
+            courses=spider.CONFIG["target_courses"][:args.courses], players=args.players,
+            search_hits=rows if scenario == "crawl_data_by_search" else None,
+            latency=args.latency, jitter=args.jitter, failure_rate=args.failure_rate,
+            retry_after=args.retry_after, seed=args.seed,
+        ).start()
+        api_url, web_url = server.api_url, server.web_url
+    try:
+        result = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), *_worker_argv(args),
+             "--worker", scenario, str(rows), api_url, web_url],
+            capture_output=True, text=True, encoding="utf-8"
+        )
+    finally:
+        if server is not None:
+            server.stop()
+    if result.returncode != 0:
+        raise RuntimeError(f"{scenario} {rows}行运行失败：\n{result.stderr[-2000:]}")
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def compare(baseline: Dict, results: Dict, tolerance: float) -> List[str]:
+    """逐项对比，返回超出容差的回退说明，同时打印变化比例"""
+    regressions = []
+    print(f"\n对比基准（提交 {baseline.get('meta', {}).get('commit')}）：")
+    print(f"{'场景':<28} {'吞吐量':>9} {'p50':>9} {'p99':>9} {'峰值内存':>9}")
+    for key, result in results.items():
+        previous = baseline.get("results", {}).get(key)
+        if not previous:
+            continue
+        cells = []
+        for metric, direction in CHECKED_METRICS.items():
+            old, new = previous.get(metric), result.get(metric)
+            if not old or new is None:
+                cells.append(f"{'n/a':>9}")
+                continue
+            change = new / old - 1
+            cells.append(f"{change:>+9.1%}")
+            # p99 在样本少时波动大，只作参考，不判定回退
+            if metric != "p99_ms" and change * direction > tolerance:
+                regressions.append(f"{key} {metric}：{old:.1f} → {new:.1f}（{change:+.1%}）")
+        print(f"{key:<28} " + " ".join(cells))
+    return regressions
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="爬取与渲染的可复现基准（使用本地模拟服务）")
+    parser.add_argument("--scenarios", nargs="+", choices=SCENARIOS, default=list(SCENARIOS),
+                        help="测试的场景（默认全部）")
+    parser.add_argument("--rows", type=int, nargs="+", default=[10, 100, 10000], help="各场景的行数")
+    parser.add_argument("--repeat", type=int, default=3, help="每项重复次数（取最快的一次）")
+    parser.add_argument("--courses", type=int, default=48, help="爬取的赛道数（取等级标准库的前N条）")
+    parser.add_argument("--players", nargs="+", default=["benchmark", "rival"], help="爬取的目标玩家")
+    parser.add_argument("--crawl-mode", choices=["full", "early_stop", "locate"], help="爬取模式（默认沿用配置）")
+    parser.add_argument("--transport", choices=["requests", "asyncio"], help="传输层（默认沿用配置）")
+    parser.add_argument("--workers", type=int, help="并发请求数（默认沿用配置）")
+    parser.add_argument("--client-rate", type=float, default=1000, help="客户端限流（每秒请求数），默认不成为瓶颈")
+    parser.add_argument("--quality", help="渲染质量（默认direct；supersample 在1万行时需要约7GB内存）",
+                        default="direct")
+    parser.add_argument("--per-page", type=int, default=15, help="模拟服务每页条数")
+    parser.add_argument("--latency", type=float, default=0.0, help="模拟服务每个请求的固定延迟（秒）")
+    parser.add_argument("--jitter", type=float, default=0.0, help="模拟服务的随机附加延迟上限（秒）")
+    parser.add_argument("--failure-rate", type=float, default=0.0, help="模拟服务请求失败的比例")
+    parser.add_argument("--retry-after", type=float, default=0.1, help="模拟服务429响应的 Retry-After 秒数")
+    parser.add_argument("--seed", type=int, default=0, help="模拟数据的随机种子")
+    parser.add_argument("--save", help="把结果保存为JSON（含提交号与参数）")
+    parser.add_argument("--check", help="与保存的结果对比，超出容差时返回1")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="允许变差的比例（默认0.25）")
+    parser.add_argument("--worker", nargs=4, metavar=("SCENARIO", "ROWS", "API_URL", "WEB_URL"),
+                        help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.worker:
+        scenario, rows, api_url, web_url = args.worker
+        run_worker(args, scenario, int(rows), api_url, web_url)
+        return 0
+
+    params = {key: value for key, value in vars(args).items()
+              if key not in ("scenarios", "rows", "save", "check", "tolerance", "worker")}
+    meta = dict(_git_revision(), python=platform.python_version(), platform=platform.platform(),
+                cpus=os.cpu_count(), params=params)
+    print(f"提交 {meta['commit']}{'（有未提交的修改）' if meta['dirty'] else ''}，Python {meta['python']}，"
+          f"{meta['cpus']}核")
+    print(f"{'场景':<28} {'耗时(s)':>8} {'吞吐量':>16} {'p50(ms)':>9} {'p99(ms)':>9} {'峰值内存(MB)':>13} {'结果行数':>8}")
+
+    results = {}
+    for scenario in args.scenarios:
+        for rows in args.rows:
+            key = f"{scenario}@{rows}"
+            try:
+                result = run_scenario(args, scenario, rows)
+            except RuntimeError as e:
+                print(f"❌ {e}")
+                return 1
+            results[key] = result
+            rss = f"{result['peak_rss_mb']:.1f}" if result["peak_rss_mb"] is not None else "n/a"
+            throughput = f"{result['throughput']:.1f} {result['unit']}"
+            print(f"{key:<28} {result['seconds']:>8.3f} {throughput:>16} {result['p50_ms']:>9.1f} "
+                  f"{result['p99_ms']:>9.1f} {rss:>13} {result['result_rows']:>8}")
+
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump({"meta": meta, "results": results}, f, ensure_ascii=False, indent=2)
+        print(f"✅ 结果已保存至：{args.save}")
+
+    if args.check:
+        with open(args.check, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        if baseline.get("meta", {}).get("params") != params:
+            print("⚠️ 基准文件的测试参数与本次不同，对比结果仅供参考")
+        regressions = compare(baseline, results, args.tolerance)
+        if regressions:
+            print("❌ 性能回退：\n" + "\n".join(regressions))
+            return 1
+        print("✅ 各项指标未超出容差")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,295 @@
+"""
+本地模拟的 ArcadeZone 排行榜服务，供基准测试与离线调试使用
+实现与真实站点相同的协议：GET 页面带 csrf-token meta，POST /ranking/timetrial 返回
+list / carStyles / pagination；可配置响应延迟、每条赛道的榜单行数、每页条数与失败率。
+榜单内容由 seed 决定、按需生成（不占用内存），同样的参数在任何提交上都得到同样的数据
+
+    python benchmarks/mock_server.py --port 8765 --rows 500 --latency 0.02 --failure-rate 0.05
+
+之后把 spider.CONFIG 的 api_url / base_web_url 指向该地址即可
+"""
+import argparse
+import hashlib
+import json
+import random
+import re
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional, Sequence
+
+DEFAULT_COURSES = list(range(0, 96, 2))
+DEFAULT_PLAYERS = ("benchmark", "rival")
+CAR_STYLES = {
+    "0": "TOYOTA SPRINTER TRUENO GT-APEX (AE86)",
+    "1": "MAZDA RX-7 Type R (FD3S)",
+    "2": "NISSAN SKYLINE GT-R V-spec II (BNR34)",
+    "3": "SUBARU IMPREZA WRX STi",
+    "4": "MITSUBISHI LANCER Evolution III",
+    "5": "HONDA S2000",
+}
+
+
+class MockArcadeZone:
+    """
+    模拟排行榜服务（在后台线程中运行）
+    rows 为每条赛道的榜单行数；players 中的玩家在每条赛道的榜单中各出现一次（位置由 seed 决定），
+    按名字搜索时每名玩家共有 search_hits 条记录（均分到各赛道）；
+    failure_rate 为请求失败的比例，失败的请求随机返回 429（带 Retry-After）或 503，
+    是否失败只取决于请求内容与该请求的第几次重试，与并发顺序无关
+    """
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, rows: int = 100, per_page: int = 15,
+                 courses: Sequence[int] = DEFAULT_COURSES, players: Sequence[str] = DEFAULT_PLAYERS,
+                 search_hits: Optional[int] = None, latency: float = 0.0, jitter: float = 0.0,
+                 failure_rate: float = 0.0, retry_after: float = 0.1, token_ttl: int = 0,
+                 all_course_search: bool = True, seed: int = 0):
+        self.rows = max(1, rows)
+        self.per_page = per_page
+        self.courses = list(courses)
+        self.players = list(players)
+        self.search_hits = len(self.courses) if search_hits is None else search_hits
+        self.latency = latency
+        self.jitter = jitter
+        self.failure_rate = failure_rate
+        self.retry_after = retry_after
+        self.token_ttl = token_ttl  # 每处理多少个POST后令Token失效（0为不失效）
+        self.all_course_search = all_course_search
+        self.seed = seed
+
+        rng = random.Random(seed)
+        # 每条赛道上各目标玩家所在的名次（互不重复）
+        self._placements = {
+            course: dict(zip(rng.sample(range(self.rows), min(len(self.players), self.rows)), self.players))
+            for course in self.courses
+        }
+        self._lock = threading.Lock()
+        self._token_index = 0
+        self._attempts = {}
+        self.stats = {"get": 0, "post": 0, "ok": 0, "failed": 0, "expired": 0}
+
+        self._server = ThreadingHTTPServer((host, port), self._handler_class())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    # ---------- 生命周期 ----------
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def api_url(self) -> str:
+        return f"{self.base_url}/ranking/timetrial"
+
+    @property
+    def web_url(self) -> str:
+        return f"{self.base_url}/ranking#timetrial"
+
+    def start(self) -> "MockArcadeZone":
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def serve_forever(self):
+        """在当前线程中运行，直到 Ctrl+C（命令行使用）"""
+        try:
+            self._server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+
+    def configure_spider(self, config: Dict):
+        """把 spider.CONFIG 指向本服务"""
+        config["api_url"] = self.api_url
+        config["base_web_url"] = self.web_url
+        config["target_courses"] = list(self.courses)
+
+    # ---------- 数据 ----------
+
+    @property
+    def token(self) -> str:
+        return f"mock{self.seed:04d}{self._token_index:08d}"
+
+    def entry(self, course: int, index: int, username: Optional[str] = None) -> Dict:
+        """赛道 course 第 index 名（从0开始）的成绩，成绩随名次单调变慢"""
+        if username is None:
+            username = self._placements[course].get(index, f"p{course}_{index}")
+        return {
+            "userinfo": {"username": username},
+            "style_car_id": (index + course) % len(CAR_STYLES),
+            "goal_time": 90000 + course * 1000 + index * 37,
+            "play_dt": f"2025-{index % 12 + 1:02d}-{index % 28 + 1:02d} {index % 24:02d}:00:00",
+            "course_id": course,
+        }
+
+    def board_page(self, courses: List[int], page: int) -> Dict:
+        """多条赛道的榜单首尾相接后按页切分（不带 course 时为全部赛道）"""
+        total = self.rows * len(courses)
+        start = (page - 1) * self.per_page
+        items = [self.entry(courses[offset // self.rows], offset % self.rows)
+                 for offset in range(start, min(total, start + self.per_page))]
+        return self._page(items, page, total)
+
+    def search_page(self, name: str, courses: List[int], page: int) -> Dict:
+        """按名字搜索：该玩家的 search_hits 条记录均分到各赛道，名次沿用榜单中的位置"""
+        if name not in self.players:
+            return self._page([], page, 0)
+        hits = []
+        for course in courses:
+            position = self.courses.index(course)
+            share = self.search_hits // len(self.courses) + (position < self.search_hits % len(self.courses))
+            rank = next((index for index, player in self._placements[course].items() if player == name), 0)
+            hits.extend((course, rank + offset) for offset in range(share))
+        start = (page - 1) * self.per_page
+        items = [self.entry(course, index, name) for course, index in hits[start:start + self.per_page]]
+        return self._page(items, page, len(hits))
+
+    def _page(self, items: List[Dict], page: int, total: int) -> Dict:
+        return {
+            "list": items,
+            "carStyles": CAR_STYLES,
+            "pagination": {
+                "per_page": self.per_page,
+                "last_page": max(1, -(-total // self.per_page)),
+                "total": total,
+                "current_page": page,
+            },
+        }
+
+    def _failure(self, payload: Dict) -> Optional[int]:
+        """本次请求应返回的错误状态码（不失败时为 None）"""
+        if self.failure_rate <= 0:
+            return None
+        key = json.dumps(payload, sort_keys=True)
+        with self._lock:
+            attempt = self._attempts.get(key, 0)
+            self._attempts[key] = attempt + 1
+        digest = hashlib.sha1(f"{self.seed}:{key}:{attempt}".encode()).digest()
+        if int.from_bytes(digest[:4], "big") / 2 ** 32 >= self.failure_rate:
+            return None
+        return 429 if digest[4] % 2 else 503
+
+    def _delay(self):
+        if self.latency <= 0 and self.jitter <= 0:
+            return
+        time.sleep(self.latency + random.uniform(0, self.jitter))
+
+    # ---------- HTTP ----------
+
+    def _handler_class(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            # 响应头与正文分两次写出，不关闭 Nagle 时会被延迟确认拖慢约40ms
+            disable_nagle_algorithm = True
+
+            def log_message(self, *args):
+                pass
+
+            def _send(self, code: int, body: bytes = b"", content_type: str = "application/json",
+                      headers: Optional[Dict[str, str]] = None):
+                self.send_response(code)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                for key, value in (headers or {}).items():
+                    self.send_header(key, value)
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_GET(self):
+                with server._lock:
+                    server.stats["get"] += 1
+                    token = server.token
+                html = (f'<html><head><title>ArcadeZone</title><meta content="{token}" name="csrf-token">'
+                        f'</head><body></body></html>')
+                self._send(200, html.encode(), "text/html; charset=utf-8")
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length", 0))
+                try:
+                    payload = json.loads(self.rfile.read(length).decode("utf-8"))
+                except ValueError:
+                    return self._send(400, b"bad request", "text/plain")
+                server._delay()
+
+                with server._lock:
+                    server.stats["post"] += 1
+                    valid = self.headers.get("X-CSRF-TOKEN") == server.token
+                    if valid and server.token_ttl and server.stats["post"] % server.token_ttl == 0:
+                        server._token_index += 1
+                    if not valid:
+                        server.stats["expired"] += 1
+                if not valid:
+                    return self._send(419, b"page expired", "text/plain")
+                if re.sub(r"/+$", "", self.path.split("?")[0]) != "/ranking/timetrial":
+                    return self._send(404, b"not found", "text/plain")
+
+                status = server._failure(payload)
+                if status is not None:
+                    with server._lock:
+                        server.stats["failed"] += 1
+                    if status == 429:
+                        return self._send(429, b"", "text/plain", {"Retry-After": f"{server.retry_after:g}"})
+                    return self._send(503, b"service unavailable", "text/plain")
+
+                page = max(1, int(payload.get("page", 1)))
+                if "course" in payload:
+                    courses = [int(payload["course"])] if int(payload["course"]) in server._placements else []
+                elif server.all_course_search:
+                    courses = server.courses
+                else:
+                    courses = server.courses[:1]
+                if payload.get("name"):
+                    data = server.search_page(payload["name"], courses, page)
+                else:
+                    data = server.board_page(courses, page)
+                with server._lock:
+                    server.stats["ok"] += 1
+                self._send(200, json.dumps(data, ensure_ascii=False).encode("utf-8"))
+
+        return Handler
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="本地模拟的 ArcadeZone 排行榜服务")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--rows", type=int, default=100, help="每条赛道的榜单行数")
+    parser.add_argument("--per-page", type=int, default=15, help="每页条数")
+    parser.add_argument("--players", nargs="+", default=list(DEFAULT_PLAYERS), help="出现在榜单中的目标玩家")
+    parser.add_argument("--search-hits", type=int, help="按名字搜索时每名玩家的记录数（默认每条赛道1条）")
+    parser.add_argument("--latency", type=float, default=0.0, help="每个POST的固定延迟（秒）")
+    parser.add_argument("--jitter", type=float, default=0.0, help="在固定延迟上追加的随机延迟上限（秒）")
+    parser.add_argument("--failure-rate", type=float, default=0.0, help="请求失败（429/503）的比例")
+    parser.add_argument("--retry-after", type=float, default=0.1, help="429响应的 Retry-After 秒数")
+    parser.add_argument("--token-ttl", type=int, default=0, help="每处理多少个POST后令CSRF Token失效（0为不失效）")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    server = MockArcadeZone(
+        host=args.host, port=args.port, rows=args.rows, per_page=args.per_page, players=args.players,
+        search_hits=args.search_hits, latency=args.latency, jitter=args.jitter,
+        failure_rate=args.failure_rate, retry_after=args.retry_after, token_ttl=args.token_ttl, seed=args.seed,
+    )
+    print(f"✅ 模拟服务已启动：{server.api_url}（榜单{args.rows}行/赛道，玩家：{', '.join(args.players)}）")
+    server.serve_forever()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,156 @@
+"""
+表格渲染基准：比较各渲染质量模式的耗时、峰值内存和与原方式（supersample）的画面差异
+每个 (模式, 行数) 在独立子进程中运行，峰值内存互不影响
+
+    python benchmarks/render_benchmark.py --rows 48 500 2000 --repeat 3
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+from PIL import Image
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+
+def peak_rss_mb() -> Optional[float]:
+    """当前进程的峰值内存（MB），平台不支持时返回None"""
+    # Linux 上 ru_maxrss 会继承父进程的峰值，优先读取 exec 后重新计数的 VmHWM
+    try:
+        with open("/proc/self/status", "r", encoding="utf-8") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    try:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # macOS 单位为字节，Linux 为KB
+        return peak / 1024 / 1024 if sys.platform == "darwin" else peak / 1024
+    except ImportError:
+        pass
+    try:
+        import psutil
+        return psutil.Process().memory_info().peak_wset / 1024 / 1024
+    except (ImportError, AttributeError):
+        return None
+
+
+def make_sample_table(rows: int, seed: int = 0) -> pd.DataFrame:
+    """按等级标准库的赛道随机生成成绩表，用于渲染测试"""
+    import spider
+    from timefmt import ms_to_times
+
+    rng = np.random.default_rng(seed)
+    course_ids = rng.choice(spider.CONFIG["target_courses"], rows)
+    goal_times = rng.integers(100000, 200000, rows)
+    return pd.DataFrame({
+        "コース": [spider.CONFIG["course_name_map"][course_id] for course_id in course_ids],
+        "ルート": [spider.CONFIG["course_direction_map"][course_id] for course_id in course_ids],
+        "タイム": ms_to_times(goal_times),
+        "タイム評価": rng.choice(list(spider.CONFIG["rank_priority"]) + ["ROOKIE"], rows),
+        "記録車種": rng.choice(["TOYOTA SPRINTER TRUENO GT-APEX (AE86)", "MAZDA RX-7 Type R (FD3S)",
+                               "NISSAN SKYLINE GT-R V-spec II (BNR34)", "SUBARU IMPREZA WRX STi"], rows),
+        "全国順位": rng.integers(1, 5000, rows).astype(str),
+        "記録日": pd.Timestamp("2025-01-01") + pd.to_timedelta(rng.integers(0, 365, rows), unit="D"),
+    }).assign(記録日=lambda df: df["記録日"].dt.strftime("%Y-%m-%d"))
+
+
+def run_worker(quality: str, rows: int, repeat: int, out_path: str):
+    """子进程：渲染 repeat 次取最短耗时，保存最后一次的图片"""
+    os.chdir(REPO_ROOT)
+    import core
+
+    df = make_sample_table(rows)
+    core.preload_resources(quality)
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        img = core.create_table_image(df, quality)
+        best = min(best, time.perf_counter() - start)
+    img.save(out_path)
+    print(json.dumps({"seconds": best, "peak_rss_mb": peak_rss_mb(), "size": img.size,
+                      "text_hit_rate": core.text_cache_stats()["hit_rate"]}))
+
+
+def compare(reference_path: str, path: str, band: int = 512) -> dict:
+    """逐段比较两张图片，返回平均绝对误差与PSNR（避免整图转为浮点数组占用大量内存）"""
+    reference = np.asarray(Image.open(reference_path).convert("RGB"))
+    image = np.asarray(Image.open(path).convert("RGB"))
+    if reference.shape != image.shape:
+        return {"mae": None, "psnr": None}
+    abs_sum = sq_sum = 0
+    for top in range(0, reference.shape[0], band):
+        diff = reference[top:top + band].astype(np.int32) - image[top:top + band]
+        abs_sum += int(np.abs(diff).sum())
+        sq_sum += int((diff * diff).sum())
+    mse = sq_sum / reference.size
+    return {
+        "mae": abs_sum / reference.size,
+        "psnr": float("inf") if mse == 0 else float(10 * np.log10(255 ** 2 / mse)),
+    }
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="表格渲染质量模式基准测试")
+    parser.add_argument("--rows", type=int, nargs="+", default=[48, 500, 2000], help="测试的表格行数")
+    parser.add_argument("--repeat", type=int, default=3, help="每项重复次数（取最短耗时）")
+    parser.add_argument("--qualities", nargs="+", default=None, help="测试的渲染质量（默认全部）")
+    parser.add_argument("--keep", help="保存渲染结果的目录（默认用完即删）")
+    parser.add_argument("--worker", nargs=3, metavar=("QUALITY", "ROWS", "OUT"), help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.worker:
+        quality, rows, out_path = args.worker
+        run_worker(quality, int(rows), args.repeat, out_path)
+        return 0
+
+    os.chdir(REPO_ROOT)
+    import core
+    qualities = args.qualities or list(core.RENDER_QUALITIES)
+    # 以原方式为画质基准，始终放在第一位
+    qualities = ["supersample"] + [quality for quality in qualities if quality != "supersample"]
+
+    out_dir = args.keep or tempfile.mkdtemp(prefix="dac_render_bench_")
+    os.makedirs(out_dir, exist_ok=True)
+    print(f"{'行数':>6} {'模式':<18} {'耗时(s)':>9} {'峰值内存(MB)':>13} {'MAE':>7} {'PSNR(dB)':>9} {'文字缓存命中率':>8}")
+    for rows in args.rows:
+        reference_path = None
+        for quality in qualities:
+            out_path = os.path.join(out_dir, f"{rows}_{quality}.png")
+            result = subprocess.run(
+                [sys.executable, os.path.abspath(__file__), "--repeat", str(args.repeat),
+                 "--worker", quality, str(rows), out_path],
+                capture_output=True, text=True, encoding="utf-8"
+            )
+            if result.returncode != 0:
+                print(f"❌ {rows}行 {quality} 运行失败：\n{result.stderr}")
+                return 1
+            stats = json.loads(result.stdout.strip().splitlines()[-1])
+            reference_path = reference_path or out_path
+            diff = compare(reference_path, out_path)
+            rss = f"{stats['peak_rss_mb']:.1f}" if stats["peak_rss_mb"] is not None else "n/a"
+            mae = f"{diff['mae']:.2f}" if diff["mae"] is not None else "n/a"
+            psnr = f"{diff['psnr']:.1f}" if diff["psnr"] is not None else "n/a"
+            print(f"{rows:>6} {quality:<18} {stats['seconds']:>9.3f} {rss:>13} {mae:>7} {psnr:>9} "
+                  f"{stats['text_hit_rate']:>8.1%}")
+    if args.keep:
+        print(f"✅ 渲染结果已保存至：{out_dir}")
+    else:
+        for name in os.listdir(out_dir):
+            os.remove(os.path.join(out_dir, name))
+        os.rmdir(out_dir)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
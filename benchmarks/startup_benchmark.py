@@ -0,0 +1,145 @@
+"""
+启动耗时基准：用 python -X importtime 统计各功能路径实际导入的模块耗时
+每个场景在独立的新解释器中运行（不受已导入模块影响），重复多次取最短；
+可保存为基准文件，之后用 --check 对比，导入耗时明显变长时返回非零退出码
+
+    python benchmarks/startup_benchmark.py --repeat 5 --save benchmarks/startup_baseline.json
+    python benchmarks/startup_benchmark.py --check benchmarks/startup_baseline.json
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Dict, List, Set, Tuple
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# 各场景只走到对应功能真正需要的依赖为止，不联网、不弹窗
+SCENARIOS = {
+    # 图形菜单出现前：只导入 core
+    "menu": "import core",
+    # 功能2：读取本地CSV并生成图片
+    "csv": (
+        "import core\n"
+        "df = core.load_csv_data(CSV_PATH)\n"
+        "core.save_table_image(df, OUT_PATH)"
+    ),
+    # 功能1/4：创建爬虫（加载等级标准库与传输层），不发出请求
+    "crawl": (
+        "import core\n"
+        "crawler = core.spider.ArcadeZoneCrawler(target_usernames=['benchmark'], season=5, cache=False)\n"
+        "crawler.close()"
+    ),
+    # 功能3：导入搜索模块
+    "search": "import core\ncore.spider_search.ArcadeZoneSearchCrawler",
+    # 无界面模式解析参数
+    "headless": "import core\ncore.parse_args(['--mode', 'csv', '--input', CSV_PATH])",
+}
+
+
+def parse_importtime(stderr: str, ignore: Set[str] = frozenset()) -> Tuple[float, Dict[str, float]]:
+    """解析 -X importtime 输出，返回 (导入总耗时ms, {顶层模块: 累计耗时ms})，ignore 中的模块不计入"""
+    top_level = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        # 缩进为两个空格的是被其他模块导入的子模块，只统计顶层
+        if name.startswith("  ") or name.strip() in ignore:
+            continue
+        top_level[name.strip()] = top_level.get(name.strip(), 0) + int(cumulative) / 1000
+    return sum(top_level.values()), top_level
+
+
+def _run_importtime(code: str) -> Tuple[str, float]:
+    start = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        cwd=REPO_ROOT, capture_output=True, text=True, encoding="utf-8"
+    )
+    wall_ms = (time.perf_counter() - start) * 1000
+    if result.returncode != 0:
+        raise RuntimeError(f"运行失败：\n{result.stderr[-2000:]}")
+    return result.stderr, wall_ms
+
+
+def interpreter_modules() -> Set[str]:
+    """空解释器启动时就会导入的顶层模块（encodings、site 等），与本项目无关，不计入"""
+    stderr, _ = _run_importtime("pass")
+    return set(parse_importtime(stderr)[1])
+
+
+def run_scenario(name: str, csv_path: str, out_path: str, ignore: Set[str]) -> Dict:
+    code = f"CSV_PATH = {csv_path!r}\nOUT_PATH = {out_path!r}\n" + SCENARIOS[name]
+    stderr, wall_ms = _run_importtime(code)
+    import_ms, modules = parse_importtime(stderr, ignore)
+    return {"import_ms": import_ms, "wall_ms": wall_ms, "modules": modules}
+
+
+def write_sample_csv(path: str, rows: int = 48):
+    from render_benchmark import make_sample_table
+    make_sample_table(rows).to_csv(path, index=False, encoding="utf-8-sig")
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="各功能路径的启动导入耗时基准")
+    parser.add_argument("--scenarios", nargs="+", choices=list(SCENARIOS), default=list(SCENARIOS),
+                        help="测试的场景（默认全部）")
+    parser.add_argument("--repeat", type=int, default=5, help="每个场景重复次数（取最短）")
+    parser.add_argument("--top", type=int, default=5, help="每个场景列出导入最慢的顶层模块数")
+    parser.add_argument("--save", help="把结果保存为基准文件（JSON）")
+    parser.add_argument("--check", help="与基准文件对比，超出容差时返回1")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="允许比基准慢的比例（默认0.25）")
+    parser.add_argument("--slack-ms", type=float, default=20, help="允许比基准慢的绝对毫秒数，吸收计时抖动")
+    args = parser.parse_args(argv)
+
+    tmp_dir = tempfile.mkdtemp(prefix="dac_startup_bench_")
+    csv_path = os.path.join(tmp_dir, "sample.csv")
+    out_path = os.path.join(tmp_dir, "sample.png")
+    write_sample_csv(csv_path)
+
+    results = {}
+    ignore = interpreter_modules()
+    try:
+        for name in args.scenarios:
+            runs = [run_scenario(name, csv_path, out_path, ignore) for _ in range(args.repeat)]
+            results[name] = min(runs, key=lambda run: run["import_ms"])
+    finally:
+        for file_name in os.listdir(tmp_dir):
+            os.remove(os.path.join(tmp_dir, file_name))
+        os.rmdir(tmp_dir)
+
+    print(f"{'场景':<10} {'导入(ms)':>9} {'总耗时(ms)':>10}  最慢的顶层导入")
+    for name, result in results.items():
+        slowest = sorted(result["modules"].items(), key=lambda item: item[1], reverse=True)[:args.top]
+        modules = ", ".join(f"{module} {ms:.0f}" for module, ms in slowest)
+        print(f"{name:<10} {result['import_ms']:>9.1f} {result['wall_ms']:>10.1f}  {modules}")
+
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump({name: {"import_ms": round(result["import_ms"], 1)} for name, result in results.items()},
+                      f, ensure_ascii=False, indent=2)
+        print(f"✅ 基准已保存至：{args.save}")
+
+    if args.check:
+        with open(args.check, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions: List[str] = []
+        for name, result in results.items():
+            if name not in baseline:
+                continue
+            limit = baseline[name]["import_ms"] * (1 + args.tolerance) + args.slack_ms
+            if result["import_ms"] > limit:
+                regressions.append(f"{name}：{result['import_ms']:.1f}ms，超过上限 {limit:.1f}ms")
+        if regressions:
+            print("❌ 启动耗时回退：\n" + "\n".join(regressions))
+            return 1
+        print("✅ 启动耗时未超出基准")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,95 @@
+import json
+import os
+import sys
+import threading
+from typing import Dict, Optional
+
+UNKNOWN_CAR = "未知车型"
+
+
+def parse_car_id(value) -> Optional[int]:
+    """接口中的 style_car_id（整数或数字字符串），缺失或无法解析时返回None"""
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+class CarStyleRegistry:
+    """
+    车型字典（进程内共享，线程安全，持久化为JSON）
+    每个接口响应都附带 carStyles（车型ID→名称），逐页合并到同一字典，每个名称只保存一份；
+    记录中保存整数车型ID，名称统一从这里查，某一页缺少的车型也能用其他页的信息补全。
+    首次使用时才读取文件，出现新车型或名称变化时标记为已修改，save() 时写回
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path
+        self._names = {}
+        self._lock = threading.Lock()
+        self._loaded = path is None
+        self._dirty = False
+
+    def _ensure_loaded(self):
+        if self._loaded or not self.path:
+            return
+        with self._lock:
+            if self._loaded:
+                return
+            try:
+                with open(self.path, "r", encoding="utf-8") as f:
+                    stored = json.load(f)
+                for key, name in stored.items():
+                    car_id = parse_car_id(key)
+                    if car_id is not None:
+                        self._names[car_id] = sys.intern(str(name))
+            except FileNotFoundError:
+                pass
+            except (OSError, ValueError) as e:
+                print(f"⚠️ 读取车型字典失败，将重新收集：{e}")
+            self._loaded = True
+
+    def merge(self, car_styles: Optional[Dict]):
+        """合并一个响应中的 carStyles"""
+        if not car_styles:
+            return
+        self._ensure_loaded()
+        names = self._names
+        with self._lock:
+            for car_id, name in car_styles.items():
+                car_id = parse_car_id(car_id)
+                if car_id is None or name is None or names.get(car_id) == name:
+                    continue
+                names[car_id] = sys.intern(str(name))
+                self._dirty = True
+
+    def name(self, car_id) -> str:
+        self._ensure_loaded()
+        car_id = parse_car_id(car_id)
+        return self._names.get(car_id, UNKNOWN_CAR) if car_id is not None else UNKNOWN_CAR
+
+    def names(self) -> Dict[int, str]:
+        """按车型ID排序的 {ID: 名称}"""
+        self._ensure_loaded()
+        with self._lock:
+            return dict(sorted(self._names.items()))
+
+    def __len__(self) -> int:
+        self._ensure_loaded()
+        return len(self._names)
+
+    def save(self):
+        """有新车型时写回文件（先写临时文件再替换）"""
+        if not self._dirty or not self.path:
+            return
+        names = self.names()
+        registry_dir = os.path.dirname(self.path)
+        if registry_dir:
+            os.makedirs(registry_dir, exist_ok=True)
+        try:
+            with open(self.path + ".tmp", "w", encoding="utf-8") as f:
+                json.dump({str(car_id): name for car_id, name in names.items()}, f, ensure_ascii=False, indent=0)
+            os.replace(self.path + ".tmp", self.path)
+            self._dirty = False
+        except OSError as e:
+            print(f"⚠️ 保存车型字典失败：{e}")
@@ -1,15 +1,48 @@
+from __future__ import annotations
+
+import argparse
+import importlib.util
 import os
-import pandas as pd
-from PIL import Image, ImageDraw, ImageFont
-import tkinter as tk
-from tkinter import filedialog, messagebox
-import subprocess
-import platform
+import socket
 import sys
-from typing import Optional
+from typing import Dict, List, Optional
 from datetime import datetime
+from urllib.parse import urlparse
 import time
 
+from instrumentation import METRICS, PROFILERS, maybe_profile
+from lazy_import import lazy_import
+
+# 较慢的依赖延迟到实际用到时才导入，菜单无需等待 pandas、Pillow 等加载
+pd = lazy_import("pandas")
+Image = lazy_import("PIL.Image")
+ImageDraw = lazy_import("PIL.ImageDraw")
+ImageFont = lazy_import("PIL.ImageFont")
+png_stream = lazy_import("png_stream")
+
+# 无界面模式：不导入tkinter，所有提示输出到控制台
+HEADLESS = False
+
+class _MessageBox:
+    """提示框：图形模式下延迟导入tkinter弹窗，无界面模式下输出到标准错误"""
+    def _show(self, kind: str, title: str, message: str):
+        if HEADLESS:
+            print(f"[{title}] {message}", file=sys.stderr)
+            return
+        from tkinter import messagebox as tk_messagebox
+        getattr(tk_messagebox, kind)(title, message)
+
+    def showinfo(self, title: str, message: str):
+        self._show("showinfo", title, message)
+
+    def showwarning(self, title: str, message: str):
+        self._show("showwarning", title, message)
+
+    def showerror(self, title: str, message: str):
+        self._show("showerror", title, message)
+
+messagebox = _MessageBox()
+
 # 导入spider模块的爬取函数
 try:
     import spider
@@ -17,12 +50,15 @@ except ImportError:
     messagebox.showerror("错误", "未找到spider.py文件，请确保该文件与core.py在同一目录下")
     sys.exit(1)
 
-# 导入新搜索模块（可选）
-try:
-    import spider_search
-    SEARCH_MODULE_AVAILABLE = True
-except ImportError:
-    SEARCH_MODULE_AVAILABLE = False
+from text_cache import TextBitmapCache, render_supersampled_mask, render_text_mask
+# 耗时显示沿用 分'秒"毫秒 格式
+from timefmt import format_duration as format_time, warn_bad_times
+
+# 新搜索模块（可选），选择搜索功能时才导入
+SEARCH_MODULE_AVAILABLE = importlib.util.find_spec("spider_search") is not None
+if SEARCH_MODULE_AVAILABLE:
+    spider_search = lazy_import("spider_search")
+else:
     print("⚠️ 未找到 spider_search.py，搜索功能不可用")
 
 # 全局配置
@@ -39,6 +75,13 @@ CONFIG = {
     "text_color": (0, 0, 0),
     "border_color": (200, 200, 200),
     "scale": 2,
+    # 渲染质量：supersample 整图按 scale 倍绘制后整体缩小（原方式，最慢）；
+    # direct 直接按目标分辨率绘制（文字由字体引擎抗锯齿，等级图片预先缩放好）；
+    # text_supersample 只把文字按 scale 倍绘制后缩小贴入，其余直接绘制
+    "render_quality": "supersample",
+    "strip_rows": 64,  # 保存图片时每段渲染的行数，决定峰值内存
+    "rows_per_page": None,  # 每张图片最多的行数，超过时拆分为多页（None 为不拆分）
+    "text_cache_mb": 64,  # 文字位图缓存容量（MB）
     
     "rank_img_root": r"./assets/rank",
     "rank_img_scale": 0.8,
@@ -62,45 +105,24 @@ CONFIG = {
     "special_col_names": ["タイム", "記録日"],
 }
 
-def format_time(seconds: float) -> str:
-    """格式化时间为 分'秒"毫秒 格式"""
-    minutes = int(seconds // 60)
-    seconds_remainder = seconds % 60
-    whole_seconds = int(seconds_remainder)
-    milliseconds = int((seconds_remainder - whole_seconds) * 1000)
-    
-    if minutes > 0:
-        return f"{minutes}'{whole_seconds:02d}\"{milliseconds:03d}"
-    else:
-        return f"{whole_seconds}\"{milliseconds:03d}"
-
 def get_timestamp() -> str:
     """获取当前时间戳，格式：YYYYMMDD_HHMMSS"""
     return datetime.now().strftime("%Y%m%d_%H%M%S")
 
-def ping_arcadezone() -> bool:
-    """检查网络连接"""
-    host = "arcadezone.cn"
-    param = "-n" if platform.system().lower() == "windows" else "-c"
-    command = ["ping", param, "4", host]
-    
+def ping_arcadezone(timeout: float = 3) -> bool:
+    """检查网络连接（对API主机做一次TCP连接，无需调用系统ping）"""
+    api_url = urlparse(spider.CONFIG["api_url"])
+    port = api_url.port or (443 if api_url.scheme == "https" else 80)
     try:
-        output = subprocess.run(
-            command,
-            capture_output=True,
-            text=True,
-            timeout=10
-        )
-        if (platform.system().lower() == "windows" and "TTL=" in output.stdout) or \
-           (platform.system().lower() != "windows" and "0% packet loss" in output.stdout):
+        with socket.create_connection((api_url.hostname, port), timeout=timeout):
             return True
-        else:
-            return False
-    except Exception:
+    except OSError:
         return False
 
 def select_csv_file() -> str:
     """选择CSV文件"""
+    import tkinter as tk
+    from tkinter import filedialog
     root = tk.Tk()
     root.withdraw()
     file_path = filedialog.askopenfilename(
@@ -114,6 +136,8 @@ def select_csv_file() -> str:
 
 def select_save_dir() -> str:
     """选择保存目录"""
+    import tkinter as tk
+    from tkinter import filedialog
     root = tk.Tk()
     root.withdraw()
     save_dir = filedialog.askdirectory(title="选择图片保存目录")
@@ -129,6 +153,7 @@ def load_csv_data(csv_path: str) -> pd.DataFrame:
         required_cols = ["コース", "ルート", "タイム", "タイム評価", "記録車種", "全国順位", "記録日"]
         if not all(col in df.columns for col in required_cols):
             raise ValueError(f"CSV文件缺少必要列，需包含：{required_cols}")
+        warn_bad_times(df["タイム"], os.path.basename(csv_path))
         return df
     except Exception as e:
         messagebox.showerror("错误", f"读取CSV失败：{str(e)}")
@@ -141,17 +166,60 @@ def load_csv_data_no_rank(csv_path: str) -> pd.DataFrame:
         required_cols = ["コース", "ルート", "タイム", "タイム評価", "記録車種", "記録日"]
         if not all(col in df.columns for col in required_cols):
             raise ValueError(f"CSV文件缺少必要列，需包含：{required_cols}")
+        warn_bad_times(df["タイム"], os.path.basename(csv_path))
         return df
     except Exception as e:
         messagebox.showerror("错误", f"读取CSV失败：{str(e)}")
         sys.exit(1)
 
-def load_rank_image(rank_text: str, target_height: int) -> Optional[Image.Image]:
-    """加载等级图片"""
+RENDER_QUALITIES = ("supersample", "direct", "text_supersample")
+
+# 进程级资源缓存：预缩放的等级图片和已加载的字体只解码、缩放一次，
+# 键中包含绘制倍数与渲染参数 (row_height, rank_img_scale)，参数变化时自动使用新资源
+_RESOURCE_CACHE = {}
+# 文字位图缓存：重复出现的单元格文字只光栅化一次，同一进程渲染的所有图片共用
+_TEXT_CACHE = TextBitmapCache(CONFIG["text_cache_mb"] * 1024 * 1024)
+
+def _resource_key(*parts) -> tuple:
+    return parts + (CONFIG["row_height"], CONFIG["rank_img_scale"])
+
+def _render_scales(quality: Optional[str] = None) -> tuple:
+    """返回 (画布绘制倍数, 文字绘制倍数)"""
+    quality = quality or CONFIG["render_quality"]
+    if quality not in RENDER_QUALITIES:
+        raise ValueError(f"未知渲染质量：{quality}，可选：{', '.join(RENDER_QUALITIES)}")
+    if quality == "supersample":
+        return CONFIG["scale"], CONFIG["scale"]
+    if quality == "text_supersample":
+        return 1, CONFIG["scale"]
+    return 1, 1
+
+def preload_resources(quality: Optional[str] = None):
+    """预加载当前渲染质量所需的全部字体和等级图片（批量渲染的工作进程启动时调用）"""
+    canvas_scale, text_scale = _render_scales(quality)
+    for font_type in CONFIG["font_files"]:
+        load_font(font_type, text_scale)
+    for rank_text in CONFIG["rank_mapping"]:
+        load_rank_image(rank_text, 0, canvas_scale)
+
+def clear_resource_cache():
+    """清空字体、等级图片与文字位图缓存（修改资源文件后调用）"""
+    _RESOURCE_CACHE.clear()
+    _TEXT_CACHE.clear()
+
+def load_rank_image(rank_text: str, target_height: int, scale: Optional[int] = None) -> Optional[Image.Image]:
+    """加载按 scale 倍预缩放的等级图片（带缓存），scale 默认为 CONFIG["scale"]"""
     rank_text_upper = rank_text.strip().upper()
     if rank_text_upper not in CONFIG["rank_mapping"]:
         return None
     
+    scale = CONFIG["scale"] if scale is None else scale
+    key = _resource_key("rank", rank_text_upper, scale)
+    if key not in _RESOURCE_CACHE:
+        _RESOURCE_CACHE[key] = _load_rank_image_uncached(rank_text_upper, scale)
+    return _RESOURCE_CACHE[key]
+
+def _load_rank_image_uncached(rank_text_upper: str, scale: int) -> Optional[Image.Image]:
     img_name = CONFIG["rank_mapping"][rank_text_upper]
     img_path = os.path.join(CONFIG["rank_img_root"], img_name)
     if not os.path.exists(img_path):
@@ -162,14 +230,21 @@ def load_rank_image(rank_text: str, target_height: int) -> Optional[Image.Image]
     original_w, original_h = img.size
     final_row_height = CONFIG["row_height"] * CONFIG["rank_img_scale"]
     scale_ratio = final_row_height / original_h
-    new_w = int(original_w * scale_ratio * CONFIG["scale"])
-    new_h = int(original_h * scale_ratio * CONFIG["scale"])
+    new_w = int(original_w * scale_ratio * scale)
+    new_h = int(original_h * scale_ratio * scale)
     
     img_resized = img.resize((new_w, new_h), Image.Resampling.LANCZOS)
     return img_resized
 
-def load_font(font_type: str) -> ImageFont.FreeTypeFont:
-    """加载字体"""
+def load_font(font_type: str, scale: Optional[int] = None) -> ImageFont.FreeTypeFont:
+    """加载按 scale 倍字号的字体（带缓存），scale 默认为 CONFIG["scale"]"""
+    scale = CONFIG["scale"] if scale is None else scale
+    key = _resource_key("font", font_type, CONFIG["font_size"], scale)
+    if key not in _RESOURCE_CACHE:
+        _RESOURCE_CACHE[key] = _load_font_uncached(font_type, scale)
+    return _RESOURCE_CACHE[key]
+
+def _load_font_uncached(font_type: str, scale: int) -> ImageFont.FreeTypeFont:
     font_file = CONFIG["font_files"][font_type]
     font_path = os.path.join(CONFIG["font_root"], font_file)
     
@@ -179,105 +254,277 @@ def load_font(font_type: str) -> ImageFont.FreeTypeFont:
     
     try:
         if font_file.endswith(".ttc"):
-            font = ImageFont.truetype(font_path, CONFIG["font_size"] * CONFIG["scale"], index=0)
+            font = ImageFont.truetype(font_path, CONFIG["font_size"] * scale, index=0)
         else:
-            font = ImageFont.truetype(font_path, CONFIG["font_size"] * CONFIG["scale"])
+            font = ImageFont.truetype(font_path, CONFIG["font_size"] * scale)
     except Exception as e:
         messagebox.showerror("错误", f"加载字体失败：{font_path}，{str(e)}")
-        font = ImageFont.load_default(size=CONFIG["font_size"] * CONFIG["scale"])
+        font = ImageFont.load_default(size=CONFIG["font_size"] * scale)
     return font
 
-def create_table_image(df: pd.DataFrame) -> Image.Image:
-    """创建表格图片（兼容有无排名列两种情况）"""
-    header_font = load_font("header")
-    special_font = load_font("special_cols")
-    normal_font = load_font("normal_cols")
-    
-    # 根据实际列数调整列宽
-    actual_cols = len(df.columns)
-    if actual_cols == 6:  # 无排名列
-        col_widths = CONFIG["col_widths"][:5] + [CONFIG["col_widths"][6]]  # 去掉排名列宽度
-    else:  # 7列（含排名）
-        col_widths = CONFIG["col_widths"]
+def _text_mask(text: str, font_type: str, xy: tuple, canvas_scale: int, text_scale: int) -> tuple:
+    """取出（或生成并缓存）文字蒙版，返回 (蒙版, 画布上的贴图坐标)"""
+    font = load_font(font_type, text_scale)
+    if text_scale == canvas_scale:
+        start = (xy[0] % 1, xy[1] % 1)
+        key = _resource_key(font_type, CONFIG["font_size"], text_scale, 1, start, text)
+        mask, (dx, dy) = _TEXT_CACHE.get(key, lambda: render_text_mask(text, font, start))
+        return mask, (int(xy[0]) + dx, int(xy[1]) + dy)
+    factor = text_scale // canvas_scale
+    key = _resource_key(font_type, CONFIG["font_size"], text_scale, factor, text)
+    mask, _ = _TEXT_CACHE.get(key, lambda: render_supersampled_mask(text, font, factor))
+    return mask, (int(round(xy[0])), int(round(xy[1])))
+
+def text_cache_stats() -> dict:
+    """文字位图缓存的命中统计"""
+    return _TEXT_CACHE.stats()
+
+class TablePlan:
+    """
+    表格的列式渲染计划（坐标单位为输出像素）
+    一次性把成绩表转换为按列存放的字符串、每列的字体/等级图片类型与各列、各行的坐标，
+    绘制阶段只读取计划；不绘制时也可以用来校验表格和估算渲染开销
+    """
+
+    def __init__(self, df: pd.DataFrame):
+        self.headers = [str(header) for header in df.columns]
+        # 根据实际列数调整列宽
+        if len(self.headers) == 6:  # 无排名列
+            self.col_widths = CONFIG["col_widths"][:5] + [CONFIG["col_widths"][6]]  # 去掉排名列宽度
+        else:  # 7列（含排名）
+            self.col_widths = CONFIG["col_widths"]
+        if len(self.headers) > len(self.col_widths):
+            raise ValueError(f"表格有{len(self.headers)}列，超出可绘制的{len(self.col_widths)}列：{self.headers}")
+        self.n_rows = len(df)
+        self.width = sum(self.col_widths) + 20
+        self.height = CONFIG["header_height"] + self.n_rows * CONFIG["row_height"] + 20
+        self.rows_top = 10 + CONFIG["header_height"]
+        self.col_x = [10 + sum(self.col_widths[:i]) for i in range(len(self.headers))]
+        
+        # 每列的绘制方式："badge" 等级图片（无对应图片时退回普通字体）、"special_cols"、"normal_cols"
+        self.kinds = []
+        self.cells = []
+        self.badges = {}
+        for i, col in enumerate(df.columns):
+            values = df[col]
+            texts = values.astype(str).where(values.notna(), "").tolist()
+            self.cells.append(texts)
+            if self.headers[i] == "タイム評価":
+                self.kinds.append("badge")
+                # 每行的等级图片键，无对应图片时为None
+                self.badges[i] = [
+                    key if key in CONFIG["rank_mapping"] else None
+                    for key in (text.strip().upper() for text in texts)
+                ]
+            elif self.headers[i] in CONFIG["special_col_names"]:
+                self.kinds.append("special_cols")
+            else:
+                self.kinds.append("normal_cols")
+
+    def row_range(self, top: int, bottom: int) -> range:
+        """与纵向 [top, bottom) 相交的数据行（第 i 行占据 rows_top + i*row_height 起的一行，含下边框）"""
+        row_height = CONFIG["row_height"]
+        first_row = max(0, -(-(top - self.rows_top - row_height) // row_height))
+        last_row = min(self.n_rows, -(-(bottom - self.rows_top) // row_height))
+        return range(first_row, last_row)
+
+    def unique_texts(self) -> int:
+        """需要光栅化的不同文字数量（文字位图缓存的最少未命中数）"""
+        texts = {(kind, text) for kind, column in zip(self.kinds, self.cells) for text in column if text}
+        return len(texts) + len(self.headers)
+
+# LANCZOS 缩小时每个输出像素只受上下3个输出像素范围内的源像素影响，
+# 分段超采样时每段多绘制这么多上下文再裁掉，拼接结果与整图绘制逐像素一致
+_RESAMPLE_PAD = 4
+
+def _render_plan_region(plan: TablePlan, top: int, bottom: int, quality: Optional[str] = None) -> Image.Image:
+    """按渲染计划绘制整张表格中纵向 [top, bottom) 的部分（单位为输出像素），只绘制与该范围相交的表头和行"""
+    scale, text_scale = _render_scales(quality)
+    phases = METRICS.phases("render_phase_seconds")
+    for font_type in CONFIG["font_files"]:
+        load_font(font_type, text_scale)
+    phases.mark("fonts")
     
-    total_width = (sum(col_widths) + 20) * CONFIG["scale"]
-    total_height = (CONFIG["header_height"] + (len(df) * CONFIG["row_height"]) + 20) * CONFIG["scale"]
+    pad = _RESAMPLE_PAD if scale > 1 else 0
+    region_top = max(0, top - pad)
+    region_bottom = min(plan.height, bottom + pad)
+    total_width = plan.width * scale
+    # 画布坐标 = 整图坐标 - offset
+    offset = region_top * scale
     
-    img = Image.new("RGB", (total_width, total_height), CONFIG["bg_color"])
+    img = Image.new("RGB", (total_width, (region_bottom - region_top) * scale), CONFIG["bg_color"])
     draw = ImageDraw.Draw(img)
     
+    def draw_text(xy: tuple, text: str, fill: tuple, font_type: str):
+        if not text:
+            return
+        mask, position = _text_mask(text, font_type, xy, scale, text_scale)
+        img.paste(fill, position, mask)
+    
+    text_xs = [(x + 5) * scale for x in plan.col_x]
+    cell_widths = [width * scale for width in plan.col_widths]
+    row_height = CONFIG["row_height"] * scale
+    text_dy = row_height / 2 - (CONFIG["font_size"] * scale) / 2
+    
     # 绘制表头
-    x = 10 * CONFIG["scale"]
-    y = 10 * CONFIG["scale"]
-    draw.rectangle(
-        [x, y, total_width - 10 * CONFIG["scale"], y + CONFIG["header_height"] * CONFIG["scale"]],
-        fill=CONFIG["header_color"],
-        outline=CONFIG["border_color"]
-    )
-    headers = df.columns.tolist()
-    for i, header in enumerate(headers):
-        draw.text(
-            (x + 5 * CONFIG["scale"], y + (CONFIG["header_height"] * CONFIG["scale"]) / 2 - (CONFIG["font_size"] * CONFIG["scale"]) / 2),
-            header,
-            fill=CONFIG["header_text_color"],
-            font=header_font
+    if region_top <= plan.rows_top:
+        y = 10 * scale - offset
+        draw.rectangle(
+            [10 * scale, y, total_width - 10 * scale, y + CONFIG["header_height"] * scale],
+            fill=CONFIG["header_color"],
+            outline=CONFIG["border_color"]
         )
-        x += col_widths[i] * CONFIG["scale"]
+        header_y = y + (CONFIG["header_height"] * scale) / 2 - (CONFIG["font_size"] * scale) / 2
+        for text_x, header in zip(text_xs, plan.headers):
+            draw_text((text_x, header_y), header, CONFIG["header_text_color"], "header")
     
-    # 绘制数据行
-    y += CONFIG["header_height"] * CONFIG["scale"]
-    eval_col_idx = headers.index("タイム評価") if "タイム評価" in headers else -1
+    # 本段用到的等级图片
+    rows = plan.row_range(region_top, region_bottom)
+    badge_images = {
+        key: load_rank_image(key, 0, scale)
+        for badges in plan.badges.values() for key in {badges[idx] for idx in rows} if key
+    }
+    phases.mark("badges")
     
-    for idx, (_, row) in enumerate(df.iterrows()):
-        row_bg = CONFIG["row_even_color"] if idx % 2 == 0 else CONFIG["row_odd_color"]
+    # 绘制数据行
+    for idx in rows:
+        y = (plan.rows_top + idx * CONFIG["row_height"]) * scale - offset
         draw.rectangle(
-            [10 * CONFIG["scale"], y, total_width - 10 * CONFIG["scale"], y + CONFIG["row_height"] * CONFIG["scale"]],
-            fill=row_bg,
+            [10 * scale, y, total_width - 10 * scale, y + row_height],
+            fill=CONFIG["row_even_color"] if idx % 2 == 0 else CONFIG["row_odd_color"],
             outline=CONFIG["border_color"]
         )
-        
-        x = 10 * CONFIG["scale"]
-        for i, col in enumerate(headers):
-            text = str(row[col]) if pd.notna(row[col]) else ""
-            
-            if i == eval_col_idx:
-                rank_img = load_rank_image(text, 0)
-                if rank_img:
-                    img_x = x + (col_widths[i] * CONFIG["scale"] - rank_img.width) // 2
-                    img_y = y + (CONFIG["row_height"] * CONFIG["scale"] - rank_img.height) // 2
-                    img.paste(rank_img, (img_x, img_y), mask=rank_img)
-                else:
-                    draw.text(
-                        (x + 5 * CONFIG["scale"], y + (CONFIG["row_height"] * CONFIG["scale"]) / 2 - (CONFIG["font_size"] * CONFIG["scale"]) / 2),
-                        text,
-                        fill=CONFIG["text_color"],
-                        font=normal_font
-                    )
-            elif col in CONFIG["special_col_names"]:
-                draw.text(
-                    (x + 5 * CONFIG["scale"], y + (CONFIG["row_height"] * CONFIG["scale"]) / 2 - (CONFIG["font_size"] * CONFIG["scale"]) / 2),
-                    text,
-                    fill=CONFIG["text_color"],
-                    font=special_font
-                )
+    
+    # 逐列绘制单元格，同一列的字体与绘制方式不变
+    for i, kind in enumerate(plan.kinds):
+        column = plan.cells[i]
+        badges = plan.badges.get(i)
+        for idx in rows:
+            y = (plan.rows_top + idx * CONFIG["row_height"]) * scale - offset
+            rank_img = badge_images.get(badges[idx]) if badges else None
+            if rank_img:
+                img_x = plan.col_x[i] * scale + (cell_widths[i] - rank_img.width) // 2
+                img_y = y + (row_height - rank_img.height) // 2
+                img.paste(rank_img, (img_x, img_y), mask=rank_img)
             else:
-                draw.text(
-                    (x + 5 * CONFIG["scale"], y + (CONFIG["row_height"] * CONFIG["scale"]) / 2 - (CONFIG["font_size"] * CONFIG["scale"]) / 2),
-                    text,
-                    fill=CONFIG["text_color"],
-                    font=normal_font
-                )
-            
-            x += col_widths[i] * CONFIG["scale"]
-        y += CONFIG["row_height"] * CONFIG["scale"]
+                font_type = "normal_cols" if kind == "badge" else kind
+                draw_text((text_xs[i], y + text_dy), column[idx], CONFIG["text_color"], font_type)
     
-    # 缩小回正常尺寸
-    img = img.resize(
-        (total_width // CONFIG["scale"], total_height // CONFIG["scale"]),
-        Image.Resampling.LANCZOS
-    )
+    phases.mark("draw")
+    
+    # 超采样时缩小回正常尺寸，再裁掉上下文
+    if scale > 1:
+        img = img.resize((plan.width, region_bottom - region_top), Image.Resampling.LANCZOS)
+    if (region_top, region_bottom) != (top, bottom):
+        img = img.crop((0, top - region_top, plan.width, bottom - region_top))
+    phases.mark("downscale")
     return img
 
+def create_table_image(df: pd.DataFrame, quality: Optional[str] = None) -> Image.Image:
+    """创建表格图片（兼容有无排名列两种情况），quality 为渲染质量，默认取 CONFIG["render_quality"]"""
+    with METRICS.timer("render_phase_seconds", phase="layout"):
+        plan = TablePlan(df)
+    return _render_plan_region(plan, 0, plan.height, quality)
+
+def _paginate(df: pd.DataFrame) -> List[pd.DataFrame]:
+    rows_per_page = CONFIG["rows_per_page"]
+    if not rows_per_page or len(df) <= rows_per_page:
+        return [df]
+    return [df.iloc[start:start + rows_per_page] for start in range(0, len(df), rows_per_page)]
+
+def save_table_image(df: pd.DataFrame, img_path: str, quality: Optional[str] = None) -> List[str]:
+    """
+    分段渲染表格并流式写入PNG，内存占用只与每段行数有关、与表格长度无关；
+    设置了 CONFIG["rows_per_page"] 时拆分为多页（文件名追加 _p页码），返回保存的图片路径
+    """
+    pages = _paginate(df)
+    if len(pages) == 1:
+        paths = [img_path]
+    else:
+        stem, ext = os.path.splitext(img_path)
+        paths = [f"{stem}_p{page}{ext}" for page in range(1, len(pages) + 1)]
+    
+    strip_height = CONFIG["strip_rows"] * CONFIG["row_height"]
+    for page_df, path in zip(pages, paths):
+        started = time.perf_counter()
+        with METRICS.timer("render_phase_seconds", phase="layout"):
+            plan = TablePlan(page_df)
+        with png_stream.PNGStreamWriter(path, plan.width, plan.height, dpi=(300, 300)) as writer:
+            for top in range(0, plan.height, strip_height):
+                band = _render_plan_region(plan, top, min(plan.height, top + strip_height), quality)
+                with METRICS.timer("render_phase_seconds", phase="encode"):
+                    writer.write(band)
+        METRICS.observe("render_image_seconds", time.perf_counter() - started)
+        METRICS.count("render_rows_total", plan.n_rows)
+    return paths
+
+def estimate_table_render(df: pd.DataFrame, quality: Optional[str] = None) -> dict:
+    """
+    只生成渲染计划、不绘制，估算 save_table_image 的输出与开销：
+    页数、最大一页的尺寸、分段绘制画布的峰值内存、需光栅化的文字数与缺少等级图片的行数
+    """
+    scale, _ = _render_scales(quality)
+    plans = [TablePlan(page_df) for page_df in _paginate(df)]
+    largest = max(plans, key=lambda plan: plan.height)
+    strip_height = min(largest.height, CONFIG["strip_rows"] * CONFIG["row_height"] + 2 * _RESAMPLE_PAD)
+    return {
+        "rows": len(df),
+        "pages": len(plans),
+        "size": (largest.width, largest.height),
+        "pixels": sum(plan.width * plan.height for plan in plans),
+        "canvas_mb": largest.width * scale * strip_height * scale * 3 / 1024 / 1024,
+        "unique_texts": max(plan.unique_texts() for plan in plans),
+        "missing_badges": sum(
+            sum(1 for text, key in zip(plan.cells[i], badges) if text and key is None)
+            for plan in plans for i, badges in plan.badges.items()
+        ),
+    }
+
+def _split_players(df: pd.DataFrame):
+    """按玩家拆分多人成绩表，产出 (玩家名, 去掉玩家列的成绩表)；单人表格以配置文件中的ID为玩家名"""
+    if spider.PLAYER_COLUMN not in df.columns:
+        yield get_username_from_file(), df
+        return
+    for player, player_df in df.groupby(spider.PLAYER_COLUMN, sort=False):
+        yield player, player_df.drop(columns=[spider.PLAYER_COLUMN]).reset_index(drop=True)
+
+def create_player_table_images(df: pd.DataFrame, quality: Optional[str] = None) -> Dict[str, Image.Image]:
+    """按玩家分组生成表格图片（多人批量爬取结果首列为玩家名），返回 {玩家名: 图片}"""
+    return {player: create_table_image(player_df, quality) for player, player_df in _split_players(df)}
+
+def save_player_table_images(df: pd.DataFrame, save_dir: str, base_filename: str,
+                             quality: Optional[str] = None) -> Dict[str, List[str]]:
+    """按玩家逐张分段渲染并保存为 {base_filename}_{玩家名}.png，返回 {玩家名: 图片路径列表}"""
+    return {
+        player: save_table_image(player_df, os.path.join(save_dir, f"{base_filename}_{player}.png"), quality)
+        for player, player_df in _split_players(df)
+    }
+
+def estimate_table_outputs(df: pd.DataFrame, base_filename: str, quality: Optional[str] = None) -> Dict[str, dict]:
+    """预演保存图片（多人数据按玩家拆分），返回 {图片名: 渲染估算}，不绘制也不写文件"""
+    if spider.PLAYER_COLUMN not in df.columns:
+        return {base_filename: estimate_table_render(df, quality)}
+    return {
+        f"{base_filename}_{player}": estimate_table_render(player_df, quality)
+        for player, player_df in _split_players(df)
+    }
+
+def format_render_estimate(name: str, estimate: dict) -> str:
+    width, height = estimate["size"]
+    pages = f"，拆分为{estimate['pages']}张" if estimate["pages"] > 1 else ""
+    text = (f"📐 {name}：{estimate['rows']}行{pages}，图片 {width}x{height}，"
+            f"分段画布约{estimate['canvas_mb']:.1f}MB，需光栅化文字{estimate['unique_texts']}个")
+    if estimate["missing_badges"]:
+        text += f"\n⚠️ {name}：{estimate['missing_badges']}行的タイム評価没有对应的等级图片，将以文字显示"
+    return text
+
+def warn_if_incomplete(df: pd.DataFrame) -> int:
+    """爬取过程中有请求最终失败时提示结果不完整，返回失败请求数"""
+    skipped = df.attrs.get("skipped_requests", [])
+    if skipped:
+        messagebox.showwarning("提示", f"有{len(skipped)}个页面请求最终失败，表格可能不完整（详见控制台）")
+    return len(skipped)
+
 def get_username_from_file() -> str:
     """从Player_ID.dat获取用户名"""
     try:
@@ -291,6 +538,26 @@ def get_username_from_file() -> str:
         pass
     return "未知用户"
 
+def save_to_history(df: pd.DataFrame, source: str, season: Optional[int] = None) -> int:
+    """把成绩写入本地历史库，返回新增条数；写入失败只提示，不影响生成表格"""
+    try:
+        from results_store import open_store
+        store = open_store()
+        if store is None:
+            return 0
+        if season is None:
+            season = df.attrs.get("season")
+        if season is None:
+            season = spider.load_season()
+        player = df.attrs.get("player") or get_username_from_file()
+        with store:
+            added = store.add_results(df, season, player=player, source=source)
+        print(f"🗄️ 成绩已写入历史库，新增{added}条")
+        return added
+    except Exception as e:
+        print(f"⚠️ 写入成绩历史库失败：{str(e)}")
+        return 0
+
 # 主函数
 def main():
     # 校验资源目录
@@ -307,14 +574,17 @@ def main():
     print("2. 本地CSV文件生成可视化表格图片")
     if SEARCH_MODULE_AVAILABLE:
         print("3. 通过用户名搜索生成无排名表格图片（快速模式）")
-    choice = input(f"请选择功能（1/2{'/3' if SEARCH_MODULE_AVAILABLE else ''}）：").strip()
+    print(f"4. 按名单（{spider.CONFIG['roster_path']}）批量爬取多名玩家并逐人生成表格图片（含排名）")
+    choice = input(f"请选择功能（1/2{'/3' if SEARCH_MODULE_AVAILABLE else ''}/4）：").strip()
     
+    import tkinter as tk
     root = tk.Tk()
     root.withdraw()
     
     valid_choices = ["1", "2"]
     if SEARCH_MODULE_AVAILABLE:
         valid_choices.append("3")
+    valid_choices.append("4")
     
     if choice not in valid_choices:
         messagebox.showerror("错误", f"无效选择，程序退出（有效选项：{', '.join(valid_choices)}）")
@@ -338,6 +608,8 @@ def main():
         if df.empty:
             messagebox.showerror("错误", "未爬取到任何成绩数据")
             sys.exit(1)
+        warn_if_incomplete(df)
+        save_to_history(df, "crawl")
         
         # 计算爬虫耗时（在选择保存目录之前）
         crawl_time = time.time() - start_time
@@ -361,10 +633,9 @@ def main():
         # 生成图片
         try:
             print("🎨 开始生成可视化表格图片...")
-            table_img = create_table_image(df)
             img_filename = f"{base_filename}.png"
-            img_path = os.path.join(save_dir, img_filename)
-            table_img.save(img_path, "PNG", dpi=(300, 300))
+            img_paths = save_table_image(df, os.path.join(save_dir, img_filename))
+            img_path = "、".join(img_paths)
             
             # 计算总耗时
             total_time = time.time() - start_time
@@ -385,6 +656,7 @@ def main():
     elif choice == "2":
         csv_path = select_csv_file()
         df = load_csv_data(csv_path)
+        save_to_history(df, os.path.basename(csv_path))
         
         # 计算读取CSV耗时
         read_time = time.time() - start_time
@@ -398,8 +670,7 @@ def main():
         
         try:
             print("🎨 开始生成可视化表格图片...")
-            table_img = create_table_image(df)
-            table_img.save(img_path, "PNG", dpi=(300, 300))
+            img_path = "、".join(save_table_image(df, img_path))
             
             # 计算总耗时
             total_time = time.time() - start_time
@@ -426,6 +697,8 @@ def main():
         if df.empty:
             messagebox.showerror("错误", "未搜索到任何成绩数据")
             sys.exit(1)
+        warn_if_incomplete(df)
+        save_to_history(df, "search")
         
         # 计算搜索耗时（在选择保存目录之前）
         search_time = time.time() - start_time
@@ -449,10 +722,9 @@ def main():
         # 生成图片
         try:
             print("🎨 开始生成可视化表格图片...")
-            table_img = create_table_image(df)
             img_filename = f"{base_filename}.png"
-            img_path = os.path.join(save_dir, img_filename)
-            table_img.save(img_path, "PNG", dpi=(300, 300))
+            img_paths = save_table_image(df, os.path.join(save_dir, img_filename))
+            img_path = "、".join(img_paths)
             
             # 计算总耗时
             total_time = time.time() - start_time
@@ -469,7 +741,230 @@ def main():
             messagebox.showerror("错误", f"生成图片失败：{str(e)}")
             sys.exit(1)
 
+    # 功能4：名单批量爬取模式（含排名，每条赛道只翻页一次）
+    elif choice == "4":
+        try:
+            usernames = spider.load_roster()
+        except Exception as e:
+            messagebox.showerror("错误", str(e))
+            sys.exit(1)
+        
+        if not ping_arcadezone():
+            messagebox.showerror("错误", "网络连接异常，无法访问ArcadeZone，请检查网络")
+            sys.exit(1)
+        
+        print(f"\n📡 开始批量爬取{len(usernames)}名玩家的成绩（遍历所有赛道）...")
+        df = spider.crawl_data(usernames)
+        
+        if df.empty:
+            messagebox.showerror("错误", "未爬取到任何成绩数据")
+            sys.exit(1)
+        warn_if_incomplete(df)
+        save_to_history(df, "roster")
+        
+        crawl_time = time.time() - start_time
+        print(f"⏱️ 数据爬取完成，耗时 {format_time(crawl_time)}")
+        
+        save_dir = select_save_dir()
+        
+        # 统一命名：DAC成绩表_时间戳，图片追加玩家名
+        base_filename = f"DAC成绩表_{timestamp}"
+        
+        # 保存CSV（首列为玩家名）
+        try:
+            csv_filename = f"{base_filename}.csv"
+            csv_path = os.path.join(save_dir, csv_filename)
+            df.to_csv(csv_path, index=False, encoding="utf-8-sig")
+            print(f"✅ CSV文件已保存至：{csv_path}")
+        except Exception as e:
+            messagebox.showwarning("提示", f"CSV保存失败：{str(e)}，继续生成图片")
+            csv_path = None
+        
+        # 逐人生成图片
+        try:
+            print("🎨 开始逐人生成可视化表格图片...")
+            img_paths = save_player_table_images(df, save_dir, base_filename)
+            for player_paths in img_paths.values():
+                for img_path in player_paths:
+                    print(f"✅ 已生成：{img_path}")
+            
+            total_time = time.time() - start_time
+            print(f"✅ 完成！总耗时 {format_time(total_time)}")
+            
+            messagebox.showinfo("成功", f"""
+✅ 任务完成！
+- 爬取到 {len(df)} 条成绩数据，共 {len(img_paths)} 名玩家
+- CSV文件路径：{csv_path if csv_path else '未保存'}
+- 图片保存目录：{save_dir}
+- 总耗时：{format_time(total_time)}
+            """)
+        except Exception as e:
+            messagebox.showerror("错误", f"生成图片失败：{str(e)}")
+            sys.exit(1)
+
+# 无界面模式退出码
+EXIT_OK = 0
+EXIT_ERROR = 1
+EXIT_USAGE = 2  # argparse 参数错误
+EXIT_NETWORK = 3
+EXIT_NO_DATA = 4
+EXIT_INCOMPLETE = 5  # 已输出结果，但部分页面请求最终失败
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="DAC成绩表生成工具（无界面模式，适用于定时任务与服务器）"
+    )
+    parser.add_argument("--mode", required=True, choices=["crawl", "csv", "search", "roster"],
+                        help="crawl：爬取（含排名）；csv：本地CSV生成图片；search：搜索模式（无排名）；roster：按名单批量爬取")
+    parser.add_argument("--input", help="csv 模式的输入CSV文件")
+    parser.add_argument("--output-dir", default=".", help="CSV与图片保存目录（默认当前目录）")
+    parser.add_argument("--usernames", help="玩家ID，多个用逗号分隔（默认读取 Player_ID.dat）")
+    parser.add_argument("--roster", help="roster 模式的名单文件（默认 Roster.dat）")
+    parser.add_argument("--season", type=int, help="赛季（默认读取 Player_ID.dat）")
+    parser.add_argument("--concurrency", type=int, help="并发请求数上限")
+    parser.add_argument("--transport", choices=list(spider.TRANSPORT_KINDS), help="HTTP传输层")
+    parser.add_argument("--http2", action="store_true", help="asyncio 传输层启用 HTTP/2（需安装 h2）")
+    parser.add_argument("--crawl-mode", choices=list(spider.CRAWL_MODES), help="翻页模式")
+    parser.add_argument("--incremental", action="store_true", help="增量爬取，只重新爬取有变动的赛道")
+    parser.add_argument("--previous-csv", help="增量爬取时合并的上次CSV")
+    parser.add_argument("--snapshot", action="store_true",
+                        help="同时保存所有赛道的完整排行榜快照（crawl/roster 模式，需爬取全部页），可用 snapshot.py 离线查询")
+    parser.add_argument("--no-cache", action="store_true", help="禁用响应缓存")
+    parser.add_argument("--cache-ttl", type=float, help="响应缓存有效期（秒）")
+    parser.add_argument("--offline", action="store_true", help="离线模式，只读取响应缓存")
+    parser.add_argument("--render-quality", choices=list(RENDER_QUALITIES), help="图片渲染质量")
+    parser.add_argument("--rows-per-page", type=int, help="每张图片最多的行数，超过时拆分为多张")
+    parser.add_argument("--dry-run", action="store_true", help="只校验表格并估算图片尺寸与内存，不绘制、不保存文件")
+    parser.add_argument("--no-store", action="store_true", help="不写入本地成绩历史库")
+    parser.add_argument("--skip-network-check", action="store_true", help="跳过网络连通性检查")
+    parser.add_argument("--metrics", help="记录请求与渲染指标并写入该文件（.prom 为 Prometheus 文本格式，其余为 JSON Lines）")
+    parser.add_argument("--profile", help="对整个运行过程做性能剖析并写入该文件")
+    parser.add_argument("--profiler", choices=list(PROFILERS), default="cprofile",
+                        help="剖析器（pyinstrument 需另行安装）")
+    args = parser.parse_args(argv)
+    if args.mode == "csv" and not args.input:
+        parser.error("csv 模式需要 --input")
+    if args.snapshot and (args.mode not in ("crawl", "roster") or args.incremental):
+        parser.error("--snapshot 只能用于 crawl/roster 模式，且不能与 --incremental 同时使用")
+    return args
+
+def _apply_cli_config(args: argparse.Namespace):
+    """把命令行参数写入爬虫配置"""
+    if args.concurrency:
+        spider.CONFIG["max_workers"] = args.concurrency
+        spider.CONFIG["per_host_limit"] = args.concurrency
+    if args.transport:
+        spider.CONFIG["transport"]["kind"] = args.transport
+    if args.http2:
+        spider.CONFIG["transport"]["http2"] = True
+    if args.crawl_mode:
+        spider.CONFIG["crawl_mode"] = args.crawl_mode
+    if args.no_cache:
+        spider.CONFIG["cache"]["enabled"] = False
+    if args.cache_ttl is not None:
+        spider.CONFIG["cache"]["ttl"] = args.cache_ttl
+    if args.offline:
+        spider.CONFIG["cache"]["enabled"] = True
+        spider.CONFIG["cache"]["offline"] = True
+    if args.no_store:
+        spider.CONFIG["results_store"]["enabled"] = False
+    if args.render_quality:
+        CONFIG["render_quality"] = args.render_quality
+    if args.rows_per_page:
+        CONFIG["rows_per_page"] = args.rows_per_page
+
+def _save_outputs(df: pd.DataFrame, output_dir: str, base_filename: str, save_csv: bool = True) -> List[str]:
+    """保存CSV（可选）与表格图片，多人数据按玩家分别生成图片，返回保存的文件路径"""
+    os.makedirs(output_dir, exist_ok=True)
+    saved = []
+    if save_csv:
+        csv_path = os.path.join(output_dir, f"{base_filename}.csv")
+        df.to_csv(csv_path, index=False, encoding="utf-8-sig")
+        saved.append(csv_path)
+    if spider.PLAYER_COLUMN in df.columns:
+        for player_paths in save_player_table_images(df, output_dir, base_filename).values():
+            saved.extend(player_paths)
+    else:
+        saved.extend(save_table_image(df, os.path.join(output_dir, f"{base_filename}.png")))
+    return saved
+
+def run_headless(args: argparse.Namespace) -> int:
+    """无界面模式入口：不导入tkinter、不等待输入，通过退出码报告结果"""
+    global HEADLESS
+    HEADLESS = True
+    if args.metrics:
+        METRICS.enable()
+    try:
+        with maybe_profile(args.profile, args.profiler):
+            return _run_headless(args)
+    finally:
+        if args.metrics:
+            METRICS.export(args.metrics)
+            print("📈 运行指标汇总：")
+            print("\n".join(METRICS.report()))
+            print(f"📈 运行指标已保存至：{args.metrics}")
+
+def _run_headless(args: argparse.Namespace) -> int:
+    start_time = time.time()
+    _apply_cli_config(args)
+    usernames = [name.strip() for name in args.usernames.split(",") if name.strip()] if args.usernames else None
+    
+    try:
+        if args.mode != "csv" and not (args.offline or args.skip_network_check):
+            if not ping_arcadezone():
+                print("❌ 网络连接异常，无法访问ArcadeZone", file=sys.stderr)
+                return EXIT_NETWORK
+        
+        if args.mode == "csv":
+            df = load_csv_data(args.input)
+        elif args.mode == "crawl":
+            df = spider.crawl_data(usernames, incremental=args.incremental,
+                                   previous_csv=args.previous_csv, season=args.season, snapshot=args.snapshot)
+        elif args.mode == "roster":
+            df = spider.crawl_data(spider.load_roster(args.roster), incremental=args.incremental,
+                                   previous_csv=args.previous_csv, season=args.season, snapshot=args.snapshot)
+        else:
+            if not SEARCH_MODULE_AVAILABLE:
+                print("❌ 未找到 spider_search.py，搜索功能不可用", file=sys.stderr)
+                return EXIT_ERROR
+            frames, skipped = [], []
+            for username in usernames or [None]:
+                player_df = spider_search.crawl_data_by_search(username, season=args.season)
+                skipped.extend(player_df.attrs.get("skipped_requests", []))
+                if len(usernames or []) > 1 and not player_df.empty:
+                    player_df.insert(0, spider.PLAYER_COLUMN, username)
+                frames.append(player_df)
+            # 单人时保留搜索结果附带的赛季、玩家信息
+            df = frames[0] if len(frames) == 1 else pd.concat(frames, ignore_index=True)
+            df.attrs["skipped_requests"] = skipped
+        
+        if df.empty:
+            print("❌ 未获取到任何成绩数据", file=sys.stderr)
+            return EXIT_NO_DATA
+        if args.dry_run:
+            base_filename = f"DAC成绩表_{get_timestamp()}"
+            for name, estimate in estimate_table_outputs(df, base_filename).items():
+                print(format_render_estimate(name, estimate))
+            return EXIT_INCOMPLETE if warn_if_incomplete(df) else EXIT_OK
+        save_to_history(df, os.path.basename(args.input) if args.mode == "csv" else args.mode, season=args.season)
+        
+        saved = _save_outputs(df, args.output_dir, f"DAC成绩表_{get_timestamp()}", save_csv=args.mode != "csv")
+        for path in saved:
+            print(f"✅ 已保存：{path}")
+        print(f"✅ 完成！共 {len(df)} 条成绩，总耗时 {format_time(time.time() - start_time)}")
+        if warn_if_incomplete(df):
+            return EXIT_INCOMPLETE
+        return EXIT_OK
+    except SystemExit as e:
+        return e.code if isinstance(e.code, int) else EXIT_ERROR
+    except Exception as e:
+        print(f"❌ 执行失败：{str(e)}", file=sys.stderr)
+        return EXIT_ERROR
+
 if __name__ == "__main__":
+    # 带命令行参数时进入无界面模式，否则进入交互菜单
+    if len(sys.argv) > 1:
+        sys.exit(run_headless(parse_args()))
     print("若提示模块不存在，请执行：pip install -r requirements.txt")
     print("提示：如需使用搜索功能，请确保 spider_search.py 在同一目录下")
     main()
\ No newline at end of file
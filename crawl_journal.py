@@ -0,0 +1,109 @@
+import json
+import os
+import time
+from typing import Dict, Iterable, List, Optional
+
+
+class CrawlJournal:
+    """
+    爬取断点日志（JSONL，只追加）
+    每爬完一页追加一行该页匹配到的记录，赛道全部页成功后追加一行完成标记；
+    中途退出后重新运行时，已完成的赛道直接沿用日志中的记录，未完成的赛道只补爬缺失的页。
+    日志与赛季、目标玩家绑定，不一致或超过 max_age 秒时视为新任务重新开始
+    """
+
+    def __init__(self, path: str, season: int, players: Iterable[str], max_age: float = 86400):
+        self.path = path
+        self.meta = {"type": "meta", "season": season, "players": sorted(players), "started_at": time.time()}
+        self._pages = {}
+        self._last_pages = {}
+        self._done = set()
+
+        if os.path.exists(path) and self._load(max_age):
+            self._file = open(path, "a", encoding="utf-8")
+        else:
+            journal_dir = os.path.dirname(path)
+            if journal_dir:
+                os.makedirs(journal_dir, exist_ok=True)
+            self._file = open(path, "w", encoding="utf-8")
+            self._write(self.meta)
+
+    def _load(self, max_age: float) -> bool:
+        """读取已有日志，可以续爬时返回真；末尾被截断的行直接忽略"""
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                lines = f.read().splitlines()
+        except OSError as e:
+            print(f"⚠️ 读取断点日志失败，将重新爬取：{e}")
+            return False
+        entries = []
+        for line in lines:
+            try:
+                entries.append(json.loads(line))
+            except ValueError:
+                break
+        if not entries or entries[0].get("type") != "meta":
+            return False
+        meta = entries[0]
+        if meta.get("season") != self.meta["season"] or meta.get("players") != self.meta["players"]:
+            return False
+        if time.time() - meta.get("started_at", 0) > max_age:
+            print("⚠️ 断点日志已过期，将重新爬取")
+            return False
+
+        self.meta = meta
+        for entry in entries[1:]:
+            course_id = entry["course"]
+            if entry["type"] == "page":
+                self._pages.setdefault(course_id, {})[entry["page"]] = entry["records"]
+                self._last_pages[course_id] = entry["last_page"]
+            elif entry["type"] == "course":
+                if "pages" in entry:
+                    self._pages[course_id] = {int(page): records for page, records in entry["pages"].items()}
+                self._done.add(course_id)
+        if self._pages or self._done:
+            page_count = sum(len(pages) for pages in self._pages.values())
+            print(f"♻️ 从断点继续：已完成{len(self._done)}条赛道，已保存{page_count}页")
+        # 截断行之后的内容不可信，重写一份干净的日志再继续追加
+        with open(self.path, "w", encoding="utf-8") as f:
+            for entry in entries:
+                f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+        return True
+
+    def _write(self, entry: Dict):
+        self._file.write(json.dumps(entry, ensure_ascii=False) + "\n")
+        self._file.flush()
+
+    def course_done(self, course_id: int) -> bool:
+        return course_id in self._done
+
+    def pages(self, course_id: int) -> Dict[int, List[Dict]]:
+        return dict(self._pages.get(course_id, {}))
+
+    def last_page(self, course_id: int) -> Optional[int]:
+        return self._last_pages.get(course_id)
+
+    def add_page(self, course_id: int, page: int, last_page: int, records: List[Dict]):
+        self._pages.setdefault(course_id, {})[page] = records
+        self._last_pages[course_id] = last_page
+        self._write({"type": "page", "course": course_id, "page": page, "last_page": last_page, "records": records})
+
+    def finish_course(self, course_id: int, pages: Optional[Dict[int, List[Dict]]] = None):
+        """标记赛道完成；定位模式没有逐页日志，连同各页记录一起写入"""
+        entry = {"type": "course", "course": course_id}
+        if pages is not None:
+            self._pages[course_id] = dict(pages)
+            entry["pages"] = {str(page): records for page, records in pages.items()}
+        self._done.add(course_id)
+        self._write(entry)
+        os.fsync(self._file.fileno())
+
+    def close(self):
+        if not self._file.closed:
+            self._file.close()
+
+    def discard(self):
+        """任务完整结束后删除日志"""
+        self.close()
+        if os.path.exists(self.path):
+            os.remove(self.path)
@@ -0,0 +1,49 @@
+import json
+import os
+from typing import Dict, Optional
+
+
+class CrawlState:
+    """
+    增量爬取状态
+    按赛季、赛道记录上次爬取时的总页数、总条数、每页条数，以及各目标玩家的
+    位置（页码、页内序号）、成绩和对应的输出行；玩家值为 None 表示上次确认该赛道无记录
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._data = {}
+        if os.path.exists(path):
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    self._data = json.load(f)
+            except (OSError, ValueError) as e:
+                print(f"⚠️ 读取增量状态失败，将完整爬取：{e}")
+                self._data = {}
+
+    def course(self, season: int, course_id: int) -> Optional[Dict]:
+        return self._data.get(str(season), {}).get(str(course_id))
+
+    def update_course(self, season: int, course_id: int, last_page: int, total: Optional[int],
+                      per_page: int, players: Dict[str, Optional[Dict]]):
+        season_data = self._data.setdefault(str(season), {})
+        previous_players = season_data.get(str(course_id), {}).get("players", {})
+        # 保留名单外玩家的旧状态，名单变化时不丢失
+        merged_players = dict(previous_players)
+        merged_players.update(players)
+        season_data[str(course_id)] = {
+            "last_page": last_page,
+            "total": total,
+            "per_page": per_page,
+            "players": merged_players,
+        }
+
+    def save(self):
+        """先写临时文件再替换，避免中途退出时损坏状态文件"""
+        state_dir = os.path.dirname(self.path)
+        if state_dir:
+            os.makedirs(state_dir, exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self._data, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, self.path)
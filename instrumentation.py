@@ -0,0 +1,242 @@
+import json
+import os
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Tuple
+
+PROFILERS = ("cprofile", "pyinstrument")
+
+
+def _label_key(labels: Dict) -> Tuple:
+    return tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+
+def _quantile(sorted_values: List[float], q: float) -> float:
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(q * len(sorted_values)))]
+
+
+class Metrics:
+    """
+    爬取与渲染的运行指标（进程内共享，线程安全）
+    计时（observe/timer）保留每次观测值，可导出为 JSON Lines 明细或 Prometheus 文本格式汇总；
+    计数（count）只累加。标签（关键字参数）决定汇总的分组，detail 只写入 JSON Lines 明细、不参与汇总；
+    默认关闭，关闭时记录调用直接返回，不影响正常运行的速度
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self._lock = threading.Lock()
+        self._events = []
+        self._timings = defaultdict(list)
+        self._counters = defaultdict(float)
+
+    def enable(self):
+        self.enabled = True
+
+    def reset(self):
+        with self._lock:
+            self._events.clear()
+            self._timings.clear()
+            self._counters.clear()
+
+    def _event(self, kind: str, name: str, value: float, labels: Dict, detail: Optional[Dict]) -> Dict:
+        event = {"ts": time.time(), "type": kind, "name": name, "value": value, "labels": labels}
+        if detail:
+            event["detail"] = detail
+        return event
+
+    def observe(self, name: str, seconds: float, detail: Optional[Dict] = None, **labels):
+        if not self.enabled:
+            return
+        key = (name, _label_key(labels))
+        event = self._event("timing", name, seconds, labels, detail)
+        with self._lock:
+            self._timings[key].append(seconds)
+            self._events.append(event)
+
+    def count(self, name: str, value: float = 1, detail: Optional[Dict] = None, **labels):
+        if not self.enabled:
+            return
+        key = (name, _label_key(labels))
+        event = self._event("counter", name, value, labels, detail)
+        with self._lock:
+            self._counters[key] += value
+            self._events.append(event)
+
+    @contextmanager
+    def timer(self, name: str, **labels):
+        if not self.enabled:
+            yield
+            return
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start, **labels)
+
+    def phases(self, name: str, **labels) -> "PhaseTimer":
+        return PhaseTimer(self, name, labels)
+
+    def values(self, name: str) -> List[float]:
+        """某个计时指标全部标签下的观测值（升序），供基准测试计算整体分位数"""
+        with self._lock:
+            return sorted(value for (metric, _), values in self._timings.items() if metric == name
+                          for value in values)
+
+    def summary(self) -> Dict[str, List[Dict]]:
+        """按指标名汇总：计时给出次数、总和与 p50/p90/p99/最大值，计数给出累计值"""
+        with self._lock:
+            timings = {key: sorted(values) for key, values in self._timings.items()}
+            counters = dict(self._counters)
+        result = defaultdict(list)
+        for (name, labels), values in sorted(timings.items()):
+            result[name].append({
+                "labels": dict(labels), "count": len(values), "sum": sum(values),
+                "p50": _quantile(values, 0.5), "p90": _quantile(values, 0.9),
+                "p99": _quantile(values, 0.99), "max": values[-1],
+            })
+        for (name, labels), value in sorted(counters.items()):
+            result[name].append({"labels": dict(labels), "value": value})
+        return dict(result)
+
+    def write_jsonl(self, path: str):
+        """逐条写出全部观测值，末行为汇总"""
+        with self._lock:
+            events = list(self._events)
+        with open(path, "w", encoding="utf-8") as f:
+            for event in events:
+                f.write(json.dumps(event, ensure_ascii=False) + "\n")
+            f.write(json.dumps({"ts": time.time(), "type": "summary", "metrics": self.summary()},
+                               ensure_ascii=False) + "\n")
+
+    def write_prometheus(self, path: str):
+        """写出 Prometheus 文本格式（计时为 summary，计数为 counter），可交给 node_exporter 的文本采集器"""
+        lines = []
+        for name, series in self.summary().items():
+            is_timing = "count" in series[0]
+            lines.append(f"# TYPE {name} {'summary' if is_timing else 'counter'}")
+            for item in series:
+                labels = item["labels"]
+                if is_timing:
+                    for quantile, key in (("0.5", "p50"), ("0.9", "p90"), ("0.99", "p99")):
+                        lines.append(f"{name}{_format_labels(labels, quantile=quantile)} {item[key]:.6f}")
+                    lines.append(f"{name}_sum{_format_labels(labels)} {item['sum']:.6f}")
+                    lines.append(f"{name}_count{_format_labels(labels)} {item['count']}")
+                else:
+                    lines.append(f"{name}{_format_labels(labels)} {item['value']:g}")
+        with open(path, "w", encoding="utf-8") as f:
+            f.write("\n".join(lines) + "\n")
+
+    def export(self, path: str):
+        """按扩展名导出：.prom 为 Prometheus 文本格式，其余为 JSON Lines"""
+        metrics_dir = os.path.dirname(path)
+        if metrics_dir:
+            os.makedirs(metrics_dir, exist_ok=True)
+        if path.endswith(".prom"):
+            self.write_prometheus(path)
+        else:
+            self.write_jsonl(path)
+
+    def report(self) -> List[str]:
+        """控制台用的简要汇总"""
+        lines = []
+        for name, series in self.summary().items():
+            for item in series:
+                labels = ",".join(f"{key}={value}" for key, value in item["labels"].items())
+                title = f"{name}{{{labels}}}" if labels else name
+                if "count" in item:
+                    lines.append(f"   {title}：{item['count']}次，合计{item['sum']:.2f}s，"
+                                 f"p50 {item['p50'] * 1000:.0f}ms，p99 {item['p99'] * 1000:.0f}ms")
+                else:
+                    lines.append(f"   {title}：{item['value']:g}")
+        return lines
+
+
+class PhaseTimer:
+    """连续分段计时：每次 mark(阶段名) 记录距上一次 mark（或创建时）的耗时，标签 phase 为阶段名"""
+
+    def __init__(self, metrics: Metrics, name: str, labels: Dict):
+        self._metrics = metrics
+        self._name = name
+        self._labels = labels
+        self._last = time.perf_counter()
+
+    def mark(self, phase: str):
+        if not self._metrics.enabled:
+            return
+        now = time.perf_counter()
+        self._metrics.observe(self._name, now - self._last, phase=phase, **self._labels)
+        self._last = now
+
+
+def _escape_label(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(labels: Dict, **extra) -> str:
+    labels = dict(labels, **extra)
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape_label(value)}"' for key, value in labels.items()) + "}"
+
+
+# 全局指标收集器，爬虫与渲染共用
+METRICS = Metrics()
+
+
+@contextmanager
+def profile(path: str, profiler: str = "cprofile", top: int = 25):
+    """
+    对代码块做性能剖析并写入 path：cprofile 写出 .prof（可用 snakeviz 等查看），
+    pyinstrument 写出 HTML 调用树（未安装时退回 cprofile）；结束后在控制台打印耗时最多的函数
+    """
+    if profiler not in PROFILERS:
+        raise ValueError(f"未知剖析器：{profiler}，可选：{', '.join(PROFILERS)}")
+    profile_dir = os.path.dirname(path)
+    if profile_dir:
+        os.makedirs(profile_dir, exist_ok=True)
+
+    if profiler == "pyinstrument":
+        try:
+            from pyinstrument import Profiler
+        except ImportError:
+            path = os.path.splitext(path)[0] + ".prof"
+            print(f"⚠️ 未安装 pyinstrument，改用 cProfile，结果写入 {path}")
+        else:
+            sampler = Profiler()
+            sampler.start()
+            try:
+                yield
+            finally:
+                sampler.stop()
+                with open(path, "w", encoding="utf-8") as f:
+                    f.write(sampler.output_html())
+                print(sampler.output_text(unicode=True, show_all=False))
+                print(f"📊 剖析结果已保存至：{path}")
+            return
+
+    import cProfile
+    import pstats
+    sampler = cProfile.Profile()
+    sampler.enable()
+    try:
+        yield
+    finally:
+        sampler.disable()
+        sampler.dump_stats(path)
+        pstats.Stats(sampler).sort_stats("cumulative").print_stats(top)
+        print(f"📊 剖析结果已保存至：{path}")
+
+
+@contextmanager
+def maybe_profile(path: Optional[str], profiler: str = "cprofile"):
+    """path 为空时不剖析"""
+    if not path:
+        yield
+        return
+    with profile(path, profiler):
+        yield
@@ -0,0 +1,35 @@
+import importlib
+import threading
+
+
+class LazyModule:
+    """
+    延迟导入的模块代理：首次访问属性时才真正导入，之后属性直接缓存在代理上
+    用于 pandas、Pillow、requests 等导入较慢的依赖，只在实际用到的功能中付出导入耗时
+    """
+
+    def __init__(self, name: str):
+        self._name = name
+        self._module = None
+        self._lock = threading.Lock()
+
+    def _load(self):
+        # 多个爬取线程可能同时首次访问，加锁保证只导入一次
+        with self._lock:
+            if self._module is None:
+                self._module = importlib.import_module(self._name)
+        return self._module
+
+    def __getattr__(self, attr: str):
+        value = getattr(self._module or self._load(), attr)
+        setattr(self, attr, value)
+        return value
+
+    def __repr__(self) -> str:
+        state = "loaded" if self._module is not None else "not loaded"
+        return f"<lazy module {self._name!r} ({state})>"
+
+
+def lazy_import(name: str) -> LazyModule:
+    """返回模块的延迟导入代理，用法同 import：pd = lazy_import("pandas")"""
+    return LazyModule(name)
@@ -0,0 +1,83 @@
+import struct
+import zlib
+from typing import Tuple
+
+import numpy as np
+from PIL import Image
+
+_PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+_IDAT_FLUSH_BYTES = 256 * 1024
+
+
+class PNGStreamWriter:
+    """
+    流式PNG编码器（8位RGB）
+    按从上到下的顺序逐段写入图像，每段压缩后立即写入文件，内存中只保留当前这一段；
+    每行使用 Sub 滤波（与左侧像素作差），表格的大片纯色区域压缩率高
+    """
+
+    def __init__(self, path: str, width: int, height: int, dpi: Tuple[int, int] = (300, 300),
+                 compress_level: int = 6):
+        self.path = path
+        self.width = width
+        self.height = height
+        self.rows_written = 0
+        self._compressor = zlib.compressobj(compress_level)
+        self._pending = []
+        self._pending_bytes = 0
+        self._file = open(path, "wb")
+        self._file.write(_PNG_SIGNATURE)
+        # IHDR：宽、高、位深8、颜色类型2（RGB）、压缩/滤波/隔行方式均为0
+        self._write_chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0))
+        # pHYs：DPI 换算为每米像素数，与 Image.save(dpi=...) 一致
+        self._write_chunk(b"pHYs", struct.pack(">IIB", round(dpi[0] / 0.0254), round(dpi[1] / 0.0254), 1))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self._file.close()
+
+    def _write_chunk(self, chunk_type: bytes, data: bytes):
+        self._file.write(struct.pack(">I", len(data)))
+        self._file.write(chunk_type)
+        self._file.write(data)
+        self._file.write(struct.pack(">I", zlib.crc32(data, zlib.crc32(chunk_type)) & 0xFFFFFFFF))
+
+    def _flush_idat(self, force: bool = False):
+        if self._pending and (force or self._pending_bytes >= _IDAT_FLUSH_BYTES):
+            self._write_chunk(b"IDAT", b"".join(self._pending))
+            self._pending = []
+            self._pending_bytes = 0
+
+    def write(self, band: Image.Image):
+        """追加一段图像（宽度须与整图一致）"""
+        if band.width != self.width:
+            raise ValueError(f"图像段宽度{band.width}与PNG宽度{self.width}不一致")
+        if self.rows_written + band.height > self.height:
+            raise ValueError(f"写入的行数超过PNG高度{self.height}")
+        pixels = np.asarray(band.convert("RGB"), dtype=np.uint8).reshape(band.height, self.width * 3)
+        filtered = np.empty((band.height, self.width * 3 + 1), dtype=np.uint8)
+        filtered[:, 0] = 1  # 滤波类型 Sub
+        filtered[:, 1:4] = pixels[:, :3]
+        np.subtract(pixels[:, 3:], pixels[:, :-3], out=filtered[:, 4:])
+        compressed = self._compressor.compress(filtered.tobytes())
+        if compressed:
+            self._pending.append(compressed)
+            self._pending_bytes += len(compressed)
+            self._flush_idat()
+        self.rows_written += band.height
+
+    def close(self):
+        if self._file.closed:
+            return
+        if self.rows_written != self.height:
+            self._file.close()
+            raise ValueError(f"PNG只写入了{self.rows_written}/{self.height}行")
+        self._pending.append(self._compressor.flush())
+        self._flush_idat(force=True)
+        self._write_chunk(b"IEND", b"")
+        self._file.close()
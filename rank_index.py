@@ -0,0 +1,82 @@
+from __future__ import annotations
+
+import bisect
+from typing import List, Optional
+
+from lazy_import import lazy_import
+from timefmt import times_to_ms
+
+np = lazy_import("numpy")
+pd = lazy_import("pandas")
+
+UNKNOWN_RANK = "未知评价"
+
+
+class RankIndex:
+    """
+    等级阈值索引
+    加载时把标准库中的阈值一次性解析为毫秒，按 (赛道, 方向) 和 Course_ID 建立索引；
+    单条判定用 bisect，整表判定用一次 NumPy 比较完成
+    """
+
+    def __init__(self, standard_times: pd.DataFrame, rank_priority: List[str]):
+        self.labels = list(rank_priority) + ["ROOKIE"]
+        # 每个等级一列整体解析，格式错误时抛出 TimeFormatError 并指出出错的行
+        thresholds = np.column_stack([times_to_ms(standard_times[rank]) for rank in rank_priority])
+        # 按优先级取前缀最大值使每行单调不减：“第一个满足 成绩<=阈值 的等级”
+        # 等价于在前缀最大值上 bisect_left，标准库数据不单调时结果也不变
+        self.thresholds = np.maximum.accumulate(thresholds, axis=1)
+        self._rows = [row.tolist() for row in self.thresholds]
+
+        # 同一赛道重复出现时以第一行为准（与原逐行筛选取 iloc[0] 一致）
+        self._by_name = {}
+        for row_idx, (course, direction) in enumerate(zip(standard_times["Course"], standard_times["Direction"])):
+            self._by_name.setdefault(self._name_key(course, direction), row_idx)
+        self._by_id = {}
+        if "Course_ID" in standard_times.columns:
+            for row_idx, course_id in enumerate(standard_times["Course_ID"]):
+                if pd.notna(course_id):
+                    self._by_id.setdefault(int(course_id), row_idx)
+
+    @staticmethod
+    def _name_key(course, direction) -> str:
+        return f"{course}\x1f{direction}"
+
+    def has_course(self, course: str, direction: str) -> bool:
+        return self._name_key(course, direction) in self._by_name
+
+    def _judge_row(self, row_idx: Optional[int], score_ms: int) -> str:
+        if row_idx is None:
+            return UNKNOWN_RANK
+        return self.labels[bisect.bisect_left(self._rows[row_idx], score_ms)]
+
+    def judge(self, course: str, direction: str, score_ms: int) -> str:
+        return self._judge_row(self._by_name.get(self._name_key(course, direction)), score_ms)
+
+    def judge_by_id(self, course_id: int, score_ms: int) -> str:
+        return self._judge_row(self._by_id.get(course_id), score_ms)
+
+    def judge_many(self, courses, directions, scores_ms) -> np.ndarray:
+        """批量判定，返回等级字符串数组，找不到标准的赛道为“未知评价”"""
+        keys = pd.Series(courses, dtype=object).astype(str) + "\x1f" + pd.Series(directions, dtype=object).astype(str).values
+        row_idx = keys.map(self._by_name).to_numpy(dtype=float)
+        return self._judge_rows(row_idx, scores_ms)
+
+    def judge_many_by_id(self, course_ids, scores_ms) -> np.ndarray:
+        row_idx = pd.Series(course_ids).map(self._by_id).to_numpy(dtype=float)
+        return self._judge_rows(row_idx, scores_ms)
+
+    def _judge_rows(self, row_idx: np.ndarray, scores_ms) -> np.ndarray:
+        scores = np.asarray(scores_ms, dtype=np.int64)
+        known = ~np.isnan(row_idx)
+        rows = self.thresholds[np.where(known, row_idx, 0).astype(np.intp)]
+        # 阈值单调不减，小于成绩的阈值个数即第一个满足 成绩<=阈值 的等级下标
+        level = (rows < scores[:, None]).sum(axis=1)
+        labels = np.array(self.labels + [UNKNOWN_RANK], dtype=object)
+        return labels[np.where(known, level, len(self.labels))]
+
+
+def judge_ranks(df: pd.DataFrame, rank_index: RankIndex) -> pd.Series:
+    """为整张成绩表（含 コース、ルート、タイム 列）判定等级，成绩格式错误时抛出 TimeFormatError"""
+    scores = times_to_ms(df["タイム"])
+    return pd.Series(rank_index.judge_many(df["コース"], df["ルート"], scores), index=df.index, name="タイム評価")
@@ -0,0 +1,140 @@
+import random
+import threading
+import time
+from contextlib import contextmanager
+from typing import Optional
+
+
+class TokenBucket:
+    """令牌桶：平均每秒 rate 个请求，允许 burst 个突发；服务器要求等待时整体暂停"""
+
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.capacity = max(1, burst)
+        self._tokens = float(self.capacity)
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                if now >= self._paused_until:
+                    self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                    self._updated = now
+                    if self._tokens >= 1:
+                        self._tokens -= 1
+                        return
+                    wait_time = (1 - self._tokens) / self.rate
+                else:
+                    wait_time = self._paused_until - now
+            time.sleep(wait_time)
+
+    def pause(self, seconds: float):
+        """在 seconds 秒内不再发放令牌（用于 Retry-After）"""
+        with self._lock:
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+            self._tokens = 0
+            self._updated = self._paused_until
+
+
+class AdaptiveConcurrency:
+    """
+    AIMD 自适应并发上限
+    请求成功且延迟不超过目标时线性增加（每个窗口约 +1），被限流、出错或延迟过高时按比例减半
+    """
+
+    def __init__(self, initial: int, minimum: int = 1, maximum: Optional[int] = None,
+                 target_latency: float = 2.0, decrease_factor: float = 0.5):
+        self.minimum = max(1, minimum)
+        self.maximum = max(self.minimum, maximum or initial)
+        self.limit = float(min(max(initial, self.minimum), self.maximum))
+        self.target_latency = target_latency
+        self.decrease_factor = decrease_factor
+        self._in_flight = 0
+        self._condition = threading.Condition()
+
+    def acquire(self):
+        with self._condition:
+            while self._in_flight >= int(self.limit):
+                self._condition.wait()
+            self._in_flight += 1
+
+    def release(self):
+        with self._condition:
+            self._in_flight -= 1
+            self._condition.notify_all()
+
+    def on_success(self, latency: float):
+        with self._condition:
+            if latency > self.target_latency:
+                self._decrease()
+            else:
+                self.limit = min(self.maximum, self.limit + 1 / self.limit)
+            self._condition.notify_all()
+
+    def on_throttle(self):
+        with self._condition:
+            self._decrease()
+
+    def _decrease(self):
+        self.limit = max(self.minimum, self.limit * self.decrease_factor)
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """解析 Retry-After 头（秒数或HTTP日期），无法解析返回None"""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    # HTTP日期格式很少出现，用到时才导入 email.utils
+    from email.utils import parsedate_to_datetime
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def backoff_delay(attempt: int, base: float, cap: float, retry_after: Optional[float] = None) -> float:
+    """带完全抖动的指数退避；服务器给出 Retry-After 时至少等待该时长"""
+    delay = random.uniform(0, min(cap, base * (2 ** attempt)))
+    if retry_after is not None:
+        delay = max(delay, min(retry_after, cap))
+    return delay
+
+
+class RateLimiter:
+    """组合令牌桶与自适应并发，供所有API请求共用"""
+
+    def __init__(self, rate: float, burst: int, max_concurrency: int, min_concurrency: int = 1,
+                 target_latency: float = 2.0, backoff_base: float = 0.5, backoff_cap: float = 30.0):
+        self.bucket = TokenBucket(rate, burst)
+        self.concurrency = AdaptiveConcurrency(
+            max_concurrency, minimum=min_concurrency, maximum=max_concurrency, target_latency=target_latency
+        )
+        self.backoff_base = backoff_base
+        self.backoff_cap = backoff_cap
+
+    @contextmanager
+    def slot(self):
+        """占用一个并发名额并取得令牌，退出时释放名额"""
+        self.concurrency.acquire()
+        try:
+            self.bucket.acquire()
+            yield
+        finally:
+            self.concurrency.release()
+
+    def on_success(self, latency: float):
+        self.concurrency.on_success(latency)
+
+    def on_throttle(self, retry_after: Optional[float] = None):
+        self.concurrency.on_throttle()
+        if retry_after:
+            self.bucket.pause(min(retry_after, self.backoff_cap))
+
+    def backoff(self, attempt: int, retry_after: Optional[float] = None) -> float:
+        return backoff_delay(attempt, self.backoff_base, self.backoff_cap, retry_after)
@@ -0,0 +1,129 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from typing import Dict, Optional
+
+
+class ResponseCache:
+    """
+    API响应的本地缓存（SQLite，响应体zlib压缩）
+    以 (赛季, 赛道, 页码, 用户名) 为键；ttl 内命中直接返回，不发请求；
+    offline 模式下只读缓存（忽略ttl），可用录制好的响应离线调试；
+    stale_while_offline 为真时，网络请求最终失败会退回过期的缓存；
+    总大小超过 max_bytes 时按最近访问时间淘汰
+    """
+
+    def __init__(self, path: str, ttl: float = 600, max_bytes: int = 200 * 1024 * 1024,
+                 offline: bool = False, stale_while_offline: bool = True):
+        self.path = path
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.offline = offline
+        self.stale_while_offline = stale_while_offline
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+        cache_dir = os.path.dirname(path)
+        if cache_dir:
+            os.makedirs(cache_dir, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS responses (
+                season INTEGER NOT NULL,
+                course INTEGER NOT NULL,
+                page INTEGER NOT NULL,
+                name TEXT NOT NULL,
+                body BLOB NOT NULL,
+                size INTEGER NOT NULL,
+                fetched_at REAL NOT NULL,
+                accessed_at REAL NOT NULL,
+                PRIMARY KEY (season, course, page, name)
+            )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_responses_accessed ON responses (accessed_at)")
+        self._conn.commit()
+        self._total_bytes = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+
+    @staticmethod
+    def _key(payload: Dict) -> tuple:
+        """未指定赛道/用户名时分别以 -1 和空串占位，保证主键非空"""
+        course = payload.get("course")
+        return (
+            int(payload.get("season", 0)),
+            -1 if course is None else int(course),
+            int(payload.get("page", 1)),
+            payload.get("name") or "",
+        )
+
+    def get(self, payload: Dict, allow_stale: bool = False) -> Optional[Dict]:
+        """读取缓存，过期（且不允许过期数据）或未命中返回None"""
+        key = self._key(payload)
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT body, fetched_at FROM responses WHERE season=? AND course=? AND page=? AND name=?",
+                key
+            ).fetchone()
+            fresh = row is not None and (self.offline or allow_stale or time.time() - row[1] <= self.ttl)
+            if not fresh:
+                self.misses += 1
+                return None
+            self._conn.execute(
+                "UPDATE responses SET accessed_at=? WHERE season=? AND course=? AND page=? AND name=?",
+                (time.time(),) + key
+            )
+            self._conn.commit()
+            self.hits += 1
+        return json.loads(zlib.decompress(row[0]).decode("utf-8"))
+
+    def put(self, payload: Dict, data: Dict):
+        body = zlib.compress(json.dumps(data, ensure_ascii=False).encode("utf-8"))
+        key = self._key(payload)
+        now = time.time()
+        with self._lock:
+            old = self._conn.execute(
+                "SELECT size FROM responses WHERE season=? AND course=? AND page=? AND name=?",
+                key
+            ).fetchone()
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                key + (body, len(body), now, now)
+            )
+            self._total_bytes += len(body) - (old[0] if old else 0)
+            if self._total_bytes > self.max_bytes:
+                self._evict()
+            self._conn.commit()
+
+    def _evict(self):
+        """按最近访问时间淘汰，直到总大小降到上限的90%以下（调用方需持有锁）"""
+        target = self.max_bytes * 0.9
+        rows = self._conn.execute(
+            "SELECT season, course, page, name, size FROM responses ORDER BY accessed_at"
+        ).fetchall()
+        for season, course, page, name, size in rows:
+            if self._total_bytes <= target:
+                break
+            self._conn.execute(
+                "DELETE FROM responses WHERE season=? AND course=? AND page=? AND name=?",
+                (season, course, page, name)
+            )
+            self._total_bytes -= size
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM responses")
+            self._conn.commit()
+            self._total_bytes = 0
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def summary(self) -> str:
+        total = self.hits + self.misses
+        hit_rate = self.hits / total * 100 if total else 0
+        return (f"缓存命中{self.hits}/{total}次（{hit_rate:.1f}%），"
+                f"占用{self._total_bytes / 1024 / 1024:.1f}MB")
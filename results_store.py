@@ -0,0 +1,273 @@
+import argparse
+import os
+import sqlite3
+import sys
+import threading
+import time
+from typing import Iterable, List, Optional
+
+import pandas as pd
+
+from spider import CONFIG, PLAYER_COLUMN
+from timefmt import times_to_ms
+
+_SELECT_COLUMNS = "player, season, course_id, course, direction, goal_time, time_text, rank_label, car, national_rank, play_dt"
+
+
+def _national_ranks(df: pd.DataFrame) -> pd.Series:
+    """全国順位列：爬取结果为整数，本地CSV为“255位”，只取其中的数字"""
+    if "全国順位" not in df.columns:
+        return pd.Series(float("nan"), index=df.index)
+    return pd.to_numeric(df["全国順位"].astype(str).str.extract(r"(\d+)", expand=False), errors="coerce")
+
+
+def _play_dates(values: pd.Series) -> pd.Series:
+    """
+    記録日统一为 YYYY-MM-DD（爬取结果为 2025-12-21，本地CSV为 2026/01/19），
+    保证按日期排序时不同来源的成绩顺序正确；无法识别的日期保留原文，缺失为 None
+    """
+    text = values.astype(str).str.strip().str.split(" ").str[0].str.replace("/", "-", regex=False)
+    dates = pd.to_datetime(text, format="%Y-%m-%d", errors="coerce").dt.strftime("%Y-%m-%d")
+    dates = dates.where(dates.notna(), values.astype(str).str.strip())
+    return dates.where(values.notna(), None)
+
+
+class ResultsStore:
+    """
+    本地成绩历史库（SQLite）
+    每条成绩以 (玩家, 赛季, 赛道, 成绩) 去重，重复导入只更新全国排名与等级；
+    按玩家、赛季+赛道+成绩、记录日期建立索引，个人最佳、成绩变化和名单内排名都是一次索引查询
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        store_dir = os.path.dirname(path)
+        if store_dir:
+            os.makedirs(store_dir, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS results (
+                player TEXT NOT NULL,
+                season INTEGER NOT NULL,
+                course_id INTEGER NOT NULL,
+                course TEXT NOT NULL,
+                direction TEXT NOT NULL,
+                goal_time INTEGER NOT NULL,
+                time_text TEXT NOT NULL,
+                rank_label TEXT,
+                car TEXT,
+                national_rank INTEGER,
+                play_dt TEXT,
+                source TEXT NOT NULL,
+                recorded_at REAL NOT NULL,
+                PRIMARY KEY (player, season, course_id, goal_time)
+            );
+            CREATE INDEX IF NOT EXISTS idx_results_course ON results (season, course_id, goal_time);
+            CREATE INDEX IF NOT EXISTS idx_results_player_dt ON results (player, play_dt);
+            CREATE INDEX IF NOT EXISTS idx_results_play_dt ON results (play_dt);
+            -- 早期版本按原文保存了本地CSV的 2026/01/19 格式日期
+            UPDATE results SET play_dt = REPLACE(play_dt, '/', '-') WHERE play_dt LIKE '%/%';
+        """)
+        # (赛道名, 方向) -> Course_ID，CSV中只有赛道名和方向
+        self._course_ids = {
+            (CONFIG["course_name_map"][course_id], CONFIG["course_direction_map"][course_id]): course_id
+            for course_id in CONFIG["course_name_map"]
+        }
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def add_results(self, df: pd.DataFrame, season: int, player: Optional[str] = None, source: str = "crawl") -> int:
+        """
+        写入一张成绩表（爬取结果或本地CSV），返回新增条数
+        含玩家列时按行取玩家名，否则全部记在 player 名下；
+        日文方向名（左周り、下り等）按 CONFIG["direction_aliases"] 换算，无法识别的赛道与成绩格式跳过并列出
+        """
+        if df.empty:
+            return 0
+        if PLAYER_COLUMN in df.columns:
+            players = df[PLAYER_COLUMN].astype(str)
+        elif player:
+            players = pd.Series(player, index=df.index)
+        else:
+            raise ValueError("成绩表没有玩家列，需指定玩家名")
+
+        directions = df["ルート"].astype(str).str.strip().replace(CONFIG["direction_aliases"])
+        course_ids = pd.Series(
+            [self._course_ids.get(key) for key in zip(df["コース"], directions)], index=df.index, dtype=object
+        )
+        goal_times = pd.Series(times_to_ms(df["タイム"], errors="coerce"), index=df.index)
+        valid = course_ids.notna() & goal_times.notna()
+        skipped = int((~valid).sum())
+        if skipped:
+            unknown = course_ids.isna()
+            pairs = sorted({f"{course} {direction}" for course, direction
+                            in zip(df["コース"][unknown].astype(str), df["ルート"][unknown].astype(str))})
+            detail = f"（无法识别的赛道与方向：{'、'.join(pairs)}）" if pairs else ""
+            print(f"⚠️ {skipped}条成绩的赛道或成绩格式无法识别，未写入历史库{detail}")
+
+        national_ranks = _national_ranks(df)
+        play_dates = _play_dates(df["記録日"])
+        now = time.time()
+        rows = [
+            (player_name, int(season), int(course_id), course, direction, int(goal_time), str(time_text),
+             rank_label, car, None if pd.isna(national_rank) else int(national_rank),
+             None if pd.isna(play_dt) else play_dt, source, now)
+            for player_name, course_id, course, direction, goal_time, time_text, rank_label, car, national_rank, play_dt
+            in zip(players[valid], course_ids[valid], df["コース"][valid], directions[valid], goal_times[valid],
+                   df["タイム"][valid], df["タイム評価"][valid], df["記録車種"][valid], national_ranks[valid],
+                   play_dates[valid])
+        ]
+        with self._lock:
+            before = self._conn.total_changes
+            self._conn.executemany("""
+                INSERT OR IGNORE INTO results VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """, rows)
+            inserted = self._conn.total_changes - before
+            # 已有的成绩只刷新会随他人成绩变化的全国排名
+            self._conn.executemany("""
+                UPDATE results SET national_rank = COALESCE(?, national_rank), rank_label = ?
+                WHERE player = ? AND season = ? AND course_id = ? AND goal_time = ?
+            """, [(row[9], row[7], row[0], row[1], row[2], row[5]) for row in rows])
+            self._conn.commit()
+        return inserted
+
+    def import_csv(self, csv_path: str, season: int, player: Optional[str] = None) -> int:
+        df = pd.read_csv(csv_path, encoding="utf-8-sig")
+        return self.add_results(df, season, player=player, source=os.path.basename(csv_path))
+
+    def _query(self, sql: str, params: Iterable = ()) -> pd.DataFrame:
+        with self._lock:
+            return pd.read_sql_query(sql, self._conn, params=list(params))
+
+    @staticmethod
+    def _to_table(raw: pd.DataFrame, with_player: bool = False) -> pd.DataFrame:
+        """查询结果统一使用成绩表的列名，可直接交给 core.create_table_image 渲染"""
+        table = pd.DataFrame({
+            "コース": raw["course"],
+            "ルート": raw["direction"],
+            "タイム": raw["time_text"],
+            "タイム評価": raw["rank_label"],
+            "記録車種": raw["car"],
+            "全国順位": raw["national_rank"].astype("Int64"),
+            "記録日": raw["play_dt"],
+        })
+        if with_player:
+            table.insert(0, PLAYER_COLUMN, raw["player"])
+        return table
+
+    def personal_bests(self, player: str, season: Optional[int] = None) -> pd.DataFrame:
+        """玩家每条赛道的最佳成绩（指定赛季，或跨全部赛季）"""
+        where, params = "player = ?", [player]
+        if season is not None:
+            where += " AND season = ?"
+            params.append(season)
+        # SQLite 中与 MIN() 同时选出的其余列取自最小值所在行
+        raw = self._query(f"""
+            SELECT player, season, course_id, course, direction, MIN(goal_time) AS goal_time, time_text,
+                   rank_label, car, national_rank, play_dt
+            FROM results WHERE {where}
+            GROUP BY course_id ORDER BY course_id
+        """, params)
+        return self._to_table(raw)
+
+    def progression(self, player: str, course_id: int, season: Optional[int] = None) -> pd.DataFrame:
+        """玩家在某条赛道历次记录到的成绩，按记录日期排序"""
+        where, params = "player = ? AND course_id = ?", [player, course_id]
+        if season is not None:
+            where += " AND season = ?"
+            params.append(season)
+        raw = self._query(f"""
+            SELECT {_SELECT_COLUMNS} FROM results WHERE {where}
+            ORDER BY play_dt, goal_time DESC
+        """, params)
+        return self._to_table(raw)
+
+    def top_n(self, season: int, n: int = 3, players: Optional[List[str]] = None,
+              course_id: Optional[int] = None) -> pd.DataFrame:
+        """每条赛道成绩最好的前 n 名玩家（可限定名单和赛道），每名玩家只取个人最佳"""
+        where, params = "season = ?", [season]
+        if players:
+            where += f" AND player IN ({', '.join('?' * len(players))})"
+            params.extend(players)
+        if course_id is not None:
+            where += " AND course_id = ?"
+            params.append(course_id)
+        raw = self._query(f"""
+            SELECT * FROM (
+                SELECT *, ROW_NUMBER() OVER (PARTITION BY course_id ORDER BY goal_time, play_dt) AS position
+                FROM (
+                    SELECT player, season, course_id, course, direction, MIN(goal_time) AS goal_time, time_text,
+                           rank_label, car, national_rank, play_dt
+                    FROM results WHERE {where}
+                    GROUP BY player, course_id
+                )
+            )
+            WHERE position <= ?
+            ORDER BY course_id, position
+        """, params + [n])
+        return self._to_table(raw, with_player=True)
+
+
+def open_store(path: Optional[str] = None) -> Optional[ResultsStore]:
+    """按配置打开历史库，未启用时返回None"""
+    store_config = CONFIG["results_store"]
+    if not store_config["enabled"]:
+        return None
+    return ResultsStore(path or store_config["path"])
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="查询本地成绩历史库")
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument("--db", default=CONFIG["results_store"]["path"], help="历史库路径")
+    common.add_argument("--season", type=int, help="赛季")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    best = subparsers.add_parser("best", parents=[common], help="个人最佳")
+    best.add_argument("player")
+    progress = subparsers.add_parser("progress", parents=[common], help="某条赛道的成绩变化")
+    progress.add_argument("player")
+    progress.add_argument("course_id", type=int)
+    top = subparsers.add_parser("top", parents=[common], help="每条赛道名单内前N名")
+    top.add_argument("-n", type=int, default=3)
+    top.add_argument("--players", help="玩家ID，多个用逗号分隔（默认全部）")
+    top.add_argument("--course", type=int, help="只看某条赛道")
+    import_parser = subparsers.add_parser("import", parents=[common], help="导入成绩CSV")
+    import_parser.add_argument("csv_files", nargs="+")
+    import_parser.add_argument("--player", help="CSV不含玩家列时的玩家名")
+    args = parser.parse_args(argv)
+
+    with ResultsStore(args.db) as store:
+        if args.command == "best":
+            df = store.personal_bests(args.player, args.season)
+        elif args.command == "progress":
+            df = store.progression(args.player, args.course_id, args.season)
+        elif args.command == "top":
+            if args.season is None:
+                parser.error("top 需要 --season")
+            players = [name.strip() for name in args.players.split(",")] if args.players else None
+            df = store.top_n(args.season, args.n, players=players, course_id=args.course)
+        else:
+            if args.season is None:
+                parser.error("import 需要 --season")
+            for csv_path in args.csv_files:
+                print(f"✅ {csv_path}：新增{store.import_csv(csv_path, args.season, args.player)}条成绩")
+            return 0
+
+    if df.empty:
+        print("❌ 没有符合条件的成绩")
+        return 1
+    print(df.to_string(index=False))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,246 @@
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from contextlib import contextmanager
+from typing import List, Dict, Optional
+from urllib.parse import urlparse
+
+from instrumentation import METRICS
+
+
+class HostLimiter:
+    """按主机限制同时进行的请求数"""
+
+    def __init__(self, per_host_limit: int):
+        self.per_host_limit = max(1, per_host_limit)
+        self._semaphores = {}
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def limit(self, url: str):
+        host = urlparse(url).netloc
+        with self._lock:
+            semaphore = self._semaphores.get(host)
+            if semaphore is None:
+                semaphore = threading.BoundedSemaphore(self.per_host_limit)
+                self._semaphores[host] = semaphore
+        with semaphore:
+            yield
+
+
+class _CancellablePool(ThreadPoolExecutor):
+    """记录尚未完成的任务，以便中断时逐个取消（shutdown 的 cancel_futures 参数需要 Python 3.9+）"""
+
+    def __init__(self, max_workers: int):
+        super().__init__(max_workers=max_workers)
+        self._unfinished = set()
+        self._unfinished_lock = threading.Lock()
+
+    def submit(self, fn, *args, **kwargs):
+        future = super().submit(fn, *args, **kwargs)
+        with self._unfinished_lock:
+            self._unfinished.add(future)
+        future.add_done_callback(self._forget)
+        return future
+
+    def _forget(self, future):
+        with self._unfinished_lock:
+            self._unfinished.discard(future)
+
+    def cancel_pending(self):
+        with self._unfinished_lock:
+            futures = list(self._unfinished)
+        for future in futures:
+            future.cancel()
+
+
+@contextmanager
+def worker_pool(max_workers: int):
+    """
+    请求线程池：正常结束时等待全部任务完成；
+    出错或 Ctrl+C 时取消所有排队中的任务并立即返回，只有正在进行的请求会继续跑完（结果丢弃），
+    避免中断后仍把剩余的页全部请求一遍
+    """
+    pool = _CancellablePool(max_workers)
+    try:
+        yield pool
+    except BaseException:
+        pool.cancel_pending()
+        pool.shutdown(wait=False)
+        raise
+    pool.shutdown(wait=True)
+
+
+class CrawlScheduler:
+    """
+    跨赛道并行爬取调度器
+    所有赛道共用一个线程池和爬虫的连接池：先为每条赛道请求第1页，
+    得知总页数后再把剩余页加入同一队列，空闲线程总是去取仍有剩余页的赛道的任务；
+    early_stop 模式下所有目标都匹配到后取消该赛道剩余请求，locate 模式下每条赛道按成绩定位目标页；
+    传入 journal 时每爬完一页/一条赛道即写入断点日志，续爬时跳过日志中已完成的部分
+    （locate 模式只能按赛道续爬）
+    """
+
+    def __init__(self, crawler, max_workers: Optional[int] = None, per_host_limit: Optional[int] = None,
+                 mode: Optional[str] = None, journal=None):
+        self.crawler = crawler
+        self.mode = mode or crawler.mode
+        self.journal = journal
+        # 全局并发上限默认与爬虫连接池大小一致
+        self.max_workers = max(1, max_workers or crawler.max_workers)
+        self.host_limiter = HostLimiter(per_host_limit or self.max_workers)
+        self.course_timings = {}
+        self._course_started = {}
+        self._timing_lock = threading.Lock()
+
+    def _fetch(self, course_id: int, page: int) -> Optional[Dict]:
+        with self._timing_lock:
+            # 以第一个请求真正开始执行的时间作为赛道起点，排除排队等待
+            self._course_started.setdefault(course_id, time.perf_counter())
+        with self.host_limiter.limit(self.crawler.api_url):
+            return self.crawler._request_api(page=page, course_id=course_id)
+
+    def map_courses(self, course_list: List[int], task) -> Dict[int, object]:
+        """在线程池中并行执行每条赛道的任务 task(course_id, fetch)，按赛道顺序返回结果"""
+        with worker_pool(self.max_workers) as pool:
+            futures = {course_id: pool.submit(task, course_id, self._fetch) for course_id in course_list}
+            return {course_id: futures[course_id].result() for course_id in course_list}
+
+    def _locate(self, course_id: int) -> Dict[int, List[Dict]]:
+        with self._timing_lock:
+            self._course_started.setdefault(course_id, time.perf_counter())
+        return self.crawler.locate_course(course_id, fetch=self._fetch)
+
+    def run(self, course_list: List[int]) -> Dict[int, List[Dict]]:
+        """爬取所有赛道，返回 {赛道ID: 匹配记录}，记录按页码排序"""
+        mode = self.mode
+        page_results = {course_id: {} for course_id in course_list}
+        total_pages = {course_id: None for course_id in course_list}
+        page_counts = {course_id: 0 for course_id in course_list}
+        course_futures = {course_id: set() for course_id in course_list}
+        found_usernames = {course_id: set() for course_id in course_list}
+        failed_courses = set()
+        pending = {}
+        journal = self.journal
+        # 尚未提交的页；提前停止模式下每条赛道最多同时提交 max_workers 页，
+        # 找齐目标玩家后剩余的页直接丢弃，不再请求
+        queued = {course_id: deque() for course_id in course_list}
+        window = self.max_workers if mode == "early_stop" else None
+
+        with worker_pool(self.max_workers) as pool:
+            def submit(course_id: int, page: int):
+                future = pool.submit(self._fetch, course_id, page)
+                pending[future] = (course_id, page)
+                course_futures[course_id].add(future)
+
+            def refill(course_id: int):
+                while queued[course_id] and (window is None or len(course_futures[course_id]) < window):
+                    submit(course_id, queued[course_id].popleft())
+
+            def stop_course(course_id: int):
+                """取消该赛道尚未开始的请求，已在进行中的请求结果将被忽略"""
+                queued[course_id].clear()
+                for future in list(course_futures[course_id]):
+                    if future.cancel():
+                        pending.pop(future, None)
+                        course_futures[course_id].discard(future)
+
+            def complete(course_id: int, locate_pages: Optional[Dict[int, List[Dict]]] = None):
+                self._finish_course(course_id, page_results[course_id])
+                # 有页最终失败的赛道不标记完成，续爬时补爬缺失的页
+                if journal and course_id not in failed_courses:
+                    journal.finish_course(course_id, locate_pages)
+
+            for course_id in course_list:
+                if journal and journal.course_done(course_id):
+                    page_results[course_id] = journal.pages(course_id)
+                    print(f"♻️ 赛道{course_id} 上次已完成，沿用断点日志")
+                elif mode == "locate":
+                    # 定位模式下每条赛道是一个串行探测任务，多条赛道之间并行
+                    future = pool.submit(self._locate, course_id)
+                    pending[future] = (course_id, None)
+                    course_futures[course_id].add(future)
+                elif journal and 1 in journal.pages(course_id):
+                    # 续爬：沿用已保存的页，只提交缺失的页
+                    page_results[course_id] = journal.pages(course_id)
+                    total_pages[course_id] = journal.last_page(course_id)
+                    for records in page_results[course_id].values():
+                        found_usernames[course_id].update(record["プレイヤー"] for record in records)
+                    if mode != "early_stop" or not self.crawler._targets_found(found_usernames[course_id]):
+                        queued[course_id].extend(next_page for next_page in range(2, total_pages[course_id] + 1)
+                                                 if next_page not in page_results[course_id])
+                        refill(course_id)
+                    if not course_futures[course_id]:
+                        complete(course_id)
+                else:
+                    submit(course_id, 1)
+
+            stopped = set()
+            while pending:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    course_id, page = pending.pop(future)
+                    course_futures[course_id].discard(future)
+
+                    if page is None:
+                        page_results[course_id] = future.result()
+                        if self.crawler._course_skipped(course_id):
+                            failed_courses.add(course_id)
+                    elif course_id not in stopped:
+                        page_counts[course_id] += 1
+                        page_data = future.result()
+                        if not page_data:
+                            failed_courses.add(course_id)
+                        else:
+                            # 全国排名只与页码和页内序号有关，解析顺序不影响结果
+                            matched = self.crawler._parse_rank_data(page_data, course_id, current_page=page)
+                            page_results[course_id][page] = matched
+                            found_usernames[course_id].update(record["プレイヤー"] for record in matched)
+                            last_page = page_data.get("pagination", {}).get("last_page", 1)
+                            if journal:
+                                journal.add_page(course_id, page, last_page, matched)
+                            if page == 1:
+                                total_pages[course_id] = last_page
+                                print(f"✅ 赛道{course_id} 总页数：{last_page}")
+                            if mode == "early_stop" and self.crawler._targets_found(found_usernames[course_id]):
+                                stopped.add(course_id)
+                                stop_course(course_id)
+                            elif page == 1:
+                                queued[course_id].extend(range(2, total_pages[course_id] + 1))
+                        refill(course_id)
+
+                        if total_pages[course_id] and (course_futures[course_id] or queued[course_id]):
+                            print(f"正在爬取 赛道{course_id} 已完成{page_counts[course_id]}/{total_pages[course_id]}页...", end='\r')
+
+                    if not course_futures[course_id] and course_id not in self.course_timings:
+                        complete(course_id, page_results[course_id] if page is None else None)
+
+        # 按赛道顺序、页码顺序合并，保证输出顺序确定
+        return {
+            course_id: [
+                record
+                for page in sorted(page_results[course_id])
+                for record in page_results[course_id][page]
+            ]
+            for course_id in course_list
+        }
+
+    def _finish_course(self, course_id: int, results: Dict[int, List[Dict]]):
+        started = self._course_started.get(course_id, time.perf_counter())
+        self.course_timings[course_id] = time.perf_counter() - started
+        METRICS.observe("crawl_course_seconds", self.course_timings[course_id],
+                        detail={"course": course_id, "pages": len(results)})
+        METRICS.count("crawl_pages_total", len(results), detail={"course": course_id})
+        matched = sum(len(records) for records in results.values())
+        print(f"========== 赛道{course_id} 爬取完成，匹配到{matched}条成绩，"
+              f"耗时{self.course_timings[course_id]:.2f}秒 ==========")
+
+    def report_timings(self, top: int = 10):
+        """按耗时降序输出各赛道爬取时间"""
+        if not self.course_timings:
+            return
+        print(f"\n【赛道耗时排行（前{top}）】")
+        ranking = sorted(self.course_timings.items(), key=lambda item: item[1], reverse=True)
+        for course_id, seconds in ranking[:top]:
+            print(f"赛道{course_id:>3}：{seconds:.2f}秒")
@@ -0,0 +1,319 @@
+from __future__ import annotations
+
+import argparse
+import glob
+import json
+import os
+import sys
+import threading
+import time
+from typing import Dict, Iterable, List, Optional
+
+from car_styles import UNKNOWN_CAR, parse_car_id
+from lazy_import import lazy_import
+from rank_index import RankIndex
+from spider import CAR_STYLES, CONFIG, PLAYER_COLUMN, categorize_results
+from timefmt import ms_to_time, ms_to_times, time_to_ms
+
+np = lazy_import("numpy")
+pd = lazy_import("pandas")
+
+SNAPSHOT_VERSION = 1
+
+# 每行26字节：玩家名与车型均为字典编码的整数，记录日期为秒精度时间戳
+SNAPSHOT_FIELDS = [
+    ("course", "<u2"),
+    ("rank", "<u4"),
+    ("user", "<u4"),
+    ("car", "<u4"),
+    ("goal_time", "<u4"),
+    ("play_dt", "<M8[s]"),
+]
+
+CSV_COLUMNS = ["コース", "ルート", "タイム", "タイム評価", "記録車種", "全国順位", "記録日"]
+# 接口未给出车型ID时写入的占位值
+NO_CAR = 0xFFFFFFFF
+
+
+class SnapshotWriter:
+    """
+    收集完整排行榜的快照（爬虫每解析一页调用一次 add_page，线程安全）
+    玩家名在写入时即转为整数编号，车型沿用接口的 style_car_id，名称取自全局车型字典
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pages = {}
+        self._courses = {}
+        self._user_ids = {}
+        self.users = []
+
+    def _user_id(self, username: str) -> int:
+        user_id = self._user_ids.get(username)
+        if user_id is None:
+            user_id = self._user_ids[username] = len(self.users)
+            self.users.append(username)
+        return user_id
+
+    def add_page(self, course_id: int, page: int, data: Dict):
+        pagination = data.get("pagination", {})
+        per_page = pagination.get("per_page", 15)
+        rank_list = data.get("list", [])
+        car_ids = [parse_car_id(item.get("style_car_id")) for item in rank_list]
+        with self._lock:
+            self._courses[course_id] = {"total": pagination.get("total"), "last_page": pagination.get("last_page", 1)}
+            # 同一页重复解析（重试、续爬）时以最后一次为准
+            self._pages[(course_id, page)] = (
+                [course_id] * len(rank_list),
+                [(page - 1) * per_page + idx + 1 for idx in range(len(rank_list))],
+                [self._user_id(item.get("userinfo", {}).get("username", "")) for item in rank_list],
+                [NO_CAR if car_id is None else car_id for car_id in car_ids],
+                [item.get("goal_time", 0) for item in rank_list],
+                [item.get("play_dt", "") for item in rank_list],
+            )
+
+    def __len__(self) -> int:
+        return sum(len(columns[0]) for columns in self._pages.values())
+
+    def to_array(self) -> np.ndarray:
+        """按 (赛道, 名次) 排序的结构化数组"""
+        with self._lock:
+            pages = list(self._pages.values())
+        records = np.empty(sum(len(columns[0]) for columns in pages), dtype=SNAPSHOT_FIELDS)
+        for field, position in (("course", 0), ("rank", 1), ("user", 2), ("car", 3), ("goal_time", 4)):
+            records[field] = [value for columns in pages for value in columns[position]]
+        play_dt = pd.to_datetime(pd.Series([value for columns in pages for value in columns[5]], dtype=object),
+                                 format="%Y-%m-%d %H:%M:%S", errors="coerce")
+        records["play_dt"] = play_dt.to_numpy(dtype="datetime64[s]")
+        return records[np.lexsort((records["rank"], records["course"]))]
+
+    def save(self, root: str, season: int, skipped_requests: Iterable[Dict] = ()) -> str:
+        """写入 root/S{赛季}_{时间}.npy 与同名 .json（字典与各赛道信息），返回 .npy 路径"""
+        os.makedirs(root, exist_ok=True)
+        created_at = time.time()
+        base = os.path.join(root, f"S{season}_{time.strftime('%Y%m%d_%H%M%S', time.localtime(created_at))}")
+        records = self.to_array()
+        incomplete = sorted({payload.get("course") for payload in skipped_requests if "course" in payload})
+        meta = {
+            "version": SNAPSHOT_VERSION,
+            "season": season,
+            "created_at": created_at,
+            "rows": len(records),
+            "courses": {str(course_id): info for course_id, info in sorted(self._courses.items())},
+            "incomplete_courses": incomplete,
+            # 快照自带用到的车型名称，不依赖本机的车型字典
+            "cars": {str(car_id): CAR_STYLES.name(car_id) for car_id in np.unique(records["car"]).tolist()
+                     if car_id != NO_CAR},
+            "users": self.users,
+        }
+        # 先写临时文件再替换，中途退出不会留下半个快照
+        with open(base + ".npy.tmp", "wb") as f:
+            np.save(f, records)
+        with open(base + ".json.tmp", "w", encoding="utf-8") as f:
+            json.dump(meta, f, ensure_ascii=False)
+        os.replace(base + ".json.tmp", base + ".json")
+        os.replace(base + ".npy.tmp", base + ".npy")
+        return base + ".npy"
+
+
+class LeaderboardSnapshot:
+    """
+    排行榜快照（只读，内存映射）
+    记录按 (赛道, 名次) 排序，打开时只读取赛道列建立偏移索引，其余数据按需从磁盘映射；
+    单条赛道的查询是一次切片加二分查找，玩家查询是对玩家编号列的一次向量比较
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(os.path.splitext(path)[0] + ".json", "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        if meta.get("version") != SNAPSHOT_VERSION:
+            raise ValueError(f"不支持的快照版本：{meta.get('version')}")
+        self.season = meta["season"]
+        self.created_at = meta["created_at"]
+        self.users = meta["users"]
+        self.cars = {int(car_id): name for car_id, name in meta["cars"].items()}
+        self.course_info = {int(course_id): info for course_id, info in meta["courses"].items()}
+        self.incomplete_courses = meta["incomplete_courses"]
+        self.records = np.load(path, mmap_mode="r")
+
+        course_ids, starts = np.unique(self.records["course"], return_index=True)
+        ends = list(starts[1:]) + [len(self.records)]
+        self._course_slices = {int(course_id): slice(int(start), int(end))
+                               for course_id, start, end in zip(course_ids, starts, ends)}
+        self._user_ids = None
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+    @property
+    def course_ids(self) -> List[int]:
+        return list(self._course_slices)
+
+    def course(self, course_id: int) -> np.ndarray:
+        """某条赛道的全部记录（按名次排序，内存映射视图）"""
+        return self.records[self._course_slices.get(course_id, slice(0, 0))]
+
+    def user_id(self, username: str) -> Optional[int]:
+        if self._user_ids is None:
+            self._user_ids = {name: idx for idx, name in enumerate(self.users)}
+        return self._user_ids.get(username)
+
+    def player_records(self, username: str) -> np.ndarray:
+        """玩家在各赛道的记录（按赛道排序），不在快照中时为空数组"""
+        user_id = self.user_id(username)
+        if user_id is None:
+            return self.records[:0]
+        return self.records[np.flatnonzero(self.records["user"] == user_id)]
+
+    def player_record(self, username: str, course_id: int) -> Optional[np.void]:
+        user_id = self.user_id(username)
+        if user_id is None:
+            return None
+        course = self.course(course_id)
+        hits = np.flatnonzero(course["user"] == user_id)
+        return course[hits[0]] if len(hits) else None
+
+    def rank_for_time(self, course_id: int, goal_ms: int) -> int:
+        """该成绩在快照中的名次（与已有成绩相同时排在其前面）"""
+        return int(np.searchsorted(self.course(course_id)["goal_time"], goal_ms, side="left")) + 1
+
+    def time_at_rank(self, course_id: int, rank: int) -> Optional[int]:
+        """第 rank 名的成绩（毫秒），超出榜单时返回None"""
+        course = self.course(course_id)
+        if not 1 <= rank <= len(course):
+            return None
+        return int(course["goal_time"][rank - 1])
+
+    def gap(self, username: str, course_id: int, goal_ms: int) -> Optional[int]:
+        """玩家成绩与目标成绩的差距（毫秒，正数为还差多少），玩家无记录时返回None"""
+        record = self.player_record(username, course_id)
+        if record is None:
+            return None
+        return int(record["goal_time"]) - int(goal_ms)
+
+    def player_table(self, usernames: Iterable[str], rank_index: Optional[RankIndex] = None) -> pd.DataFrame:
+        """
+        按爬取结果的格式生成成绩表，无需重新爬取；多名玩家时首列为玩家名
+        rank_index 为空时按配置的等级标准库判定等级
+        """
+        usernames = list(dict.fromkeys(usernames))
+        rank_index = rank_index or load_rank_index()
+        frames = []
+        for username in usernames:
+            records = self.player_records(username)
+            if not len(records):
+                continue
+            course_ids = records["course"].astype(int)
+            goal_times = records["goal_time"].astype(np.int64)
+            frame = pd.DataFrame({
+                "コース": [CONFIG["course_name_map"].get(course_id, "未知赛道") for course_id in course_ids],
+                "ルート": [CONFIG["course_direction_map"].get(course_id, "未知方向") for course_id in course_ids],
+                "タイム": ms_to_times(goal_times),
+                "タイム評価": rank_index.judge_many_by_id(course_ids, goal_times),
+                "記録車種": [self.cars.get(int(car_id), UNKNOWN_CAR) for car_id in records["car"]],
+                "全国順位": records["rank"].astype(str),
+                "記録日": pd.Series(records["play_dt"]).dt.strftime("%Y-%m-%d").fillna("").to_numpy(),
+            })
+            if len(usernames) > 1:
+                frame.insert(0, PLAYER_COLUMN, username)
+            frames.append(frame)
+        if not frames:
+            return pd.DataFrame(columns=([PLAYER_COLUMN] if len(usernames) > 1 else []) + CSV_COLUMNS)
+        df = categorize_results(pd.concat(frames, ignore_index=True))
+        df.attrs["season"] = self.season
+        if len(usernames) == 1:
+            df.attrs["player"] = usernames[0]
+        return df
+
+
+def load_rank_index() -> RankIndex:
+    standard_times = pd.read_csv(CONFIG["standard_time_path"], encoding="utf-8-sig")
+    for rank in CONFIG["rank_priority"]:
+        standard_times[rank] = standard_times[rank].fillna("99'99\"999")
+    return RankIndex(standard_times, CONFIG["rank_priority"])
+
+
+def snapshot_paths(season: Optional[int] = None, root: Optional[str] = None) -> List[str]:
+    """快照文件路径，按创建时间升序"""
+    pattern = f"S{season}_*.npy" if season is not None else "S*_*.npy"
+    return sorted(glob.glob(os.path.join(root or CONFIG["snapshot"]["path"], pattern)),
+                  key=lambda path: os.path.basename(path).split("_", 1)[1])
+
+
+def open_snapshot(season: Optional[int] = None, root: Optional[str] = None) -> Optional[LeaderboardSnapshot]:
+    """打开最新的快照（可限定赛季），没有时返回None"""
+    paths = snapshot_paths(season, root)
+    return LeaderboardSnapshot(paths[-1]) if paths else None
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="查询本地排行榜快照（由 --snapshot 爬取生成）")
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument("--root", default=CONFIG["snapshot"]["path"], help="快照目录")
+    common.add_argument("--season", type=int, help="赛季（默认最新的快照）")
+    common.add_argument("--file", help="直接指定快照文件（.npy）")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    subparsers.add_parser("info", parents=[common], help="快照概况")
+    player = subparsers.add_parser("player", parents=[common], help="玩家成绩表（含全国排名与等级）")
+    player.add_argument("players", nargs="+")
+    course = subparsers.add_parser("course", parents=[common], help="某条赛道的前N名")
+    course.add_argument("course_id", type=int)
+    course.add_argument("-n", type=int, default=20)
+    gap = subparsers.add_parser("gap", parents=[common], help="玩家与某名次或某成绩的差距")
+    gap.add_argument("player")
+    gap.add_argument("course_id", type=int)
+    target = gap.add_mutually_exclusive_group(required=True)
+    target.add_argument("--rank", type=int, help="目标名次")
+    target.add_argument("--time", help="目标成绩，如 2'25\"000")
+    args = parser.parse_args(argv)
+
+    snapshot = LeaderboardSnapshot(args.file) if args.file else open_snapshot(args.season, args.root)
+    if snapshot is None:
+        print("❌ 未找到排行榜快照，请先以 --snapshot 爬取")
+        return 1
+
+    if args.command == "info":
+        created = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(snapshot.created_at))
+        print(f"📦 {snapshot.path}：第{snapshot.season}赛季，{created}，{len(snapshot)}条成绩，"
+              f"{len(snapshot.course_ids)}条赛道，{len(snapshot.users)}名玩家，{len(snapshot.cars)}种车型")
+        if snapshot.incomplete_courses:
+            print(f"⚠️ 以下赛道有页面爬取失败，数据不完整：{', '.join(map(str, snapshot.incomplete_courses))}")
+        return 0
+
+    if args.command == "player":
+        df = snapshot.player_table(args.players)
+        if df.empty:
+            print("❌ 快照中没有这些玩家的成绩")
+            return 1
+        print(df.to_string(index=False))
+        return 0
+
+    if args.command == "course":
+        records = snapshot.course(args.course_id)[:args.n]
+        if not len(records):
+            print(f"❌ 快照中没有赛道{args.course_id}")
+            return 1
+        for record in records:
+            print(f"{int(record['rank']):>6}  {ms_to_time(int(record['goal_time']))}  "
+                  f"{snapshot.users[record['user']]}  {snapshot.cars.get(int(record['car']), UNKNOWN_CAR)}")
+        return 0
+
+    goal_ms = time_to_ms(args.time) if args.time else snapshot.time_at_rank(args.course_id, args.rank)
+    if goal_ms is None:
+        print(f"❌ 赛道{args.course_id}没有第{args.rank}名")
+        return 1
+    difference = snapshot.gap(args.player, args.course_id, goal_ms)
+    if difference is None:
+        print(f"❌ 快照中没有{args.player}在赛道{args.course_id}的成绩")
+        return 1
+    record = snapshot.player_record(args.player, args.course_id)
+    target = f"第{args.rank}名" if args.rank else f"成绩{args.time}（约第{snapshot.rank_for_time(args.course_id, goal_ms)}名）"
+    status = f"还差{ms_to_time(difference)}" if difference > 0 else f"已领先{ms_to_time(-difference)}"
+    print(f"{args.player}：第{int(record['rank'])}名 {ms_to_time(int(record['goal_time']))}，"
+          f"距{target} {ms_to_time(goal_ms)} {status}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,9 +1,23 @@
+from __future__ import annotations
+
 import json
-import re
-import requests
-import pandas as pd
-from bs4 import BeautifulSoup
-from typing import List, Dict, Optional
+import threading
+import time
+from typing import Iterable, List, Dict, Optional, Set
+
+from car_styles import CarStyleRegistry, parse_car_id
+from crawl_journal import CrawlJournal
+from crawl_state import CrawlState
+from instrumentation import METRICS
+from lazy_import import lazy_import
+from rank_index import UNKNOWN_RANK, RankIndex, judge_ranks
+from ratelimit import RateLimiter, parse_retry_after
+from response_cache import ResponseCache
+from scheduler import CrawlScheduler
+from timefmt import ms_to_time, time_to_ms
+from transport import TRANSPORT_KINDS, Transport, TransportError, create_transport
+
+pd = lazy_import("pandas")
 
 CONFIG = {
     "base_web_url": "https://arcadezone.cn/ranking#timetrial",
@@ -17,9 +31,56 @@ CONFIG = {
         "Origin": "https://arcadezone.cn",
     },
     "player_id_path": "Player_ID.dat",
+    "roster_path": "Roster.dat",  # 多人批量爬取的名单文件
+    "state_path": "./cache/crawl_state.json",  # 增量爬取状态文件
+    "car_styles_path": "./cache/car_styles.json",  # 各响应 carStyles 合并后的车型字典
+    # 本地成绩历史库：每次爬取/导入的成绩都会写入，可查询个人最佳、成绩变化与名单内排名
+    "results_store": {
+        "enabled": True,
+        "path": "./history/results.sqlite3",
+    },
+    # 排行榜快照：以 --snapshot 爬取时保存每条赛道的完整排行榜，之后可在本地查询任意玩家的成绩与排名
+    "snapshot": {
+        "path": "./snapshots",
+    },
+    # 断点日志：每爬完一页即写入，中途退出后重新运行从断点继续，完整结束后自动删除
+    "journal": {
+        "enabled": True,
+        "path": "./cache/crawl_journal.jsonl",
+        "max_age": 86400,  # 超过该秒数的断点日志不再续用
+    },
     "standard_time_path": "./assets/rank.csv",  # 标准等级时间库路径
     "timeout": 30,
     "max_retry": 3,
+    # 限流与退避：令牌桶每秒 rate 个请求、突发 burst 个；延迟超过 target_latency 秒时降低并发；
+    # 重试等待为 [0, min(backoff_cap, backoff_base*2^n)] 内的随机值，服务器给出 Retry-After 时至少等待该时长
+    "rate_limit": {
+        "rate": 20,
+        "burst": 20,
+        "target_latency": 3.0,
+        "backoff_base": 0.5,
+        "backoff_cap": 30,
+    },
+    "max_workers": 8,  # 全局并发请求数上限（1为串行）
+    "per_host_limit": 8,  # 同一主机同时进行的请求数上限
+    # 传输层：requests 为线程共享连接池；asyncio 使用 httpx 异步连接池（需安装 httpx，http2 另需 h2）
+    "transport": {
+        "kind": "requests",
+        "http2": False,
+        "keepalive_expiry": 30,  # 空闲长连接保留秒数（仅 asyncio）
+    },
+    # 爬取模式：full 爬取全部页；early_stop 匹配到目标后结束该赛道；locate 按成绩倍增+二分定位目标所在页
+    "crawl_mode": "full",
+    # 响应缓存：ttl秒内重跑直接读取本地缓存；offline为真时只读缓存、不联网
+    "cache": {
+        "enabled": True,
+        "path": "./cache/responses.sqlite3",
+        "ttl": 600,
+        "max_bytes": 200 * 1024 * 1024,
+        "offline": False,
+        "stale_while_offline": True,
+    },
+    "target_courses": [0, 2, 4, 6, 8, 10, 12, 14, 16, 18, 20, 22, 24, 26, 28, 30, 32, 34, 36, 38, 40, 42, 44, 46, 48, 50, 52, 54, 56, 58, 60, 62, 64, 66, 68, 70, 72, 74, 76, 78, 80, 82, 84, 86, 88, 90, 92, 94],
     "course_name_map": {
         0: "秋名湖",
         2: "秋名湖",
@@ -120,45 +181,190 @@ CONFIG = {
         92: "下坡",
         94: "上坡"
     },
+    # 本地CSV中的日文方向名 -> course_direction_map 中的方向名
+    "direction_aliases": {
+        "左周り": "逆时针",
+        "左回り": "逆时针",
+        "右周り": "顺时针",
+        "右回り": "顺时针",
+        "下り": "下坡",
+        "上り": "上坡",
+        "往路": "去路",
+        "復路": "归路",
+        "順走": "顺行",
+        "逆走": "逆行"
+    },
     "rank_priority": ["LEGEND", "MASTER+", "MASTER", "PROFESSIONAL", "EXPERT", "SPECIALIST", "REGULAR"]
 }
 
+CRAWL_MODES = ("full", "early_stop", "locate")
+
+# 多人批量爬取时结果表中的玩家列
+PLAYER_COLUMN = "プレイヤー"
+# 记录中的整数车型ID（不写入CSV，名称见 記録車種）
+CAR_ID_FIELD = "車種ID"
+
+# 所有爬虫共用的车型字典
+CAR_STYLES = CarStyleRegistry(CONFIG["car_styles_path"])
+
+
+def _categorical(values: pd.Series, order) -> pd.Series:
+    """转为分类类型：类别只取实际出现的值，已知的值按 order 排在前面"""
+    present = pd.unique(values.dropna())
+    present_set = set(present)
+    known = [value for value in dict.fromkeys(order) if value in present_set]
+    known_set = set(known)
+    return values.astype(pd.CategoricalDtype(known + [value for value in present if value not in known_set]))
+
+
+def categorize_results(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    返回赛道、方向、车型、等级列转为分类类型后的成绩表
+    重复的长字符串只保存一份，按这些列分组、筛选也更快；写出CSV与绘制图片的结果不变
+    """
+    orders = {
+        "コース": CONFIG["course_name_map"].values(),
+        "ルート": CONFIG["course_direction_map"].values(),
+        "タイム評価": CONFIG["rank_priority"] + ["ROOKIE", UNKNOWN_RANK],
+        "記録車種": CAR_STYLES.names().values(),
+    }
+    return df.assign(**{
+        column: _categorical(df[column], order)
+        for column, order in orders.items()
+        if column in df.columns and not isinstance(df[column].dtype, pd.CategoricalDtype)
+    })
+
+
+def load_roster(roster_path: Optional[str] = None) -> List[str]:
+    """
+    从名单文件加载多名玩家ID（格式同 Player_ID.dat，每行一个 ID = xxx）
+    TEAM/STORE 等其他行及 # 开头的注释行会被忽略
+    """
+    roster_path = roster_path or CONFIG["roster_path"]
+    try:
+        with open(roster_path, "r", encoding="utf-8") as f:
+            lines = f.readlines()
+    except FileNotFoundError:
+        raise Exception(f"❌ 未找到名单文件：{roster_path}")
+
+    usernames = []
+    for line in lines:
+        line = line.strip()
+        if line.startswith("#") or "=" not in line:
+            continue
+        key, value = line.split("=", 1)
+        if key.strip() == "ID" and value.strip():
+            usernames.append(value.strip())
+    if not usernames:
+        raise Exception(f"❌ 名单文件中未找到任何 ID 行：{roster_path}")
+    print(f"✅ 从名单文件加载{len(usernames)}名玩家")
+    return list(dict.fromkeys(usernames))
+
+
+def load_season() -> int:
+    """从配置文件加载赛季"""
+    default_season = CONFIG["season"]
+    
+    try:
+        with open(CONFIG["player_id_path"], "r", encoding="utf-8") as f:
+            lines = f.readlines()
+            
+        for line in lines:
+            line = line.strip()
+            if line.startswith("SEASON = "):
+                try:
+                    season = int(line.split("=")[1].strip())
+                    print(f"✅ 加载赛季配置：第 {season} 赛季")
+                    return season
+                except:
+                    pass
+        
+        print(f"⚠️ 配置文件中未找到赛季设置，使用默认值：第 {default_season} 赛季")
+        return default_season
+        
+    except Exception as e:
+        print(f"⚠️ 读取配置文件失败，使用默认赛季：第 {default_season} 赛季")
+        return default_season
+
+
 class ArcadeZoneCrawler:
-    def __init__(self):
+    def __init__(self, max_workers: Optional[int] = None, per_host_limit: Optional[int] = None,
+                 mode: Optional[str] = None, target_usernames: Optional[Iterable[str]] = None,
+                 cache=None, season: Optional[int] = None, snapshot=None):
         self.headers = CONFIG["headers"].copy()
         self.api_url = CONFIG["api_url"]
         self.base_web_url = CONFIG["base_web_url"]
-        # 从配置文件加载赛季
-        self.season = self._load_season()
-        self.target_username = self._load_target_username()
+        # 并发请求数上限，None时使用配置默认值
+        self.max_workers = max(1, max_workers or CONFIG["max_workers"])
+        self.per_host_limit = per_host_limit or CONFIG["per_host_limit"]
+        self.mode = mode or CONFIG["crawl_mode"]
+        if self.mode not in CRAWL_MODES:
+            raise ValueError(f"未知爬取模式：{self.mode}，可选：{', '.join(CRAWL_MODES)}")
+        # 快照需要每条赛道的全部页（snapshot.SnapshotWriter，解析每页时写入）
+        self.snapshot = snapshot
+        if snapshot is not None and self.mode != "full":
+            print(f"⚠️ 保存排行榜快照需要爬取全部页，忽略 {self.mode} 模式")
+            self.mode = "full"
+        self.course_timings = {}
+        # 最终失败的请求，运行结束时汇总报告，避免静默产出不完整的表格
+        self.skipped_requests = []
+        self._skipped_lock = threading.Lock()
+        # 所有请求共用的限流器：令牌桶 + AIMD 自适应并发
+        rate_config = CONFIG["rate_limit"]
+        self.limiter = RateLimiter(
+            rate=rate_config["rate"],
+            burst=rate_config["burst"],
+            max_concurrency=self.max_workers,
+            target_latency=rate_config["target_latency"],
+            backoff_base=rate_config["backoff_base"],
+            backoff_cap=rate_config["backoff_cap"]
+        )
+        # 未指定赛季时从配置文件加载
+        self.season = season if season is not None else load_season()
+        # 多名目标玩家共用同一次翻页，未指定时从配置文件读取单个ID
+        if target_usernames:
+            self.target_usernames = list(dict.fromkeys(target_usernames))
+            print(f"✅ 目标玩家共{len(self.target_usernames)}人：{', '.join(self.target_usernames)}")
+        else:
+            self.target_usernames = [self._load_target_username()]
+        self.target_username = self.target_usernames[0]
+        self._target_set = set(self.target_usernames)
         self.standard_times = self._load_standard_times()
-        self.session = requests.Session()
-        self._get_csrf_token()
+        self.rank_index = RankIndex(self.standard_times, CONFIG["rank_priority"])
+        self.transport = self._create_transport()
+        # cache 为 None 时按配置创建，传入 False 则禁用缓存
+        self.cache = self._create_cache() if cache is None else (cache or None)
+        # CSRF Token 在第一次真正联网时再获取，缓存全部命中时不产生任何网络请求
+        self._csrf_lock = threading.Lock()
+        self._csrf_ready = False
+        if self.cache and self.cache.offline:
+            print("📦 离线模式：仅使用本地缓存")
 
-    def _load_season(self) -> int:
-        """从配置文件加载赛季"""
-        default_season = CONFIG["season"]
-        
-        try:
-            with open(CONFIG["player_id_path"], "r", encoding="utf-8") as f:
-                lines = f.readlines()
-                
-            for line in lines:
-                line = line.strip()
-                if line.startswith("SEASON = "):
-                    try:
-                        season = int(line.split("=")[1].strip())
-                        print(f"✅ 加载赛季配置：第 {season} 赛季")
-                        return season
-                    except:
-                        pass
-            
-            print(f"⚠️ 配置文件中未找到赛季设置，使用默认值：第 {default_season} 赛季")
-            return default_season
-            
-        except Exception as e:
-            print(f"⚠️ 读取配置文件失败，使用默认赛季：第 {default_season} 赛季")
-            return default_season
+    def _create_cache(self) -> Optional[ResponseCache]:
+        cache_config = CONFIG["cache"]
+        if not cache_config["enabled"]:
+            return None
+        return ResponseCache(
+            cache_config["path"],
+            ttl=cache_config["ttl"],
+            max_bytes=cache_config["max_bytes"],
+            offline=cache_config["offline"],
+            stale_while_offline=cache_config["stale_while_offline"]
+        )
+
+    def _create_transport(self) -> Transport:
+        """创建传输层，连接池大小与并发数一致，避免多线程时连接被丢弃"""
+        transport_config = CONFIG["transport"]
+        return create_transport(
+            transport_config["kind"],
+            pool_size=self.max_workers,
+            http2=transport_config["http2"],
+            keepalive_expiry=transport_config["keepalive_expiry"]
+        )
+
+    def close(self):
+        self.transport.close()
+        CAR_STYLES.save()
 
     def _load_target_username(self) -> str:
         """从配置文件加载目标用户名"""
@@ -196,19 +402,18 @@ class ArcadeZoneCrawler:
         except Exception as e:
             raise Exception(f"❌ 读取等级标准库失败：{str(e)}")
 
+    def _ensure_csrf_token(self):
+        """首次联网前获取CSRF Token（多线程下只获取一次）"""
+        with self._csrf_lock:
+            if not self._csrf_ready:
+                self._get_csrf_token()
+                self._csrf_ready = True
+
     def _get_csrf_token(self):
-        """获取CSRF Token"""
+        """获取CSRF Token（流式读取网页头部，读到 meta 标签即停止）"""
         try:
-            response = self.session.get(
-                self.base_web_url,
-                headers=self.headers,
-                timeout=CONFIG["timeout"]
-            )
-            response.raise_for_status()
-            soup = BeautifulSoup(response.text, "html.parser")
-            csrf_meta = soup.find("meta", attrs={"name": "csrf-token"})
-            if csrf_meta:
-                csrf_token = csrf_meta.get("content")
+            csrf_token = self.transport.fetch_csrf_token(self.base_web_url, self.headers, CONFIG["timeout"])
+            if csrf_token:
                 self.headers["X-CSRF-TOKEN"] = csrf_token
                 print(f"✅ 成功获取CSRF Token：{csrf_token[:10]}...")
             else:
@@ -216,69 +421,153 @@ class ArcadeZoneCrawler:
         except Exception as e:
             raise Exception(f"❌ 获取CSRF Token失败：{str(e)}")
 
-    def _str_time_to_ms(self, time_str: str) -> int:
-        try:
-            if ":" in time_str and "." in time_str:
-                minute, rest = time_str.split(":")
-                second, ms = rest.split(".")
-                return int(minute)*60000 + int(second)*1000 + int(ms)
-            elif "'" in time_str and "\"" in time_str:
-                minute, rest = time_str.split("'")
-                second, ms = rest.split("\"")
-                return int(minute)*60000 + int(second)*1000 + int(ms)
-            else:
-                return 99999999  # 异常格式返回极大值
-        except:
-            return 99999999
+    def _refresh_csrf_token(self, stale_token: Optional[str]):
+        """Token 失效（419/403）时重新获取；多个线程同时发现失效时只刷新一次"""
+        with self._csrf_lock:
+            if self.headers.get("X-CSRF-TOKEN") == stale_token:
+                print("🔄 CSRF Token 已失效，重新获取")
+                self._get_csrf_token()
 
     def _judge_rank(self, course: str, direction: str, score_ms: int) -> str:
-        mask = (self.standard_times["Course"] == course) & (self.standard_times["Direction"] == direction)
-        if not mask.any():
+        if not self.rank_index.has_course(course, direction):
             print(f"⚠️  未找到{course}-{direction}的等级标准，默认未知评价")
             return "未知评价"
-        
-        # 获取标准行数据
-        standard_row = self.standard_times[mask].iloc[0]
-        for rank in CONFIG["rank_priority"]:
-            standard_ms = self._str_time_to_ms(str(standard_row[rank]))
-            if score_ms <= standard_ms:
-                return rank
-        
-        # 所有高级标准都不满足，判定为ROOKIE
-        return "ROOKIE"
+        # 阈值已在加载时解析为有序毫秒数组，直接二分查找
+        return self.rank_index.judge(course, direction, score_ms)
+
+    def judge_ranks(self, df: pd.DataFrame) -> pd.Series:
+        """为整张成绩表批量判定等级（按 コース、ルート、タイム 列）"""
+        return judge_ranks(df, self.rank_index)
 
-    def _request_api(self, page: int, course_id: int) -> Optional[Dict]:
+    def _request_api(self, page: int, course_id: int, name: Optional[str] = None) -> Optional[Dict]:
         payload = {
             "page": page,
             "season": self.season,
             "course": course_id
         }
-        for retry in range(CONFIG["max_retry"]):
-            try:
-                response = self.session.post(
-                    url=self.api_url,
-                    headers=self.headers,
-                    data=json.dumps(payload, ensure_ascii=False),
-                    timeout=CONFIG["timeout"]
-                )
-                response.raise_for_status()
-                return response.json()
-            except requests.exceptions.RequestException as e:
-                print(f"⚠️  第{retry+1}次请求失败，赛道{course_id}第{page}页：{str(e)}")
-                if retry == CONFIG["max_retry"] - 1:
-                    print(f"❌ 赛道{course_id}第{page}页请求最终失败，跳过该页")
+        if name is not None:
+            payload["name"] = name
+        return self._cached_request(payload, self._send_api)
+
+    def _cached_request(self, payload: Dict, send) -> Optional[Dict]:
+        """先查缓存，未命中再请求；请求最终失败时按配置退回过期缓存"""
+        if self.cache:
+            cached = self.cache.get(payload)
+            METRICS.count("crawl_cache_lookups_total", result="miss" if cached is None else "hit")
+            if cached is not None:
+                return cached
+            if self.cache.offline:
+                print(f"⚠️  离线模式下缓存未命中：{payload}")
+                self._record_skipped(payload)
+                return None
+
+        self._ensure_csrf_token()
+        data = send(payload)
+        if self.cache:
+            if data is not None:
+                self.cache.put(payload, data)
+            elif self.cache.stale_while_offline:
+                data = self.cache.get(payload, allow_stale=True)
+                if data is not None:
+                    print(f"♻️  请求失败，使用过期缓存：{payload}")
+        if data is None:
+            self._record_skipped(payload)
+        return data
+
+    def _send_api(self, payload: Dict) -> Optional[Dict]:
+        return self._post_json(payload, f"赛道{payload['course']}第{payload['page']}页")
+
+    def _post_json(self, payload: Dict, label: str, kind: str = "api") -> Optional[Dict]:
+        """
+        经限流器发送API请求
+        429/5xx/网络错误按带抖动的指数退避重试（遵循 Retry-After），
+        419/403 视为CSRF Token失效，每次失效都刷新后重试：前 max_retry 次刷新不消耗重试次数，
+        之后的刷新与其他错误一样计入重试次数（Token 有效期很短、多线程轮番失效时也能取回），其余4xx不重试
+        kind 为指标中的请求类型（api：排行榜翻页，search：搜索）
+        """
+        body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+        retry = csrf_refreshes = 0
+        while retry < CONFIG["max_retry"]:
+            retry_after = None
+            csrf_expired = False
+            headers = dict(self.headers)
+            if retry or csrf_refreshes:
+                METRICS.count("crawl_retries_total", kind=kind)
+            wait_start = time.perf_counter()
+            with self.limiter.slot():
+                start = time.perf_counter()
+                METRICS.observe("crawl_limiter_wait_seconds", start - wait_start, kind=kind)
+                try:
+                    response = self.transport.post(self.api_url, headers, body, CONFIG["timeout"])
+                    status = response.status_code
+                    METRICS.observe("crawl_request_seconds", time.perf_counter() - start, detail=payload,
+                                    kind=kind, status=status)
+                    METRICS.count("crawl_response_bytes_total", len(response.content), kind=kind)
+                    if status in (403, 419):
+                        csrf_expired = True
+                        error = f"HTTP {status}（CSRF Token 失效）"
+                    elif status == 429 or status >= 500:
+                        retry_after = parse_retry_after(response.header("Retry-After"))
+                        self.limiter.on_throttle(retry_after)
+                        error = f"HTTP {status}"
+                    elif status >= 400:
+                        print(f"❌ {label}请求被拒绝，不再重试：HTTP {status}")
+                        METRICS.count("crawl_requests_total", kind=kind, result="rejected")
+                        return None
+                    else:
+                        data = response.json()
+                        self.limiter.on_success(time.perf_counter() - start)
+                        METRICS.count("crawl_requests_total", kind=kind, result="ok")
+                        return data
+                except (TransportError, ValueError) as e:
+                    METRICS.observe("crawl_request_seconds", time.perf_counter() - start, detail=payload,
+                                    kind=kind, status="error")
+                    self.limiter.on_throttle()
+                    error = str(e)
+
+            print(f"⚠️  第{retry + csrf_refreshes + 1}次请求失败，{label}：{error}")
+            if csrf_expired:
+                try:
+                    self._refresh_csrf_token(headers.get("X-CSRF-TOKEN"))
+                except Exception as e:
+                    print(str(e))
                     return None
+                # 免费的刷新次数用完后，之后的刷新计入重试次数
+                if csrf_refreshes < CONFIG["max_retry"]:
+                    csrf_refreshes += 1
+                    continue
+            retry += 1
+            if retry < CONFIG["max_retry"]:
+                delay = self.limiter.backoff(retry - 1, retry_after)
+                METRICS.observe("crawl_backoff_seconds", delay, kind=kind)
+                time.sleep(delay)
+        print(f"❌ {label}请求最终失败")
+        METRICS.count("crawl_requests_total", kind=kind, result="failed")
+        return None
+
+    def _record_skipped(self, payload: Dict):
+        with self._skipped_lock:
+            self.skipped_requests.append(dict(payload))
+
+    def _course_skipped(self, course_id: int) -> bool:
+        with self._skipped_lock:
+            return any(payload.get("course") == course_id for payload in self.skipped_requests)
 
-    def _parse_time(self, ms: int) -> str:
-        minutes = ms // 60000
-        seconds = (ms % 60000) // 1000
-        millis = ms % 1000
-        return f"{minutes}:{seconds:02d}.{millis:03d}"
+    def report_skipped(self):
+        """输出最终失败、未能获取的页，结果表因此不完整"""
+        if not self.skipped_requests:
+            return
+        print(f"\n❗ 以下{len(self.skipped_requests)}个请求最终失败，结果可能不完整：")
+        for payload in sorted(self.skipped_requests, key=lambda p: (p.get("course", -1), p.get("page", 0))):
+            name = f" 用户{payload['name']}" if payload.get("name") else ""
+            print(f"   赛道{payload.get('course', '全部')} 第{payload.get('page')}页{name}")
 
     def _parse_rank_data(self, data: Dict, course_id: int, current_page: int) -> List[Dict]:
+        if self.snapshot is not None:
+            self.snapshot.add_page(course_id, current_page, data)
         result = []
         rank_list = data.get("list", [])
-        car_styles_map = data.get("carStyles", {})
+        CAR_STYLES.merge(data.get("carStyles"))
         course_name = CONFIG["course_name_map"].get(course_id, "未知赛道")
         direction = CONFIG["course_direction_map"].get(course_id, "未知方向")
 
@@ -287,76 +576,335 @@ class ArcadeZoneCrawler:
         for idx, item in enumerate(rank_list):
             user_info = item.get("userinfo", {})
             username = user_info.get("username", "")
-            if username != self.target_username:
+            if username not in self._target_set:
                 continue
 
             national_rank = (current_page - 1) * per_page + idx + 1
-            car_id = str(item.get("style_car_id", ""))
-            car_name = car_styles_map.get(car_id, "未知车型")
+            car_id = parse_car_id(item.get("style_car_id"))
             goal_time_ms = item.get("goal_time", 0)
-            time_str = self._parse_time(goal_time_ms)
+            time_str = ms_to_time(goal_time_ms)
             play_time = item.get("play_dt", "").split(" ")[0]
 
             time_eval = self._judge_rank(course_name, direction, goal_time_ms)
             print(f"[判断] {course_name}({direction}) | 成绩：{time_str} → 等级：{time_eval}")
 
             rank_info = {
+                "プレイヤー": username,
                 "コース": course_name,
                 "ルート": direction,
                 "タイム": time_str,
                 "タイム評価": time_eval,
-                "記録車種": car_name,
+                "記録車種": CAR_STYLES.name(car_id),
                 "全国順位": str(national_rank),
-                "記録日": play_time
+                "記録日": play_time,
+                CAR_ID_FIELD: car_id,
             }
             result.append(rank_info)
         return result
 
+    def _targets_found(self, found_usernames: Set[str]) -> bool:
+        """同一赛道排行榜中每位玩家最多出现一次，所有目标都匹配到后即可结束该赛道"""
+        return self._target_set <= found_usernames
+
+    def _lookup_goal_times(self, course_id: int, username: str) -> Optional[List[int]]:
+        """通过用户名搜索目标在该赛道的成绩（毫秒），请求失败返回None"""
+        data = self._request_api(page=1, course_id=course_id, name=username)
+        if data is None:
+            return None
+        return [
+            item.get("goal_time", 0)
+            for item in data.get("list", [])
+            if item.get("userinfo", {}).get("username", username) == username
+        ]
+
+    def locate_course(self, course_id: int, fetch) -> Dict[int, List[Dict]]:
+        """
+        按成绩定位各目标所在页，返回 {页码: 匹配记录}
+        排行榜按 goal_time 升序排列：先用搜索得到目标成绩，再倍增探测+二分查找
+        第一个末尾成绩不小于目标成绩的页，每位目标只需 O(log 页数) 次请求；
+        同成绩跨页时向后顺延，定位失败时退回逐页扫描，全国排名仍按页码和页内序号计算
+        """
+        pages = {}
+
+        def probe(page: int) -> Optional[Dict]:
+            if page not in pages:
+                pages[page] = fetch(course_id, page)
+            return pages[page]
+
+        def last_time(page: int) -> Optional[int]:
+            data = probe(page)
+            rank_list = data.get("list", []) if data else []
+            return rank_list[-1].get("goal_time", 0) if rank_list else None
+
+        def page_usernames(page: int) -> Set[str]:
+            data = probe(page)
+            if not data:
+                return set()
+            return {item.get("userinfo", {}).get("username", "") for item in data.get("list", [])}
+
+        def scan(from_page: int, remaining: Set[str]) -> Set[int]:
+            found_pages = set()
+            for page in range(from_page, total_pages + 1):
+                found = page_usernames(page) & remaining
+                if found:
+                    found_pages.add(page)
+                    remaining = remaining - found
+                if not remaining:
+                    break
+            return found_pages
+
+        def locate(username: str) -> Optional[int]:
+            """返回目标所在页码，无记录返回0，定位失败返回None"""
+            goal_times = self._lookup_goal_times(course_id, username)
+            if goal_times is None:
+                print(f"⚠️  赛道{course_id} {username} 成绩搜索失败")
+                return None
+            if not goal_times:
+                return 0
+            target_time = min(goal_times)
+
+            # 倍增探测：找到 lo < 目标页 <= hi 的区间（第1页末尾成绩已确认小于目标）
+            lo, hi = 1, min(2, total_pages)
+            while hi < total_pages:
+                hi_time = last_time(hi)
+                if hi_time is None or hi_time >= target_time:
+                    break
+                lo, hi = hi, min(hi * 2, total_pages)
+            # 二分查找第一个末尾成绩不小于目标成绩的页
+            while hi - lo > 1:
+                mid = (lo + hi) // 2
+                mid_time = last_time(mid)
+                if mid_time is None:
+                    return None
+                if mid_time < target_time:
+                    lo = mid
+                else:
+                    hi = mid
+
+            # 同成绩可能跨越多页，从定位页向后顺延直到同成绩区间结束
+            page = hi
+            while page <= total_pages:
+                if username in page_usernames(page):
+                    return page
+                page_last_time = last_time(page)
+                if page_last_time is None or page_last_time > target_time:
+                    break
+                page += 1
+            return None
+
+        first_page_data = probe(1)
+        if not first_page_data:
+            return {}
+        total_pages = first_page_data.get("pagination", {}).get("last_page", 1)
+
+        located_pages = {1} if page_usernames(1) & self._target_set else set()
+        unresolved = set()
+        for username in self.target_usernames:
+            if username in page_usernames(1):
+                continue
+            page = locate(username)
+            if page is None:
+                unresolved.add(username)
+            elif page:
+                located_pages.add(page)
+        if unresolved:
+            print(f"⚠️  赛道{course_id} 定位失败（排行榜可能已更新），改为逐页扫描")
+            located_pages |= scan(2, unresolved)
+        print(f"✅ 赛道{course_id} 定位完成，共请求{len(pages)}页")
+
+        # 每页只解析一次，同页的多位目标一并取出
+        return {
+            page: self._parse_rank_data(pages[page], course_id, current_page=page)
+            for page in sorted(located_pages)
+        }
+
+    def _create_scheduler(self, mode: Optional[str] = None, journal: Optional[CrawlJournal] = None) -> CrawlScheduler:
+        return CrawlScheduler(self, max_workers=self.max_workers, per_host_limit=self.per_host_limit,
+                              mode=mode, journal=journal)
+
+    def _open_journal(self) -> Optional[CrawlJournal]:
+        journal_config = CONFIG["journal"]
+        if not journal_config["enabled"]:
+            return None
+        return CrawlJournal(journal_config["path"], self.season, self.target_usernames, journal_config["max_age"])
+
     def crawl_course(self, course_id: int) -> List[Dict]:
         course_name = CONFIG["course_name_map"].get(course_id, "未知赛道")
         direction = CONFIG["course_direction_map"].get(course_id, "未知方向")
         print(f"\n========== 开始爬取 赛道ID:{course_id}（{course_name}({direction})） ==========")
-        all_matched_data = []
+        scheduler = self._create_scheduler()
+        all_matched_data = scheduler.run([course_id])[course_id]
+        self.course_timings.update(scheduler.course_timings)
+        return all_matched_data
 
-        first_page_data = self._request_api(page=1, course_id=course_id)
-        if not first_page_data:
-            return all_matched_data
+    def _crawl_courses(self, course_list: List[int], mode: Optional[str] = None,
+                       journal: Optional[CrawlJournal] = None) -> Dict[int, List[Dict]]:
+        scheduler = self._create_scheduler(mode, journal)
+        course_results = scheduler.run(course_list)
+        self.course_timings.update(scheduler.course_timings)
+        scheduler.report_timings()
+        if self.cache:
+            print(f"📦 {self.cache.summary()}")
+        return course_results
 
-        page1_data = self._parse_rank_data(first_page_data, course_id, current_page=1)
-        all_matched_data.extend(page1_data)
+    def run(self, course_list: List[int], return_df: bool = False) -> Optional[pd.DataFrame]:
+        print(f"\n========== 开始并行爬取 {len(course_list)} 条赛道（并发上限{self.max_workers}） ==========")
+        # 续爬沿用的页不会重新解析，快照会缺页，因此保存快照时不使用断点日志
+        journal = self._open_journal() if self.snapshot is None else None
+        try:
+            course_results = self._crawl_courses(course_list, journal=journal)
+        finally:
+            if journal:
+                journal.close()
 
-        total_pages = first_page_data.get("pagination", {}).get("last_page", 1)
-        print(f"✅ 赛道{course_id} 总页数：{total_pages}")
+        final_result = []
+        for course_id in course_list:
+            final_result.extend(course_results[course_id])
+        result = self._output(final_result, return_df)
+        # 有页最终失败时保留断点日志，重新运行只补爬失败的页
+        if journal and not self.skipped_requests:
+            journal.discard()
+        return result
+
+    def _probe_course(self, course_id: int, fetch, previous: Optional[Dict]) -> Dict:
+        """
+        廉价探测赛道是否有变动：只请求第1页和各目标上次所在页
+        已有记录的目标仍在原页码、原序号且成绩与日期不变，说明前方无人插入、自身也未刷新；
+        上次无记录的目标只需总条数不变即可确认仍无记录
+        """
+        first_page_data = fetch(course_id, 1)
+        if not first_page_data:
+            return {"unchanged": False, "meta": None}
+        pagination = first_page_data.get("pagination", {})
+        meta = {
+            "last_page": pagination.get("last_page", 1),
+            "total": pagination.get("total"),
+            "per_page": pagination.get("per_page", 15),
+        }
+        if previous is None:
+            return {"unchanged": False, "meta": meta}
 
-        for page in range(2, total_pages + 1):
-            print(f"正在爬取 赛道{course_id} 第{page}/{total_pages}页...",end='\r')
-            page_data = self._request_api(page=page, course_id=course_id)
-            if not page_data:
+        pages = {1: first_page_data}
+        total_unchanged = meta["total"] == previous["total"] and meta["last_page"] == previous["last_page"]
+        for username in self.target_usernames:
+            if username not in previous["players"]:
+                return {"unchanged": False, "meta": meta}
+            info = previous["players"][username]
+            if info is None:
+                if not total_unchanged:
+                    return {"unchanged": False, "meta": meta}
                 continue
-            matched_data = self._parse_rank_data(page_data, course_id, current_page=page)
-            all_matched_data.extend(matched_data)
+            if info["page"] not in pages:
+                pages[info["page"]] = fetch(course_id, info["page"])
+            page_data = pages[info["page"]]
+            rank_list = page_data.get("list", []) if page_data else []
+            if info["index"] >= len(rank_list):
+                return {"unchanged": False, "meta": meta}
+            item = rank_list[info["index"]]
+            if (item.get("userinfo", {}).get("username") != username
+                    or item.get("goal_time") != info["goal_time"]
+                    or item.get("play_dt", "").split(" ")[0] != info["play_dt"]):
+                return {"unchanged": False, "meta": meta}
+        return {"unchanged": True, "meta": meta}
 
-        print(f"========== 赛道{course_id} 爬取完成，匹配到{len(all_matched_data)}条成绩 ==========\n")
-        return all_matched_data
+    def _load_previous_rows(self, previous_csv: Optional[str]) -> Dict[tuple, Dict]:
+        """读取上次输出的CSV，按 (玩家, コース, ルート) 索引"""
+        if not previous_csv:
+            return {}
+        try:
+            previous_df = pd.read_csv(previous_csv, encoding="utf-8-sig", dtype=str)
+        except Exception as e:
+            print(f"⚠️ 读取上次CSV失败，改用增量状态中的记录：{e}")
+            return {}
+        rows = {}
+        for row in previous_df.to_dict("records"):
+            username = row.get(PLAYER_COLUMN, self.target_username)
+            rows[(username, row["コース"], row["ルート"])] = row
+        return rows
+
+    def run_incremental(self, course_list: List[int], previous_csv: Optional[str] = None,
+                        state_path: Optional[str] = None, return_df: bool = False) -> Optional[pd.DataFrame]:
+        """
+        增量爬取：先探测各赛道是否有变动，无变动的赛道直接沿用上次结果（优先取自 previous_csv），
+        有变动的赛道以 early_stop（或 locate）模式重新爬取，并更新增量状态
+        """
+        state = CrawlState(state_path or CONFIG["state_path"])
+        print(f"\n========== 开始增量爬取 {len(course_list)} 条赛道 ==========")
+        scheduler = self._create_scheduler()
+        probes = scheduler.map_courses(
+            course_list,
+            lambda course_id, fetch: self._probe_course(course_id, fetch, state.course(self.season, course_id))
+        )
+        unchanged = [course_id for course_id in course_list if probes[course_id]["unchanged"]]
+        changed = [course_id for course_id in course_list if not probes[course_id]["unchanged"]]
+        print(f"✅ 探测完成：{len(unchanged)}条赛道无变动，{len(changed)}条赛道需要重新爬取")
+
+        refetch_mode = "locate" if self.mode == "locate" else "early_stop"
+        course_results = self._crawl_courses(changed, mode=refetch_mode) if changed else {}
+        previous_rows = self._load_previous_rows(previous_csv)
 
-    def run(self, course_list: List[int], return_df: bool = False) -> Optional[pd.DataFrame]:
         final_result = []
         for course_id in course_list:
-            data = self.crawl_course(course_id)
-            final_result.extend(data)
+            course_name = CONFIG["course_name_map"].get(course_id, "未知赛道")
+            direction = CONFIG["course_direction_map"].get(course_id, "未知方向")
+            if course_id in unchanged:
+                players = state.course(self.season, course_id)["players"]
+                for username in self.target_usernames:
+                    info = players[username]
+                    if info is None:
+                        continue
+                    record = previous_rows.get((username, course_name, direction), info["record"])
+                    final_result.append(dict(record, **{PLAYER_COLUMN: username}))
+                continue
+
+            records = course_results.get(course_id, [])
+            final_result.extend(records)
+            meta = probes[course_id]["meta"]
+            if meta is None:
+                continue
+            players = {username: None for username in self.target_usernames}
+            for record in records:
+                national_rank = int(record["全国順位"]) - 1
+                players[record[PLAYER_COLUMN]] = {
+                    "page": national_rank // meta["per_page"] + 1,
+                    "index": national_rank % meta["per_page"],
+                    "goal_time": time_to_ms(record["タイム"]),
+                    "play_dt": record["記録日"],
+                    "record": {key: value for key, value in record.items() if key != PLAYER_COLUMN},
+                }
+            state.update_course(self.season, course_id, meta["last_page"], meta["total"], meta["per_page"], players)
 
+        state.save()
+        return self._output(final_result, return_df)
+
+    def _output(self, final_result: List[Dict], return_df: bool) -> Optional[pd.DataFrame]:
+        self.report_skipped()
         if not final_result:
-            print(f"❌ 未匹配到{self.target_username}的任何成绩记录")
+            print(f"❌ 未匹配到{', '.join(self.target_usernames)}的任何成绩记录")
             if return_df:
                 return pd.DataFrame()
             return None
 
-        # 保持原有输出格式
+        # 单人保持原有输出格式，多人时在首列加入玩家名，并按名单顺序分组（组内保持赛道顺序）
         csv_columns = ["コース", "ルート", "タイム", "タイム評価", "記録車種", "全国順位", "記録日"]
-        df = pd.DataFrame(final_result)[csv_columns]
+        df = pd.DataFrame(final_result)
+        if len(self.target_usernames) > 1:
+            player_order = {username: idx for idx, username in enumerate(self.target_usernames)}
+            df = df.sort_values(PLAYER_COLUMN, key=lambda col: col.map(player_order), kind="stable")
+            df = df[[PLAYER_COLUMN] + csv_columns].reset_index(drop=True)
+            matched_players = set(df[PLAYER_COLUMN])
+            missing = [username for username in self.target_usernames if username not in matched_players]
+            if missing:
+                print(f"⚠️ 以下玩家未匹配到任何成绩：{', '.join(missing)}")
+        else:
+            df = df[csv_columns]
+        df = categorize_results(df)
         
         if not return_df:
-            csv_filename = f"DAC_{self.target_username}_成绩表.csv"
+            if len(self.target_usernames) > 1:
+                csv_filename = f"DAC_{len(self.target_usernames)}人_成绩表.csv"
+            else:
+                csv_filename = f"DAC_{self.target_username}_成绩表.csv"
             df.to_csv(csv_filename, index=False, encoding="utf-8-sig")
 
             # 控制台输出结果
@@ -367,24 +915,51 @@ class ArcadeZoneCrawler:
             print("\n【成绩预览】")
             print(df.to_string(index=False))
         
+        # 失败的请求随结果一起返回，调用方据此判断表格是否完整
+        df.attrs["skipped_requests"] = list(self.skipped_requests)
+        df.attrs["season"] = self.season
+        if len(self.target_usernames) == 1:
+            df.attrs["player"] = self.target_username
         return df if return_df else None
 
 # 对外暴露的爬取函数（供core调用）
-def crawl_data() -> pd.DataFrame:
+def crawl_data(usernames: Optional[Iterable[str]] = None, incremental: bool = False,
+               previous_csv: Optional[str] = None, season: Optional[int] = None,
+               snapshot: bool = False) -> pd.DataFrame:
+    """
+    爬取成绩（含全国排名）
+    usernames 为 None 时从 Player_ID.dat 读取单个ID；传入多名玩家时每条赛道只翻页一次，
+    结果首列为玩家名；incremental 为真时只重新爬取有变动的赛道，其余沿用 previous_csv / 增量状态；
+    snapshot 为真时同时保存所有赛道的完整排行榜快照（路径记在结果的 attrs["snapshot"]）
+    """
     # 配置需要爬取的赛道ID列表
-    TARGET_COURSES = [0, 2, 4, 6, 8, 10, 12, 14, 16, 18, 20, 22, 24, 26, 28, 30, 32, 34, 36, 38, 40, 42, 44, 46, 48, 50, 52, 54, 56, 58, 60, 62, 64, 66, 68, 70, 72, 74, 76, 78, 80, 82, 84, 86, 88, 90, 92, 94]
+    TARGET_COURSES = CONFIG["target_courses"]
 
+    crawler = None
     try:
-        crawler = ArcadeZoneCrawler()
+        writer = None
+        if snapshot:
+            from snapshot import SnapshotWriter
+            writer = SnapshotWriter()
+        crawler = ArcadeZoneCrawler(target_usernames=usernames, season=season, snapshot=writer)
+        if incremental and writer is None:
+            return crawler.run_incremental(TARGET_COURSES, previous_csv=previous_csv, return_df=True)
         df = crawler.run(TARGET_COURSES, return_df=True)
+        if writer is not None and len(writer):
+            snapshot_path = writer.save(CONFIG["snapshot"]["path"], crawler.season, crawler.skipped_requests)
+            print(f"📦 排行榜快照已保存：{snapshot_path}（{len(writer)}条成绩）")
+            df.attrs["snapshot"] = snapshot_path
         return df
     except Exception as e:
         print(f"❌ 爬虫执行失败：{str(e)}")
         return pd.DataFrame()
+    finally:
+        if crawler is not None:
+            crawler.close()
 
 if __name__ == "__main__":
     # 独立运行爬虫的逻辑
-    TARGET_COURSES = [0, 2, 4, 6, 8, 10, 12, 14, 16, 18, 20, 22, 24, 26, 28, 30, 32, 34, 36, 38, 40, 42, 44, 46, 48, 50, 52, 54, 56, 58, 60, 62, 64, 66, 68, 70, 72, 74, 76, 78, 80, 82, 84, 86, 88, 90, 92, 94]
+    TARGET_COURSES = CONFIG["target_courses"]
 
     try:
         crawler = ArcadeZoneCrawler()
@@ -1,9 +1,15 @@
-import json
+import time
+
 import pandas as pd
+from concurrent.futures import wait, FIRST_COMPLETED
 from typing import List, Dict, Optional
 
+from car_styles import parse_car_id
+from instrumentation import METRICS
+from scheduler import worker_pool
 # 复用原 spider 的配置和基础类
-from spider import CONFIG, ArcadeZoneCrawler
+from spider import CAR_ID_FIELD, CAR_STYLES, CONFIG, ArcadeZoneCrawler, categorize_results
+from timefmt import ms_to_time
 
 class ArcadeZoneSearchCrawler(ArcadeZoneCrawler):
     """
@@ -11,24 +17,79 @@ class ArcadeZoneSearchCrawler(ArcadeZoneCrawler):
     继承原爬虫的基础方法（等级判断、时间格式化、CSRF获取等）
     """
 
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # 接口是否支持不限赛道搜索，首次搜索时探测
+        self._all_course_search = None
+        # 探测时取得的不限赛道搜索第1页 {用户名: 响应}，正式搜索时直接复用，不再重复请求
+        self._probe_pages = {}
+
     def _search_request(self, payload: dict) -> Optional[dict]:
-        """带重试的搜索请求 - 修复编码问题"""
-        for retry in range(CONFIG["max_retry"]):
-            try:
-                # 关键修复：将数据编码为UTF-8
-                response = self.session.post(
-                    url=self.api_url,
-                    headers=self.headers,
-                    data=json.dumps(payload, ensure_ascii=False).encode('utf-8'),
-                    timeout=CONFIG["timeout"]
-                )
-                response.raise_for_status()
-                return response.json()
-            except Exception as e:
-                print(f"⚠️ 搜索请求失败（第{retry+1}次）：{e}")
-                if retry == CONFIG["max_retry"] - 1:
-                    print("❌ 搜索请求最终失败")
-                    return None
+        """搜索请求，优先读取本地缓存"""
+        return self._cached_request(payload, self._send_search)
+
+    def _send_search(self, payload: dict) -> Optional[dict]:
+        """带限流与退避重试的搜索请求"""
+        course = payload.get("course", "全部")
+        return self._post_json(payload, f"搜索{payload.get('name')} 赛道{course}第{payload.get('page')}页", kind="search")
+
+    def _search_many(self, payloads: Dict[object, dict],
+                     first_pages: Optional[Dict[object, dict]] = None) -> Dict[object, List[dict]]:
+        """
+        并行执行多组搜索，返回 {键: 按页码排序的响应列表}
+        所有搜索的第1页先入队，得知总页数后剩余页加入同一个有界线程池；
+        first_pages 中已有第1页响应的搜索直接从第2页开始
+        """
+        first_pages = first_pages or {}
+        pages = {key: {} for key in payloads}
+        pending = {}
+        outstanding = {key: 0 for key in payloads}
+        started = time.perf_counter()
+        with worker_pool(self.max_workers) as pool:
+            def submit(key, page: int):
+                payload = dict(payloads[key], page=page)
+                pending[pool.submit(self._search_request, payload)] = (key, page)
+                outstanding[key] += 1
+
+            def receive(key, page: int, data: Optional[dict]):
+                if data:
+                    pages[key][page] = data
+                    if page == 1:
+                        last_page = data.get("pagination", {}).get("last_page", 1)
+                        for next_page in range(2, last_page + 1):
+                            submit(key, next_page)
+                if not outstanding[key]:
+                    self._finish_search(key, payloads[key], len(pages[key]), time.perf_counter() - started)
+
+            for key in payloads:
+                if first_pages.get(key):
+                    receive(key, 1, first_pages[key])
+                else:
+                    submit(key, 1)
+
+            while pending:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    key, page = pending.pop(future)
+                    outstanding[key] -= 1
+                    receive(key, page, future.result())
+
+        return {key: [pages[key][page] for page in sorted(pages[key])] for key in payloads}
+
+    def _finish_search(self, key, payload: dict, page_count: int, seconds: float):
+        detail = {"name": payload.get("name"), "course": key, "pages": page_count}
+        METRICS.observe("crawl_search_seconds", seconds, detail=detail)
+        METRICS.count("crawl_pages_total", page_count, detail=detail, kind="search")
+
+    def _base_payload(self, name: str, course_id: Optional[int] = None) -> dict:
+        payload = {
+            "page": 1,
+            "name": name,
+            "season": self.season
+        }
+        if course_id is not None:
+            payload["course"] = course_id
+        return payload
 
     def search_by_name(self, name: str, course_id: Optional[int] = None) -> List[Dict]:
         """
@@ -36,47 +97,38 @@ class ArcadeZoneSearchCrawler(ArcadeZoneCrawler):
         返回记录列表，每条记录包含：赛道、路线、时间、等级、车型、日期
         """
         all_records = []
-        page = 1
-
-        while True:
-            payload = {
-                "page": page,
-                "name": name,
-                "season": self.season
-            }
-            if course_id is not None:
-                payload["course"] = course_id
-
-            data = self._search_request(payload)
-            if not data:
-                break
-
-            page_records = self._parse_search_result(data)
-            all_records.extend(page_records)
-
-            pagination = data.get("pagination", {})
-            if page >= pagination.get("last_page", 1):
-                break
-            page += 1
-
+        for data in self._search_many({course_id: self._base_payload(name, course_id)})[course_id]:
+            all_records.extend(self._parse_search_result(data))
         return all_records
 
+    def supports_all_course_search(self, name: str) -> bool:
+        """
+        探测接口是否接受不带 course 的搜索并一次返回所有赛道的成绩
+        第1页出现多个不同赛道即视为支持；结果只有单一赛道时无法区分，保守地按不支持处理
+        """
+        if self._all_course_search is None:
+            data = self._search_request(self._base_payload(name))
+            course_ids = {item.get("course_id") for item in data.get("list", [])} if data else set()
+            self._all_course_search = None not in course_ids and len(course_ids) > 1
+            if self._all_course_search:
+                self._probe_pages[name] = data
+        return self._all_course_search
+
     def _parse_search_result(self, data: dict) -> List[dict]:
         """解析搜索结果，不包含排名信息"""
         result = []
         rank_list = data.get("list", [])
-        car_styles_map = data.get("carStyles", {})
+        CAR_STYLES.merge(data.get("carStyles"))
 
         for item in rank_list:
             course_id = item.get("course_id")
             course_name = CONFIG["course_name_map"].get(course_id, "未知赛道")
             direction = CONFIG["course_direction_map"].get(course_id, "未知方向")
 
-            car_id = str(item.get("style_car_id", ""))
-            car_name = car_styles_map.get(car_id, "未知车型")
+            car_id = parse_car_id(item.get("style_car_id"))
 
             goal_time_ms = item.get("goal_time", 0)
-            time_str = self._parse_time(goal_time_ms)
+            time_str = ms_to_time(goal_time_ms)
             play_time = item.get("play_dt", "").split(" ")[0]
 
             # 复用等级判断
@@ -87,36 +139,52 @@ class ArcadeZoneSearchCrawler(ArcadeZoneCrawler):
                 "ルート": direction,
                 "タイム": time_str,
                 "タイム評価": time_eval,
-                "記録車種": car_name,
-                "記録日": play_time
+                "記録車種": CAR_STYLES.name(car_id),
+                "記録日": play_time,
                 # 没有“全国順位”
+                CAR_ID_FIELD: car_id,
             }
             result.append(record)
 
         return result
 
     def crawl_all_courses_by_search(self, name: str) -> List[Dict]:
-        """遍历所有赛道，用搜索方式获取用户在每个赛道的成绩"""
+        """获取用户在所有赛道的成绩：接口支持时用单一分页流，否则按赛道并行搜索"""
         # 复用原爬虫中的赛道列表
-        target_courses = [
-            0, 2, 4, 6, 8, 10, 12, 14, 16, 18, 20, 22, 24, 26, 28, 30,
-            32, 34, 36, 38, 40, 42, 44, 46, 48, 50, 52, 54, 56, 58, 60,
-            62, 64, 66, 68, 70, 72, 74, 76, 78, 80, 82, 84, 86, 88, 90, 92, 94
-        ]
+        target_courses = CONFIG["target_courses"]
+        course_order = {cid: idx for idx, cid in enumerate(target_courses)}
+
+        if self.supports_all_course_search(name):
+            print("⚡ 接口支持不限赛道搜索，使用单一分页流获取全部成绩")
+            probe = self._probe_pages.pop(name, None)
+            responses = self._search_many({None: self._base_payload(name)}, first_pages={None: probe})[None]
+            # 合并所有页后按赛道列表顺序稳定排序，与逐赛道搜索的输出顺序一致
+            items = []
+            for data in responses:
+                items.extend(item for item in data.get("list", []) if item.get("course_id") in course_order)
+                CAR_STYLES.merge(data.get("carStyles"))
+            items.sort(key=lambda item: course_order[item.get("course_id")])
+            all_records = self._parse_search_result({"list": items})
+            print(f"   ✅ 共找到 {len(all_records)} 条记录")
+            return all_records
+
+        print(f"🔍 并行搜索 {len(target_courses)} 条赛道（并发上限{self.max_workers}）...")
+        responses = self._search_many({cid: self._base_payload(name, cid) for cid in target_courses})
         all_records = []
         for cid in target_courses:
-            print(f"🔍 正在搜索赛道 {cid} ...")
-            records = self.search_by_name(name, course_id=cid)
+            records = []
+            for data in responses[cid]:
+                records.extend(self._parse_search_result(data))
             if records:
-                print(f"   ✅ 找到 {len(records)} 条记录")
+                print(f"   ✅ 赛道 {cid}：找到 {len(records)} 条记录")
                 all_records.extend(records)
             else:
-                print(f"   ⏺️ 无记录")
+                print(f"   ⏺️ 赛道 {cid}：无记录")
         return all_records
 
 
 # 对外暴露的爬取函数（供core调用）
-def crawl_data_by_search(username: str = None) -> pd.DataFrame:
+def crawl_data_by_search(username: str = None, season: Optional[int] = None) -> pd.DataFrame:
     """
     通过用户名搜索爬取成绩（无排名）
     若 username 为 None，则从 Player_ID.dat 读取
@@ -137,16 +205,21 @@ def crawl_data_by_search(username: str = None) -> pd.DataFrame:
             print(f"❌ 读取配置文件失败：{e}")
             return pd.DataFrame()
 
+    crawler = None
     try:
-        crawler = ArcadeZoneSearchCrawler()
+        crawler = ArcadeZoneSearchCrawler(target_usernames=[username], season=season)
         print(f"🔍 开始搜索用户 {username} 在所有赛道的成绩...")
         records = crawler.crawl_all_courses_by_search(username)
+        crawler.report_skipped()
 
         if not records:
             print("❌ 未找到任何成绩记录")
             return pd.DataFrame()
 
-        df = pd.DataFrame(records)
+        df = categorize_results(pd.DataFrame(records).drop(columns=[CAR_ID_FIELD]))
+        df.attrs["skipped_requests"] = list(crawler.skipped_requests)
+        df.attrs["season"] = crawler.season
+        df.attrs["player"] = username
         print(f"✅ 搜索完成，共找到 {len(df)} 条成绩记录")
         return df
 
@@ -155,6 +228,9 @@ def crawl_data_by_search(username: str = None) -> pd.DataFrame:
         import traceback
         traceback.print_exc()
         return pd.DataFrame()
+    finally:
+        if crawler is not None:
+            crawler.close()
 
 
 if __name__ == "__main__":
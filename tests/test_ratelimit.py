@@ -0,0 +1,156 @@
+"""
+限流、退避重试与失败页记录的测试（使用 benchmarks/mock_server.py 的本地模拟服务）
+
+    python -m pytest tests
+"""
+import contextlib
+import io
+import os
+import sys
+import threading
+import time
+from email.utils import formatdate
+
+import pytest
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+sys.path.insert(0, os.path.join(REPO_ROOT, "benchmarks"))
+
+import spider  # noqa: E402
+from mock_server import MockArcadeZone  # noqa: E402
+from ratelimit import AdaptiveConcurrency, TokenBucket, backoff_delay, parse_retry_after  # noqa: E402
+
+COURSES = [0, 2, 4, 6]
+ROWS = 60  # 每条赛道4页
+PLAYERS = ["benchmark", "rival"]
+
+
+# ---------- 限流组件 ----------
+
+def test_token_bucket_limits_rate_after_burst():
+    bucket = TokenBucket(rate=50, burst=5)
+    start = time.monotonic()
+    for _ in range(15):
+        bucket.acquire()
+    # 突发的5个立即发放，其余10个按每秒50个发放
+    assert time.monotonic() - start >= 10 / 50 * 0.9
+
+
+def test_token_bucket_pause_blocks_until_retry_after():
+    bucket = TokenBucket(rate=1000, burst=10)
+    bucket.pause(0.1)
+    start = time.monotonic()
+    bucket.acquire()
+    assert time.monotonic() - start >= 0.09
+
+
+def test_adaptive_concurrency_aimd():
+    limiter = AdaptiveConcurrency(4, minimum=1, maximum=8, target_latency=1.0)
+    limiter.on_throttle()
+    assert limiter.limit == 2
+    for _ in range(10):
+        limiter.on_success(0.1)
+    assert 2 < limiter.limit <= 8
+    before = limiter.limit
+    limiter.on_success(5.0)  # 延迟超过目标同样减半
+    assert limiter.limit == max(1, before / 2)
+    for _ in range(10):
+        limiter.on_throttle()
+    assert limiter.limit == 1
+
+
+def test_adaptive_concurrency_blocks_at_limit():
+    limiter = AdaptiveConcurrency(1)
+    limiter.acquire()
+    acquired = threading.Event()
+    thread = threading.Thread(target=lambda: (limiter.acquire(), acquired.set()))
+    thread.start()
+    assert not acquired.wait(0.05)
+    limiter.release()
+    assert acquired.wait(1)
+    thread.join()
+
+
+def test_backoff_delay_bounds():
+    for attempt in range(6):
+        for _ in range(50):
+            assert 0 <= backoff_delay(attempt, base=0.5, cap=4) <= min(4, 0.5 * 2 ** attempt)
+    # Retry-After 给出下限，但不超过上限
+    assert backoff_delay(0, base=0.01, cap=30, retry_after=2) >= 2
+    assert backoff_delay(0, base=0.01, cap=1, retry_after=10) == 1
+
+
+def test_parse_retry_after():
+    assert parse_retry_after("3") == 3
+    assert parse_retry_after("1.5") == 1.5
+    assert parse_retry_after("-2") == 0
+    assert parse_retry_after(None) is None
+    assert parse_retry_after("soon") is None
+    assert 25 <= parse_retry_after(formatdate(time.time() + 30, usegmt=True)) <= 30
+
+
+# ---------- 对模拟服务的爬取 ----------
+
+@pytest.fixture
+def serve(tmp_path, monkeypatch):
+    """启动模拟服务并把 spider.CONFIG 指向它；退避时间缩短为毫秒级"""
+    servers = []
+
+    def start(max_retry: int, **options) -> MockArcadeZone:
+        mock = MockArcadeZone(rows=ROWS, courses=COURSES, players=PLAYERS, **options).start()
+        servers.append(mock)
+        config = dict(spider.CONFIG)
+        config.update(
+            api_url=mock.api_url,
+            base_web_url=mock.web_url,
+            target_courses=list(COURSES),
+            standard_time_path=os.path.join(REPO_ROOT, "assets", "rank.csv"),
+            max_retry=max_retry,
+            crawl_mode="full",
+            cache=dict(spider.CONFIG["cache"], enabled=False),
+            journal=dict(spider.CONFIG["journal"], enabled=False, path=str(tmp_path / "journal.jsonl")),
+            rate_limit=dict(spider.CONFIG["rate_limit"], rate=1000, burst=1000, backoff_base=0.005, backoff_cap=0.05),
+        )
+        monkeypatch.setattr(spider, "CONFIG", config)
+        return mock
+
+    monkeypatch.setattr(spider.CAR_STYLES, "path", None)
+    yield start
+    for mock in servers:
+        mock.stop()
+
+
+def _crawl():
+    output = io.StringIO()
+    with contextlib.redirect_stdout(output):
+        crawler = spider.ArcadeZoneCrawler(target_usernames=PLAYERS, season=5)
+        df = crawler.run(COURSES, return_df=True)
+        crawler.close()
+    return crawler, df, output.getvalue()
+
+
+def test_crawl_recovers_from_throttling(serve):
+    serve(max_retry=3)
+    _, expected, _ = _crawl()
+
+    mock = serve(max_retry=10, failure_rate=0.3, retry_after=0.01)
+    crawler, df, _ = _crawl()
+    # 约三成请求返回 429/503，重试后结果仍与无故障时完全一致
+    assert mock.stats["failed"] > 0
+    assert crawler.skipped_requests == []
+    assert df.astype(str).equals(expected.astype(str))
+    assert len(df) == len(COURSES) * len(PLAYERS)
+
+
+def test_exhausted_retries_are_reported(serve):
+    mock = serve(max_retry=1, failure_rate=0.3, retry_after=0.01)
+    crawler, df, output = _crawl()
+
+    assert crawler.skipped_requests
+    assert df.attrs["skipped_requests"] == crawler.skipped_requests
+    # 只请求一次，失败的请求全部记为缺失页
+    assert len(crawler.skipped_requests) == mock.stats["failed"]
+    assert f"以下{len(crawler.skipped_requests)}个请求最终失败" in output
+    for payload in crawler.skipped_requests:
+        assert f"赛道{payload['course']} 第{payload['page']}页" in output
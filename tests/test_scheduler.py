@@ -0,0 +1,118 @@
+"""
+爬取调度器的中断与续爬测试（使用 benchmarks/mock_server.py 的本地模拟服务）
+
+    python -m pytest tests
+"""
+import contextlib
+import io
+import os
+import sys
+import time
+
+import pytest
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+sys.path.insert(0, os.path.join(REPO_ROOT, "benchmarks"))
+
+import spider  # noqa: E402
+from mock_server import MockArcadeZone  # noqa: E402
+
+COURSES = [0, 2, 4, 6]
+ROWS = 150  # 每条赛道10页，共40页
+WORKERS = 4
+PLAYERS = ["benchmark", "rival"]
+
+
+@pytest.fixture
+def server(request, tmp_path, monkeypatch):
+    # 每个请求有固定延迟，中断时才会有正在进行与排队中的请求
+    rows = getattr(request, "param", ROWS)
+    mock = MockArcadeZone(rows=rows, courses=COURSES, players=PLAYERS, latency=0.02).start()
+    config = dict(spider.CONFIG)
+    config.update(
+        api_url=mock.api_url,
+        base_web_url=mock.web_url,
+        target_courses=list(COURSES),
+        standard_time_path=os.path.join(REPO_ROOT, "assets", "rank.csv"),
+        max_workers=WORKERS,
+        per_host_limit=WORKERS,
+        crawl_mode="full",
+        cache=dict(spider.CONFIG["cache"], enabled=False),
+        journal=dict(spider.CONFIG["journal"], enabled=True, path=str(tmp_path / "journal.jsonl")),
+        rate_limit=dict(spider.CONFIG["rate_limit"], rate=1000, burst=1000),
+    )
+    monkeypatch.setattr(spider, "CONFIG", config)
+    monkeypatch.setattr(spider.CAR_STYLES, "path", None)
+    yield mock
+    mock.stop()
+
+
+def _crawl(crawler) -> "spider.pd.DataFrame":
+    with contextlib.redirect_stdout(io.StringIO()):
+        return crawler.run(COURSES, return_df=True)
+
+
+def _new_crawler():
+    with contextlib.redirect_stdout(io.StringIO()):
+        return spider.ArcadeZoneCrawler(target_usernames=PLAYERS, season=5)
+
+
+def test_interrupt_stops_queued_pages_and_resumes(server):
+    total_pages = len(COURSES) * -(-ROWS // server.per_page)
+    interrupt_at = 12
+
+    crawler = _new_crawler()
+    parse = crawler._parse_rank_data
+    parsed = []
+
+    def interrupting_parse(data, course_id, current_page):
+        if len(parsed) == interrupt_at:
+            raise KeyboardInterrupt
+        parsed.append((course_id, current_page))
+        return parse(data, course_id, current_page)
+
+    crawler._parse_rank_data = interrupting_parse
+    with pytest.raises(KeyboardInterrupt):
+        _crawl(crawler)
+    crawler.close()
+    # 等正在进行的请求跑完，确认排队中的页没有继续被请求
+    time.sleep(0.3)
+    fetched = server.stats["post"]
+    assert fetched <= interrupt_at + 1 + 2 * WORKERS
+    assert fetched < total_pages
+
+    # 续爬只请求断点日志中没有的页，结果与一次完整爬取一致
+    resumed = _new_crawler()
+    df = _crawl(resumed)
+    resumed.close()
+    assert server.stats["post"] - fetched == total_pages - interrupt_at
+    assert not os.path.exists(spider.CONFIG["journal"]["path"])
+
+    fresh = _new_crawler()
+    fresh.journal = None
+    spider.CONFIG["journal"]["enabled"] = False
+    expected = _crawl(fresh)
+    fresh.close()
+    assert df.astype(str).equals(expected.astype(str))
+    assert len(df) == len(COURSES) * len(PLAYERS)
+
+
+@pytest.mark.parametrize("server", [600], indirect=True)
+def test_early_stop_skips_pages_after_targets_found(server):
+    spider.CONFIG["journal"]["enabled"] = False
+    posts = {}
+    results = {}
+    for mode in ("full", "early_stop"):
+        spider.CONFIG["crawl_mode"] = mode
+        before = server.stats["post"]
+        crawler = _new_crawler()
+        results[mode] = _crawl(crawler)
+        crawler.close()
+        posts[mode] = server.stats["post"] - before
+
+    # 每条赛道最多同时提交 max_workers 页，找齐目标玩家后最多只多请求一个窗口
+    needed = [max(server._placements[course]) // server.per_page + 1 for course in COURSES]
+    assert posts["full"] == len(COURSES) * -(-server.rows // server.per_page)
+    assert posts["early_stop"] <= sum(needed) + len(COURSES) * (WORKERS - 1)
+    assert results["early_stop"].astype(str).equals(results["full"].astype(str))
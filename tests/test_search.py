@@ -0,0 +1,74 @@
+"""
+按用户名搜索的测试（使用 benchmarks/mock_server.py 的本地模拟服务）
+
+    python -m pytest tests
+"""
+import contextlib
+import io
+import os
+import sys
+
+import pytest
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+sys.path.insert(0, os.path.join(REPO_ROOT, "benchmarks"))
+
+import spider  # noqa: E402
+import spider_search  # noqa: E402
+from mock_server import MockArcadeZone  # noqa: E402
+
+COURSES = [0, 2, 4, 6]
+HITS = 40  # 每页15条，共3页
+
+
+@pytest.fixture
+def serve(monkeypatch):
+    servers = []
+
+    def start(**options) -> MockArcadeZone:
+        mock = MockArcadeZone(courses=COURSES, players=["benchmark"], search_hits=HITS, **options).start()
+        servers.append(mock)
+        config = dict(spider.CONFIG)
+        config.update(
+            api_url=mock.api_url,
+            base_web_url=mock.web_url,
+            target_courses=list(COURSES),
+            standard_time_path=os.path.join(REPO_ROOT, "assets", "rank.csv"),
+            cache=dict(spider.CONFIG["cache"], enabled=False),
+            results_store=dict(spider.CONFIG["results_store"], enabled=False),
+        )
+        monkeypatch.setattr(spider, "CONFIG", config)
+        monkeypatch.setattr(spider_search, "CONFIG", config)
+        return mock
+
+    monkeypatch.setattr(spider.CAR_STYLES, "path", None)
+    yield start
+    for mock in servers:
+        mock.stop()
+
+
+def _search():
+    with contextlib.redirect_stdout(io.StringIO()):
+        crawler = spider_search.ArcadeZoneSearchCrawler(target_usernames=["benchmark"], season=5)
+        records = crawler.crawl_all_courses_by_search("benchmark")
+        crawler.close()
+    return records
+
+
+def test_all_course_search_reuses_probe_page(serve):
+    mock = serve()
+    records = _search()
+    # 探测得到的第1页直接复用，只再请求第2、3页
+    assert mock.stats["post"] == -(-HITS // mock.per_page)
+    assert len(records) == HITS
+    assert [record["コース"] for record in records] == sorted(
+        (record["コース"] for record in records), key=[spider.CONFIG["course_name_map"][c] for c in COURSES].index)
+
+
+def test_per_course_search_when_all_course_search_unsupported(serve):
+    mock = serve(all_course_search=False)
+    records = _search()
+    # 探测1次 + 每条赛道各1页
+    assert mock.stats["post"] == 1 + len(COURSES)
+    assert len(records) == HITS
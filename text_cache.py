@@ -0,0 +1,91 @@
+from __future__ import annotations
+
+from collections import OrderedDict
+from typing import Callable, Dict, Hashable, Tuple
+
+from lazy_import import lazy_import
+
+Image = lazy_import("PIL.Image")
+ImageDraw = lazy_import("PIL.ImageDraw")
+ImageFont = lazy_import("PIL.ImageFont")
+
+# 缓存条目：(文字蒙版, 相对绘制坐标的贴图偏移)
+TextMask = Tuple["Image.Image", Tuple[int, int]]
+
+
+class TextBitmapCache:
+    """
+    文字位图的 LRU 缓存（进程内共享）
+    表格中赛道名、方向、车种、日期和表头大量重复，同一字符串只用 FreeType 光栅化一次，
+    之后直接以蒙版贴色；按蒙版占用的字节数限制容量，超出时淘汰最久未使用的条目
+    """
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: Hashable, render: Callable[[], TextMask]) -> TextMask:
+        """命中时返回缓存的蒙版，未命中时调用 render 生成并缓存"""
+        entry = self._entries.get(key)
+        if entry is not None:
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+        self.misses += 1
+        entry = render()
+        size = entry[0].width * entry[0].height
+        if size > self.max_bytes:
+            return entry
+        self._entries[key] = entry
+        self._bytes += size
+        while self._bytes > self.max_bytes:
+            _, (mask, _) = self._entries.popitem(last=False)
+            self._bytes -= mask.width * mask.height
+            self.evictions += 1
+        return entry
+
+    def stats(self) -> Dict[str, float]:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+    def reset_stats(self):
+        self.hits = self.misses = self.evictions = 0
+
+    def clear(self):
+        self._entries.clear()
+        self._bytes = 0
+        self.reset_stats()
+
+
+def render_text_mask(text: str, font: ImageFont.FreeTypeFont, start: Tuple[float, float] = (0, 0)) -> TextMask:
+    """
+    按原尺寸光栅化文字蒙版，start 为绘制坐标的小数部分；
+    以 (int(x), int(y)) + 偏移 贴图时与直接 draw.text((x, y), ...) 逐像素一致
+    """
+    left, top, right, bottom = font.getbbox(text)
+    # 字形向左上越出绘制点时扩大蒙版，避免被裁掉
+    offset_x, offset_y = min(0, left), min(0, top)
+    mask = Image.new("L", (max(1, right - offset_x + 1), max(1, bottom - offset_y + 1)), 0)
+    ImageDraw.Draw(mask).text((start[0] - offset_x, start[1] - offset_y), text, fill=255, font=font)
+    return mask, (offset_x, offset_y)
+
+
+def render_supersampled_mask(text: str, font: ImageFont.FreeTypeFont, factor: int) -> TextMask:
+    """把文字按 factor 倍字号绘制成蒙版后缩小，以四舍五入后的绘制坐标贴图"""
+    _, _, right, bottom = font.getbbox(text)
+    width = max(factor, -(-right // factor) * factor)
+    height = max(factor, -(-bottom // factor) * factor)
+    mask = Image.new("L", (width, height), 0)
+    ImageDraw.Draw(mask).text((0, 0), text, fill=255, font=font)
+    return mask.resize((width // factor, height // factor), Image.Resampling.LANCZOS), (0, 0)
@@ -0,0 +1,151 @@
+from __future__ import annotations
+
+import re
+from typing import Iterable, Union
+
+from lazy_import import lazy_import
+
+np = lazy_import("numpy")
+pd = lazy_import("pandas")
+
+# 成绩的两种写法：API/爬取结果为 M:SS.mmm，等级标准库与手工录入的CSV为 M'SS"mmm
+COLON = "colon"
+QUOTE = "quote"
+_SEPARATORS = {COLON: (":", "."), QUOTE: ("'", '"')}
+_TIME_PATTERN = re.compile(r"^([0-9]+)(?::([0-9]{2})\.([0-9]{3})|'([0-9]{2})\"([0-9]{3}))$")
+_ERROR_SAMPLES = 5
+
+
+class TimeFormatError(ValueError):
+    """成绩无法解析；批量解析时 positions 为出错的下标"""
+
+    def __init__(self, message: str, positions=()):
+        super().__init__(message)
+        self.positions = [int(pos) for pos in positions]
+
+
+def time_to_ms(text: str) -> int:
+    """解析单个成绩（M:SS.mmm 或 M'SS"mmm）为毫秒，格式不符时抛出 TimeFormatError"""
+    match = _TIME_PATTERN.match(str(text).strip())
+    if not match:
+        raise TimeFormatError(f"无法识别的成绩格式：{text!r}（应为 M:SS.mmm 或 M'SS\"mmm）")
+    minutes, seconds, millis = match.group(1), match.group(2) or match.group(4), match.group(3) or match.group(5)
+    return int(minutes) * 60000 + int(seconds) * 1000 + int(millis)
+
+
+def ms_to_time(ms: int, style: str = COLON) -> str:
+    minute_sep, second_sep = _SEPARATORS[style]
+    if ms < 0:
+        raise TimeFormatError(f"成绩不能为负数：{ms}")
+    return f"{ms // 60000}{minute_sep}{ms % 60000 // 1000:02d}{second_sep}{ms % 1000:03d}"
+
+
+def format_duration(seconds: float) -> str:
+    """格式化耗时为 分'秒"毫秒 格式，不足一分钟时省略分"""
+    minutes = int(seconds // 60)
+    seconds_remainder = seconds % 60
+    whole_seconds = int(seconds_remainder)
+    milliseconds = int((seconds_remainder - whole_seconds) * 1000)
+
+    if minutes > 0:
+        return f"{minutes}'{whole_seconds:02d}\"{milliseconds:03d}"
+    return f"{whole_seconds}\"{milliseconds:03d}"
+
+
+def _char_matrix(values: Iterable) -> np.ndarray:
+    """把字符串右对齐为定宽 Unicode 数组，并按字符码展开为 (行数, 宽度) 矩阵"""
+    text = np.char.strip(np.asarray(values, dtype=str))
+    width = max(text.dtype.itemsize // 4, 8)
+    text = np.char.rjust(text, width)
+    return text.view(np.uint32).reshape(len(text), width)
+
+
+def times_to_ms(values: Union[pd.Series, np.ndarray, Iterable], errors: str = "raise") -> np.ndarray:
+    """
+    批量解析成绩为毫秒（两种写法可混用），全程为 NumPy 数组运算，不逐个单元格调用 Python
+    errors="raise" 时有任何无法解析的值即抛出 TimeFormatError（列出出错位置），返回 int64 数组；
+    errors="coerce" 时无法解析的值为 NaN，返回 float64 数组
+    """
+    if errors not in ("raise", "coerce"):
+        raise ValueError(f"errors 只能为 raise 或 coerce：{errors}")
+    raw = values.to_numpy(dtype=object) if isinstance(values, pd.Series) else np.asarray(values, dtype=object)
+    if len(raw) == 0:
+        return np.empty(0, dtype=np.int64 if errors == "raise" else np.float64)
+
+    codes = _char_matrix(raw)
+    # digits 只在 is_digit 为真的位置有意义
+    digits = codes.astype(np.int64) - ord("0")
+    is_digit = (codes >= ord("0")) & (codes <= ord("9"))
+
+    # 从右往左固定位置：毫秒3位、秒分隔符、秒2位、分分隔符，其余为分钟
+    minute_sep, second_sep = codes[:, -7], codes[:, -4]
+    separators_ok = (((minute_sep == ord(":")) & (second_sep == ord(".")))
+                     | ((minute_sep == ord("'")) & (second_sep == ord('"'))))
+    fixed_digits_ok = is_digit[:, [-6, -5, -3, -2, -1]].all(axis=1)
+    # 分钟部分：左侧补齐的空格之后全部是数字，且至少一位
+    minute_digits = is_digit[:, :-7]
+    minute_blank = codes[:, :-7] == ord(" ")
+    minutes_ok = ((minute_digits | minute_blank).all(axis=1)
+                  & ~(minute_digits[:, :-1] & minute_blank[:, 1:]).any(axis=1)
+                  & minute_digits[:, -1])
+    valid = separators_ok & fixed_digits_ok & minutes_ok
+
+    weights = 10 ** np.arange(minute_digits.shape[1] - 1, -1, -1, dtype=np.int64)
+    minutes = (np.where(minute_digits, digits[:, :-7], 0) * weights).sum(axis=1)
+    seconds = digits[:, -6] * 10 + digits[:, -5]
+    millis = digits[:, -3] * 100 + digits[:, -2] * 10 + digits[:, -1]
+    ms = minutes * 60000 + seconds * 1000 + millis
+
+    if valid.all():
+        return ms if errors == "raise" else ms.astype(np.float64)
+    if errors == "coerce":
+        return np.where(valid, ms, np.nan)
+    bad = np.flatnonzero(~valid)
+    samples = "，".join(f"第{pos + 1}条 {raw[pos]!r}" for pos in bad[:_ERROR_SAMPLES])
+    more = f" 等共{len(bad)}条" if len(bad) > _ERROR_SAMPLES else ""
+    raise TimeFormatError(f"无法识别的成绩格式（应为 M:SS.mmm 或 M'SS\"mmm）：{samples}{more}", bad)
+
+
+def warn_bad_times(values: Union[pd.Series, np.ndarray, Iterable], source: str = "") -> np.ndarray:
+    """
+    只渲染的表格不因成绩格式拒收：空单元格直接跳过，其余无法解析的值打印警告（列出位置），
+    返回出错的下标
+    """
+    raw = values.to_numpy(dtype=object) if isinstance(values, pd.Series) else np.asarray(values, dtype=object)
+    blank = pd.isna(raw) | (np.char.strip(np.asarray(raw, dtype=str)) == "")
+    bad = np.flatnonzero(np.isnan(times_to_ms(raw, errors="coerce")) & ~blank)
+    if len(bad):
+        samples = "，".join(f"第{pos + 1}条 {raw[pos]!r}" for pos in bad[:_ERROR_SAMPLES])
+        more = f" 等共{len(bad)}条" if len(bad) > _ERROR_SAMPLES else ""
+        prefix = f"{source}：" if source else ""
+        print(f"⚠️ {prefix}无法识别的成绩格式（应为 M:SS.mmm 或 M'SS\"mmm），将按原文显示：{samples}{more}")
+    return bad
+
+
+def ms_to_times(values: Union[pd.Series, np.ndarray, Iterable], style: str = COLON) -> np.ndarray:
+    """批量把毫秒格式化为成绩字符串，逐位拼出字符码矩阵后整体转换"""
+    minute_sep, second_sep = _SEPARATORS[style]
+    ms = np.asarray(values, dtype=np.int64)
+    if len(ms) == 0:
+        return np.empty(0, dtype=object)
+    if (ms < 0).any():
+        raise TimeFormatError(f"成绩不能为负数：{ms[ms < 0][:_ERROR_SAMPLES].tolist()}")
+
+    minutes, rest = np.divmod(ms, 60000)
+    seconds, millis = np.divmod(rest, 1000)
+    minute_width = len(str(int(minutes.max())))
+    codes = np.full((len(ms), minute_width + 7), ord(" "), dtype=np.uint32)
+    for col in range(minute_width):
+        place = 10 ** (minute_width - 1 - col)
+        # 分钟不补零：高位为0的位置保留空格，个位始终输出
+        shown = (minutes >= place) | (place == 1)
+        codes[:, col] = np.where(shown, ord("0") + minutes // place % 10, ord(" "))
+    codes[:, -7] = ord(minute_sep)
+    codes[:, -6] = ord("0") + seconds // 10
+    codes[:, -5] = ord("0") + seconds % 10
+    codes[:, -4] = ord(second_sep)
+    codes[:, -3] = ord("0") + millis // 100
+    codes[:, -2] = ord("0") + millis // 10 % 10
+    codes[:, -1] = ord("0") + millis % 10
+    text = np.ascontiguousarray(codes).view(f"U{minute_width + 7}").ravel()
+    return np.char.lstrip(text).astype(object)
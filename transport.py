@@ -0,0 +1,206 @@
+import importlib.util
+import json
+import re
+import threading
+from typing import Callable, Dict, Optional
+
+from lazy_import import lazy_import
+
+# requests、httpx 与 asyncio 导入较慢，创建对应的传输层时才导入
+requests = lazy_import("requests")
+asyncio = lazy_import("asyncio")
+
+# 可选依赖：httpx（asyncio 传输层），安装 h2 后可启用 HTTP/2
+HTTPX_AVAILABLE = importlib.util.find_spec("httpx") is not None
+httpx = lazy_import("httpx")
+
+TRANSPORT_KINDS = ("requests", "asyncio")
+
+# <meta name="csrf-token" content="..."> 两种属性顺序都匹配
+_CSRF_PATTERNS = (
+    re.compile(rb"""<meta[^>]*?name=["']csrf-token["'][^>]*?content=["']([^"']+)["']""", re.IGNORECASE),
+    re.compile(rb"""<meta[^>]*?content=["']([^"']+)["'][^>]*?name=["']csrf-token["']""", re.IGNORECASE),
+)
+_HEAD_END = re.compile(rb"</head\s*>", re.IGNORECASE)
+
+
+class TransportError(Exception):
+    """网络层错误（连接失败、超时等），可重试"""
+
+
+class TransportResponse:
+    """与具体HTTP库无关的响应"""
+
+    def __init__(self, status_code: int, headers: Dict[str, str], content: bytes):
+        self.status_code = status_code
+        # 统一为小写键，按名取头时不区分大小写
+        self.headers = {key.lower(): value for key, value in headers.items()}
+        self.content = content
+
+    def header(self, name: str) -> Optional[str]:
+        return self.headers.get(name.lower())
+
+    def json(self):
+        return json.loads(self.content)
+
+
+def find_csrf_token(html: bytes) -> Optional[str]:
+    for pattern in _CSRF_PATTERNS:
+        match = pattern.search(html)
+        if match:
+            return match.group(1).decode("utf-8", "replace")
+    return None
+
+
+def _parse_csrf_token_full(html: bytes) -> Optional[str]:
+    """正则未命中时的兜底：优先 lxml，没有则用 BeautifulSoup"""
+    try:
+        from lxml import html as lxml_html
+        values = lxml_html.fromstring(html).xpath('//meta[@name="csrf-token"]/@content')
+        return values[0] if values else None
+    except ImportError:
+        from bs4 import BeautifulSoup
+        csrf_meta = BeautifulSoup(html, "html.parser").find("meta", attrs={"name": "csrf-token"})
+        return csrf_meta.get("content") if csrf_meta else None
+
+
+class Transport:
+    """
+    传输层接口：同步调用，内部可以是线程池共享的连接池，也可以是后台事件循环
+    实现需保持 Cookie（CSRF Token 与会话 Cookie 绑定）
+    """
+
+    def post(self, url: str, headers: Dict[str, str], body: bytes, timeout: float) -> TransportResponse:
+        raise NotImplementedError
+
+    def stream_get(self, url: str, headers: Dict[str, str], timeout: float,
+                   on_chunk: Callable[[bytes], bool]) -> int:
+        """流式GET，每收到一块数据调用 on_chunk，返回真时提前断开；返回状态码"""
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+    def fetch_csrf_token(self, url: str, headers: Dict[str, str], timeout: float) -> Optional[str]:
+        """流式读取网页，读到 csrf-token 或 </head> 即停止，不下载、不解析整页"""
+        buffer = bytearray()
+        found = []
+
+        def on_chunk(chunk: bytes) -> bool:
+            buffer.extend(chunk)
+            token = find_csrf_token(buffer)
+            if token:
+                found.append(token)
+                return True
+            return _HEAD_END.search(buffer) is not None
+
+        status = self.stream_get(url, headers, timeout, on_chunk)
+        if status >= 400:
+            raise TransportError(f"HTTP {status}")
+        if found:
+            return found[0]
+        return _parse_csrf_token_full(bytes(buffer))
+
+
+class RequestsTransport(Transport):
+    """基于 requests.Session 的线程安全连接池，连接数与并发数一致并保持长连接"""
+
+    def __init__(self, pool_size: int):
+        self.session = requests.Session()
+        # pool_block 为真时超出连接池的请求等待空闲连接，而不是临时新建再丢弃
+        adapter = requests.adapters.HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, pool_block=True)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+    def post(self, url, headers, body, timeout):
+        try:
+            response = self.session.post(url, headers=headers, data=body, timeout=timeout)
+        except requests.exceptions.RequestException as e:
+            raise TransportError(str(e)) from e
+        return TransportResponse(response.status_code, response.headers, response.content)
+
+    def stream_get(self, url, headers, timeout, on_chunk):
+        try:
+            with self.session.get(url, headers=headers, timeout=timeout, stream=True) as response:
+                for chunk in response.iter_content(chunk_size=8192):
+                    if on_chunk(chunk):
+                        break
+                return response.status_code
+        except requests.exceptions.RequestException as e:
+            raise TransportError(str(e)) from e
+
+    def close(self):
+        self.session.close()
+
+
+class AsyncioTransport(Transport):
+    """
+    基于 httpx.AsyncClient 的异步传输层
+    事件循环运行在后台线程，调用方线程通过 run_coroutine_threadsafe 提交请求，
+    所有请求共享一个连接池（长连接，可选HTTP/2多路复用）
+    """
+
+    def __init__(self, pool_size: int, http2: bool = False, keepalive_expiry: float = 30):
+        if not HTTPX_AVAILABLE:
+            raise ImportError("asyncio 传输层需要安装 httpx：pip install httpx（HTTP/2 另需 h2）")
+        if http2:
+            try:
+                import h2  # noqa: F401
+            except ImportError:
+                print("⚠️  未安装 h2，HTTP/2 不可用，改用 HTTP/1.1")
+                http2 = False
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, name="transport-loop", daemon=True)
+        self._thread.start()
+        limits = httpx.Limits(
+            max_connections=pool_size,
+            max_keepalive_connections=pool_size,
+            keepalive_expiry=keepalive_expiry
+        )
+
+        async def create_client():
+            return httpx.AsyncClient(limits=limits, http2=http2)
+
+        self._client = self._run(create_client())
+
+    def _run(self, coroutine):
+        return asyncio.run_coroutine_threadsafe(coroutine, self._loop).result()
+
+    def post(self, url, headers, body, timeout):
+        async def send():
+            response = await self._client.post(url, headers=headers, content=body, timeout=timeout)
+            return TransportResponse(response.status_code, response.headers, response.content)
+
+        try:
+            return self._run(send())
+        except httpx.HTTPError as e:
+            raise TransportError(str(e)) from e
+
+    def stream_get(self, url, headers, timeout, on_chunk):
+        async def fetch():
+            async with self._client.stream("GET", url, headers=headers, timeout=timeout) as response:
+                async for chunk in response.aiter_bytes():
+                    if on_chunk(chunk):
+                        break
+                return response.status_code
+
+        try:
+            return self._run(fetch())
+        except httpx.HTTPError as e:
+            raise TransportError(str(e)) from e
+
+    def close(self):
+        if self._loop.is_closed():
+            return
+        self._run(self._client.aclose())
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+        self._loop.close()
+
+
+def create_transport(kind: str, pool_size: int, http2: bool = False, keepalive_expiry: float = 30) -> Transport:
+    if kind == "requests":
+        return RequestsTransport(pool_size)
+    if kind == "asyncio":
+        return AsyncioTransport(pool_size, http2=http2, keepalive_expiry=keepalive_expiry)
+    raise ValueError(f"未知传输层：{kind}，可选：{', '.join(TRANSPORT_KINDS)}")